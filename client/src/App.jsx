@@ -1,6 +1,8 @@
 import React, { useState, useRef, useCallback, useEffect } from 'react'
 import './index.css'
 import { useAudioRecorder } from './hooks/useAudioRecorder'
+import { PCM_OUTPUT_FORMAT } from './utils/audioUtils'
+import { PlaybackEngine } from './utils/playbackEngine'
 
 function App() {
   const [isConnected, setIsConnected] = useState(false)
@@ -11,7 +13,12 @@ function App() {
   const [availableVoices, setAvailableVoices] = useState([])
   const [capabilities, setCapabilities] = useState({})
   const wsRef = useRef(null)
-  const audioContextRef = useRef(null)
+  const playbackRef = useRef(null)
+  const isRecordingRef = useRef(false)
+  // Resumption: token from the last status message, and reconnect bookkeeping
+  const resumeRef = useRef({ token: null, graceMs: 0, droppedAt: null, attempts: 0 })
+  const closingRef = useRef(false)
+  const connectRef = useRef(null)
 
   const addLog = useCallback((message) => {
     console.log(message)
@@ -30,21 +37,31 @@ function App() {
   // Real audio recorder hook
   const { startRecording: startAudioRecording, stopRecording: stopAudioRecording, isRecording: audioRecording } = useAudioRecorder()
 
-  // Handle audio data from microphone
+  useEffect(() => {
+    isRecordingRef.current = isRecording
+  }, [isRecording])
+
+  // Handle audio data from microphone (one 20-40 ms PCM16 frame at 16 kHz).
+  // Reads refs: this callback is handed to the recorder once per recording.
   const handleAudioData = useCallback((audioData) => {
-    if (wsRef.current && isConnected && isRecording) {
+    if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN && isRecordingRef.current) {
       // Send audio data as binary
       wsRef.current.send(audioData)
     }
-  }, [isConnected, isRecording])
+  }, [])
 
-  // Initialize audio context
+  // One playback engine (and AudioContext) for all TTS audio; acks go back to the server
   useEffect(() => {
-    audioContextRef.current = new (window.AudioContext || window.webkitAudioContext)()
-    return () => {
-      if (audioContextRef.current) {
-        audioContextRef.current.close()
+    playbackRef.current = new PlaybackEngine({
+      onAck: (ack) => {
+        if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+          wsRef.current.send(JSON.stringify(ack))
+        }
       }
+    })
+    return () => {
+      playbackRef.current.close()
+      playbackRef.current = null
     }
   }, [])
 
@@ -62,23 +79,36 @@ function App() {
   }, [addLog])
 
   // Main WebSocket connection for the app
-  const connectWebSocket = useCallback(() => {
+  const connectWebSocket = useCallback((resuming = false) => {
     try {
-      const wsUrl = import.meta.env.VITE_BACKEND_WS_URL || 'ws://localhost:8000/ws'
-      addLog(`Connecting to WebSocket: ${wsUrl}`)
-      
+      const baseUrl = import.meta.env.VITE_BACKEND_WS_URL || 'ws://localhost:8000/ws'
+      const resume = resumeRef.current
+      const wsUrl = resuming && resume.token
+        ? `${baseUrl}?resume=${encodeURIComponent(resume.token)}&last_seq=${playbackRef.current?.resumeSeq(resume.token) || 0}`
+        : baseUrl
+      addLog(resuming ? 'Reconnecting to resume session...' : `Connecting to WebSocket: ${wsUrl}`)
+      closingRef.current = false
+
       const ws = new WebSocket(wsUrl)
-      
-      ws.onopen = () => {
-        addLog('✅ WebSocket connected successfully!')
-        setIsConnected(true)
-        // Send initial configuration
+
+      const sendConfig = () => {
         ws.send(JSON.stringify({
           type: 'config',
           voice: selectedVoice,
-          lang: 'en-US'
+          lang: 'en-US',
+          audio_format: PCM_OUTPUT_FORMAT,
+          playback_acks: true
         }))
       }
+
+      ws.onopen = () => {
+        addLog('✅ WebSocket connected successfully!')
+        setIsConnected(true)
+        // A resumed session keeps its configuration; a fresh one needs it
+        if (!resuming) {
+          sendConfig()
+        }
+      }
       
       ws.onmessage = async (event) => {
         try {
@@ -92,12 +122,49 @@ function App() {
               break
               
             case 'audio_chunk':
-              addLog('🎵 Received TTS audio response')
-              await handleAudioChunk(data.payload)
+              await playbackRef.current?.push(data)
+              break
+
+            case 'audio_end':
+              playbackRef.current?.end(data)
+              addLog(`🔊 TTS audio complete: ${data.chunks} chunks`)
+              break
+
+            case 'resume_gap':
+              playbackRef.current?.skipTo(data.first_seq)
+              addLog(`⚠️ ${data.message}`)
+              break
+
+            case 'audio_format':
+              addLog(`🔊 TTS output: ${data.codec} @ ${data.sample_rate} Hz, ${data.frame_ms} ms frames`)
               break
               
             case 'status':
-              setIsRecording(data.status === 'recording')
+              if (data.status === 'connected') {
+                // A new server session (fresh, or a failed resume) numbers turns and seqs from 1
+                playbackRef.current?.reset(data.resume_token)
+              } else if (data.status === 'resumed' && playbackRef.current) {
+                // Tokens are single-use: the same session now goes by its new token
+                playbackRef.current.session = data.resume_token
+              }
+              if (data.resume_token) {
+                resumeRef.current = { ...resumeRef.current, token: data.resume_token, graceMs: (data.resume_grace_s || 0) * 1000 }
+              }
+              if (data.status === 'resumed') {
+                resumeRef.current.droppedAt = null
+                resumeRef.current.attempts = 0
+                addLog(`🔁 Session resumed (${data.replayed} messages replayed)`)
+              } else if (data.status === 'connected' && data.resumed === false) {
+                // The server no longer had the session: start over on a new one
+                resumeRef.current.droppedAt = null
+                resumeRef.current.attempts = 0
+                sendConfig()
+                if (isRecordingRef.current) {
+                  ws.send(JSON.stringify({ type: 'start' }))
+                }
+              } else {
+                setIsRecording(data.status === 'recording')
+              }
               if (data.message) {
                 addLog(data.message)
               }
@@ -119,7 +186,24 @@ function App() {
       }
       
       ws.onclose = () => {
+        const resume = resumeRef.current
+        const now = Date.now()
+        if (!closingRef.current && resume.token && (resume.droppedAt === null || now - resume.droppedAt < resume.graceMs)) {
+          // Unexpected drop: reconnect within the server's grace period and carry on
+          if (resume.droppedAt === null) resume.droppedAt = now
+          const delay = Math.min(4000, 250 * 2 ** resume.attempts)
+          resume.attempts += 1
+          addLog(`⚠️ WebSocket dropped - reconnecting in ${delay} ms`)
+          setTimeout(() => connectRef.current?.(true), delay)
+          return
+        }
         addLog('❌ WebSocket disconnected')
+        resumeRef.current = { token: null, graceMs: 0, droppedAt: null, attempts: 0 }
+        playbackRef.current?.reset()
+        if (isRecordingRef.current) {
+          stopAudioRecording()
+          isRecordingRef.current = false
+        }
         setIsConnected(false)
         setIsRecording(false)
       }
@@ -133,37 +217,15 @@ function App() {
     } catch (error) {
       addLog(`❌ Connection failed: ${error.message}`)
     }
-  }, [addLog, addTranscript, selectedVoice])
+  }, [addLog, addTranscript, selectedVoice, stopAudioRecording])
 
-  const handleAudioChunk = async (base64Data) => {
-    try {
-      if (!audioContextRef.current) {
-        audioContextRef.current = new (window.AudioContext || window.webkitAudioContext)()
-      }
-
-      // Convert base64 to ArrayBuffer
-      const binaryString = atob(base64Data)
-      const bytes = new Uint8Array(binaryString.length)
-      for (let i = 0; i < binaryString.length; i++) {
-        bytes[i] = binaryString.charCodeAt(i)
-      }
-      
-      // Decode and play audio
-      const audioBuffer = await audioContextRef.current.decodeAudioData(bytes.buffer)
-      const source = audioContextRef.current.createBufferSource()
-      source.buffer = audioBuffer
-      source.connect(audioContextRef.current.destination)
-      source.start()
-      
-      addLog('🔊 Playing TTS audio')
-      
-    } catch (error) {
-      addLog(`❌ Audio playback error: ${error.message}`)
-    }
-  }
+  useEffect(() => {
+    connectRef.current = connectWebSocket
+  }, [connectWebSocket])
 
   const disconnectWebSocket = useCallback(() => {
     if (wsRef.current) {
+      closingRef.current = true
       wsRef.current.close()
       wsRef.current = null
     }
@@ -177,14 +239,16 @@ function App() {
           return
         }
         
-        // Start audio recording
-        await startAudioRecording(handleAudioData)
-        // Send start message to server
+        // Send start message to server, then stream frames as they are captured
         wsRef.current.send(JSON.stringify({ type: 'start' }))
+        isRecordingRef.current = true
+        await startAudioRecording(handleAudioData, { frameMs: 20 })
         addLog('🎤 Started audio recording - speak now!')
         setIsRecording(true)
         addTranscript('Listening...', 'system', true)
       } catch (error) {
+        isRecordingRef.current = false
+        wsRef.current.send(JSON.stringify({ type: 'stop' }))
         addLog(`❌ Failed to start audio recording: ${error.message}`)
         if (error.message.includes('Permission')) {
           addLog('Please allow microphone access in your browser')
@@ -267,7 +331,7 @@ function App() {
               Test Backend
             </button>
             {!isConnected ? (
-              <button className="btn btn-connect" onClick={connectWebSocket}>
+              <button className="btn btn-connect" onClick={() => connectWebSocket()}>
                 Connect
               </button>
             ) : (
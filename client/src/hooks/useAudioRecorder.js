@@ -1,57 +1,76 @@
 import { useState, useRef, useCallback } from 'react'
+import { createCaptureRing, drainCaptureRing, sharedRingSupported } from '../utils/captureRing'
+
+export const CAPTURE_SAMPLE_RATE = 16000
+const MIN_FRAME_MS = 20
+const MAX_FRAME_MS = 40
 
 export const useAudioRecorder = () => {
   const [isRecording, setIsRecording] = useState(false)
-  const mediaRecorderRef = useRef(null)
   const audioContextRef = useRef(null)
   const streamRef = useRef(null)
-  const processorRef = useRef(null)
+  const sourceRef = useRef(null)
+  const workletRef = useRef(null)
+  const drainTimerRef = useRef(null)
+  const drainRef = useRef(null)
+  // Read by the frame callbacks; state would be a stale closure there
+  const recordingRef = useRef(false)
 
-  const startRecording = useCallback(async (onAudioData) => {
+  const startRecording = useCallback(async (onAudioData, { frameMs = 20 } = {}) => {
     try {
       console.log('Requesting microphone access...')
-      
+
       // Get microphone access with optimal settings for ASR
-      const stream = await navigator.mediaDevices.getUserMedia({ 
+      const stream = await navigator.mediaDevices.getUserMedia({
         audio: {
-          sampleRate: 16000,
           channelCount: 1,
           echoCancellation: true,
           noiseSuppression: true,
           autoGainControl: true
-        } 
+        }
       })
-      
+
       streamRef.current = stream
-      
-      // Set up AudioContext for processing
-      audioContextRef.current = new (window.AudioContext || window.webkitAudioContext)({
-        sampleRate: 16000
+
+      // Run at the device rate; the worklet downsamples to 16 kHz itself
+      const context = new (window.AudioContext || window.webkitAudioContext)({ latencyHint: 'interactive' })
+      audioContextRef.current = context
+      await context.audioWorklet.addModule(new URL('../worklets/captureProcessor.js', import.meta.url))
+
+      const frameSamples = CAPTURE_SAMPLE_RATE * Math.min(MAX_FRAME_MS, Math.max(MIN_FRAME_MS, frameMs)) / 1000
+      const ring = sharedRingSupported() ? createCaptureRing(frameSamples) : null
+      const worklet = new AudioWorkletNode(context, 'capture-processor', {
+        numberOfInputs: 1,
+        numberOfOutputs: 1,
+        channelCount: 1,
+        processorOptions: { frameSamples, targetRate: CAPTURE_SAMPLE_RATE, ring }
       })
-      
-      const source = audioContextRef.current.createMediaStreamSource(stream)
-      const processor = audioContextRef.current.createScriptProcessor(4096, 1, 1)
-      
-      processor.onaudioprocess = (event) => {
-        if (!isRecording) return
-        
-        const inputData = event.inputBuffer.getChannelData(0)
-        // Convert Float32 to PCM16
-        const pcmData = convertFloat32ToPCM16(inputData)
-        
-        // Send audio data to callback
-        if (onAudioData) {
-          onAudioData(pcmData)
+
+      const deliver = (frame) => {
+        if (recordingRef.current && onAudioData) {
+          onAudioData(frame)
         }
       }
-      
-      source.connect(processor)
-      processor.connect(audioContextRef.current.destination)
-      processorRef.current = processor
-      
+
+      if (ring) {
+        // Frames wait in shared memory; the main thread only wakes once per frame period
+        drainRef.current = () => drainCaptureRing(ring, deliver)
+        drainTimerRef.current = setInterval(drainRef.current, frameSamples / CAPTURE_SAMPLE_RATE * 1000)
+      } else {
+        worklet.port.onmessage = (event) => deliver(event.data)
+      }
+
+      const source = context.createMediaStreamSource(stream)
+      source.connect(worklet)
+      // Outputs silence; being connected keeps the node rendering in every browser
+      worklet.connect(context.destination)
+      sourceRef.current = source
+      workletRef.current = worklet
+
+      recordingRef.current = true
       setIsRecording(true)
-      console.log('Audio recording started successfully')
-      
+      console.log(`Audio recording started (${frameSamples / CAPTURE_SAMPLE_RATE * 1000} ms frames, ${ring ? 'shared ring' : 'postMessage'})`)
+
     } catch (error) {
       console.error('Error starting recording:', error)
       if (error.name === 'NotAllowedError') {
@@ -62,16 +81,28 @@ export const useAudioRecorder = () => {
         throw new Error(`Failed to start recording: ${error.message}`)
       }
     }
-  }, [isRecording])
+  }, [])
 
   const stopRecording = useCallback(() => {
+    if (drainTimerRef.current) {
+      clearInterval(drainTimerRef.current)
+      drainTimerRef.current = null
+      drainRef.current()  // send frames still in the ring
+      drainRef.current = null
+    }
+    recordingRef.current = false
     if (streamRef.current) {
       streamRef.current.getTracks().forEach(track => track.stop())
       streamRef.current = null
     }
-    if (processorRef.current) {
-      processorRef.current.disconnect()
-      processorRef.current = null
+    if (sourceRef.current) {
+      sourceRef.current.disconnect()
+      sourceRef.current = null
+    }
+    if (workletRef.current) {
+      workletRef.current.port.postMessage('stop')
+      workletRef.current.disconnect()
+      workletRef.current = null
     }
     if (audioContextRef.current) {
       audioContextRef.current.close()
@@ -81,18 +112,9 @@ export const useAudioRecorder = () => {
     console.log('Audio recording stopped')
   }, [])
 
-  const convertFloat32ToPCM16 = (float32Array) => {
-    const pcm16 = new Int16Array(float32Array.length)
-    for (let i = 0; i < float32Array.length; i++) {
-      const s = Math.max(-1, Math.min(1, float32Array[i]))
-      pcm16[i] = s < 0 ? s * 0x8000 : s * 0x7FFF
-    }
-    return pcm16
-  }
-
   return {
     startRecording,
     stopRecording,
     isRecording
   }
-}
\ No newline at end of file
+}
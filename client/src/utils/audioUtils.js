@@ -1,12 +1,14 @@
-export const playAudioChunk = async (base64Data, audioContext) => {
-  try {
-    const audioData = Uint8Array.from(atob(base64Data), c => c.charCodeAt(0))
-    const audioBuffer = await audioContext.decodeAudioData(audioData.buffer)
-    const source = audioContext.createBufferSource()
-    source.buffer = audioBuffer
-    source.connect(audioContext.destination)
-    source.start()
-  } catch (error) {
-    console.error('Error playing audio:', error)
+// Output format requested from the server: fixed-duration raw PCM16 frames
+// need no decodeAudioData call and can be scheduled back to back.
+export const PCM_OUTPUT_FORMAT = { codec: 'pcm16', sample_rate: 24000, frame_ms: 20 }
+
+export const pcm16ToAudioBuffer = (base64Data, sampleRate, audioContext) => {
+  const bytes = Uint8Array.from(atob(base64Data), c => c.charCodeAt(0))
+  const samples = new Int16Array(bytes.buffer, 0, bytes.length >> 1)
+  const audioBuffer = audioContext.createBuffer(1, samples.length, sampleRate)
+  const channel = audioBuffer.getChannelData(0)
+  for (let i = 0; i < samples.length; i++) {
+    channel[i] = samples[i] / 0x8000
   }
-}
\ No newline at end of file
+  return audioBuffer
+}
@@ -0,0 +1,31 @@
+// Single-producer/single-consumer ring of fixed-size PCM16 frames shared with
+// the capture worklet. header: [frames written, frames read, frames dropped];
+// data: `capacity` frame slots of `frameSamples` samples each.
+const HEADER_WRITE = 0
+const HEADER_READ = 1
+const HEADER_DROPPED = 2
+
+export const sharedRingSupported = () =>
+  typeof SharedArrayBuffer !== 'undefined' && window.crossOriginIsolated === true
+
+export const createCaptureRing = (frameSamples, capacity = 32) => ({
+  frameSamples,
+  capacity,
+  header: new SharedArrayBuffer(3 * Int32Array.BYTES_PER_ELEMENT),
+  data: new SharedArrayBuffer(capacity * frameSamples * Int16Array.BYTES_PER_ELEMENT)
+})
+
+// Hand every complete frame to `onFrame` (as its own copy) and mark it read
+export const drainCaptureRing = (ring, onFrame) => {
+  const header = new Int32Array(ring.header)
+  const slots = new Int16Array(ring.data)
+  const write = Atomics.load(header, HEADER_WRITE)
+  let read = Atomics.load(header, HEADER_READ)
+  while (read < write) {
+    const offset = (read % ring.capacity) * ring.frameSamples
+    onFrame(slots.slice(offset, offset + ring.frameSamples))
+    read += 1
+  }
+  Atomics.store(header, HEADER_READ, read)
+  return Atomics.load(header, HEADER_DROPPED)
+}
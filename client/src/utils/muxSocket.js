@@ -0,0 +1,55 @@
+// Client side of the multiplexed /ws/mux protocol: many voice sessions on one
+// WebSocket. JSON messages carry a `stream` id; audio frames are prefixed with
+// [id length: 1 byte][UTF-8 stream id]. The server delivers output as
+// {type: 'batch', messages: [...]}, which is unpacked here per stream.
+const encoder = new TextEncoder()
+
+export const encodeStreamFrame = (streamId, pcm) => {
+  const id = encoder.encode(streamId)
+  const payload = new Uint8Array(pcm.buffer || pcm, pcm.byteOffset || 0, pcm.byteLength)
+  const frame = new Uint8Array(1 + id.length + payload.length)
+  frame[0] = id.length
+  frame.set(id, 1)
+  frame.set(payload, 1 + id.length)
+  return frame
+}
+
+export class MuxSocket {
+  constructor(url, { onConnectionError } = {}) {
+    this.ws = new WebSocket(url)
+    this.handlers = new Map()  // stream id -> message handler
+    this.onConnectionError = onConnectionError
+    this.ws.onmessage = (event) => {
+      const data = JSON.parse(event.data)
+      if (data.type !== 'batch') {
+        this.onConnectionError?.(data)
+        return
+      }
+      for (const message of data.messages) {
+        this.handlers.get(message.stream)?.(message)
+      }
+    }
+  }
+
+  open(streamId, onMessage) {
+    this.handlers.set(streamId, onMessage)
+    this.send(streamId, { type: 'open' })
+    return {
+      send: (message) => this.send(streamId, message),
+      sendAudio: (pcm) => this.ws.send(encodeStreamFrame(streamId, pcm)),
+      close: () => {
+        this.send(streamId, { type: 'close' })
+        this.handlers.delete(streamId)
+      }
+    }
+  }
+
+  send(streamId, message) {
+    this.ws.send(JSON.stringify({ ...message, stream: streamId }))
+  }
+
+  close() {
+    this.handlers.clear()
+    this.ws.close()
+  }
+}
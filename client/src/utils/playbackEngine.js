@@ -0,0 +1,190 @@
+import { pcm16ToAudioBuffer } from './audioUtils'
+
+const base64ToBytes = (base64Data) => Uint8Array.from(atob(base64Data), c => c.charCodeAt(0))
+
+// Gapless TTS playback on one AudioContext.
+//
+// audio_chunk messages carry a session-wide `seq` and the `turn` they belong
+// to. Chunks are decoded, reordered by seq and held in a small jitter buffer
+// until `targetMs` of audio is queued (or the turn's audio_end arrives), then
+// scheduled back to back on the context clock. If the next chunk arrives
+// after the previous one finished playing, that is an underrun: the engine
+// re-buffers and raises its target for later turns. Acks ({type: 'playback'})
+// report start, underrun and end so the server can pace output and measure
+// turn-to-ear latency.
+export class PlaybackEngine {
+  constructor({ onAck, minTargetMs = 40, maxTargetMs = 300, initialTargetMs = 60 } = {}) {
+    this.onAck = onAck
+    this.minTargetMs = minTargetMs
+    this.maxTargetMs = maxTargetMs
+    this.targetMs = initialTargetMs
+    this.context = null
+    this.turn = null
+    this.playedSeq = 0  // newest chunk scheduled to play; a resuming session replays after it
+    this.session = null  // resume token of the server session playedSeq belongs to
+    this.resetTurn()
+  }
+
+  ensureContext() {
+    if (!this.context) {
+      this.context = new (window.AudioContext || window.webkitAudioContext)()
+    }
+    if (this.context.state === 'suspended') {
+      this.context.resume()
+    }
+    return this.context
+  }
+
+  // A new server session numbers turns and seqs from 1 again: forget the old one
+  reset(session = null) {
+    this.stopTurn()
+    this.playedSeq = 0
+    this.session = session
+    this.resetTurn()
+  }
+
+  // last_seq for resuming `session`; 0 (replay everything retained) if our state is another session's
+  resumeSeq(session) {
+    return session && session === this.session ? this.playedSeq : 0
+  }
+
+  resetTurn(turn = null) {
+    this.turn = turn
+    this.pending = new Map()   // seq -> { buffer, pts } decoded but not yet scheduled
+    this.nextSeq = null        // next seq to schedule
+    this.nextTime = 0          // context time the next chunk starts at
+    this.playing = false
+    this.started = false
+    this.ended = false
+    this.lastSeq = null
+    this.underruns = 0
+    this.sources = new Set()
+  }
+
+  async push(message) {
+    const context = this.ensureContext()
+    if (message.turn !== this.turn) {
+      if (this.turn !== null && message.turn < this.turn) return
+      this.stopTurn()
+      this.resetTurn(message.turn)
+    }
+    if (this.nextSeq === null) this.nextSeq = message.seq
+    if (message.seq < this.nextSeq) return
+
+    let buffer
+    if (message.codec === 'pcm16') {
+      buffer = pcm16ToAudioBuffer(message.payload, message.sample_rate, context)
+    } else {
+      try {
+        buffer = await context.decodeAudioData(base64ToBytes(message.payload).buffer)
+      } catch (error) {
+        console.error('Error decoding audio chunk:', error)
+        buffer = null
+      }
+      if (message.turn !== this.turn) return
+    }
+    this.pending.set(message.seq, { buffer, pts: message.pts_ms })
+    this.pump()
+  }
+
+  // audio_end: no more chunks for this turn, so play whatever is buffered
+  end(message) {
+    if (message.turn !== this.turn) return
+    this.ended = true
+    this.lastSeq = message.last_seq
+    this.pump()
+  }
+
+  // resume_gap: chunks before `seq` were lost while disconnected, so stop waiting for them
+  skipTo(seq) {
+    if (this.nextSeq !== null && seq > this.nextSeq) {
+      this.nextSeq = seq
+      this.pump()
+    }
+  }
+
+  bufferedMs() {
+    let total = 0
+    for (let seq = this.nextSeq; this.pending.has(seq); seq++) {
+      const { buffer } = this.pending.get(seq)
+      total += buffer ? buffer.duration * 1000 : 0
+    }
+    return total
+  }
+
+  pump() {
+    const context = this.context
+    if (!this.playing) {
+      if (this.bufferedMs() < this.targetMs && !this.ended) return
+      this.playing = true
+      this.nextTime = context.currentTime + 0.01
+    } else if (this.pending.has(this.nextSeq) && this.nextTime < context.currentTime) {
+      // The previous chunk already finished: the listener heard a gap
+      const gapMs = (context.currentTime - this.nextTime) * 1000
+      this.underruns += 1
+      this.targetMs = Math.min(this.maxTargetMs, this.targetMs + 20)
+      this.ack('underrun', { seq: this.nextSeq, gap_ms: gapMs })
+      this.playing = false
+      this.pump()
+      return
+    }
+
+    while (this.pending.has(this.nextSeq)) {
+      const { buffer, pts } = this.pending.get(this.nextSeq)
+      this.pending.delete(this.nextSeq)
+      if (buffer) {
+        this.schedule(buffer, this.nextSeq, pts)
+      }
+      this.playedSeq = Math.max(this.playedSeq, this.nextSeq)
+      this.nextSeq += 1
+    }
+  }
+
+  schedule(buffer, seq, pts) {
+    const context = this.context
+    const source = context.createBufferSource()
+    source.buffer = buffer
+    source.connect(context.destination)
+    source.start(this.nextTime)
+    this.sources.add(source)
+    if (!this.started) {
+      this.started = true
+      const startsInMs = Math.max(0, (this.nextTime - context.currentTime) * 1000)
+      setTimeout(() => this.ack('start', { seq, pts_ms: pts || 0 }), startsInMs)
+    }
+    const turn = this.turn
+    source.onended = () => {
+      this.sources.delete(source)
+      if (turn === this.turn && this.ended && seq === this.lastSeq) {
+        this.ack('end', { seq, underruns: this.underruns })
+        if (this.underruns === 0) {
+          this.targetMs = Math.max(this.minTargetMs, this.targetMs - 10)
+        }
+      }
+    }
+    this.nextTime += buffer.duration
+  }
+
+  stopTurn() {
+    for (const source of this.sources) {
+      try {
+        source.stop()
+      } catch (error) {
+        // already stopped
+      }
+    }
+    this.sources = new Set()
+  }
+
+  ack(event, fields) {
+    this.onAck?.({ type: 'playback', event, turn: this.turn, ...fields })
+  }
+
+  close() {
+    this.stopTurn()
+    if (this.context) {
+      this.context.close()
+      this.context = null
+    }
+  }
+}
@@ -0,0 +1,76 @@
+// AudioWorklet capture: downsample the mic to 16 kHz, convert to PCM16 and cut
+// fixed-size frames, all on the audio rendering thread.
+//
+// Frames go into a SharedArrayBuffer ring when one is supplied (see
+// captureRing.js for the layout); otherwise each frame is transferred to the
+// main thread with postMessage.
+
+const HEADER_WRITE = 0
+const HEADER_READ = 1
+const HEADER_DROPPED = 2
+
+class CaptureProcessor extends AudioWorkletProcessor {
+  constructor(options) {
+    super()
+    const { frameSamples, targetRate, ring } = options.processorOptions
+    this.frameSamples = frameSamples
+    this.ratio = sampleRate / targetRate
+    this.frame = new Int16Array(frameSamples)
+    this.frameLength = 0
+    // Box-filter decimator state (fractional input samples per output sample)
+    this.acc = 0
+    this.count = 0
+    this.pos = 0
+    this.capturing = true
+
+    if (ring) {
+      this.header = new Int32Array(ring.header)
+      this.slots = new Int16Array(ring.data)
+      this.capacity = ring.capacity
+    }
+    this.port.onmessage = (event) => {
+      if (event.data === 'stop') this.capturing = false
+    }
+  }
+
+  process(inputs) {
+    const channel = inputs[0] && inputs[0][0]
+    if (!channel) return this.capturing
+    for (let i = 0; i < channel.length; i++) {
+      this.acc += channel[i]
+      this.count += 1
+      this.pos += 1
+      if (this.pos >= this.ratio) {
+        this.pos -= this.ratio
+        const s = Math.max(-1, Math.min(1, this.acc / this.count))
+        this.frame[this.frameLength++] = s < 0 ? s * 0x8000 : s * 0x7FFF
+        this.acc = 0
+        this.count = 0
+        if (this.frameLength === this.frameSamples) {
+          this.emit()
+          this.frameLength = 0
+        }
+      }
+    }
+    return this.capturing
+  }
+
+  emit() {
+    if (!this.header) {
+      const frame = this.frame.slice()
+      this.port.postMessage(frame, [frame.buffer])
+      return
+    }
+    const write = Atomics.load(this.header, HEADER_WRITE)
+    const read = Atomics.load(this.header, HEADER_READ)
+    if (write - read >= this.capacity) {
+      // Reader fell behind a whole ring; drop rather than block the audio thread
+      Atomics.add(this.header, HEADER_DROPPED, 1)
+      return
+    }
+    this.slots.set(this.frame, (write % this.capacity) * this.frameSamples)
+    Atomics.store(this.header, HEADER_WRITE, write + 1)
+  }
+}
+
+registerProcessor('capture-processor', CaptureProcessor)
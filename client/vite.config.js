@@ -7,6 +7,17 @@ export default defineConfig({
     port: 5174,  // Explicitly set to 5174
     host: true,
     strictPort: true, // Don't try other ports if 5174 is taken
+    // Cross-origin isolation enables SharedArrayBuffer for the capture worklet's ring
+    headers: {
+      'Cross-Origin-Opener-Policy': 'same-origin',
+      'Cross-Origin-Embedder-Policy': 'require-corp'
+    }
+  },
+  preview: {
+    headers: {
+      'Cross-Origin-Opener-Policy': 'same-origin',
+      'Cross-Origin-Embedder-Policy': 'require-corp'
+    }
   },
   build: {
     outDir: 'dist',
@@ -3,18 +3,37 @@ import json
 import logging
 import base64
 import asyncio
+from collections import deque
 from typing import Callable, Awaitable, Optional
+from ..providers import ASRProvider, ProviderCapabilities, register_asr
 
 logger = logging.getLogger(__name__)
 
-class AssemblyAIASR:
-    def __init__(self, api_key: str):
+# The async fallback holds a whole utterance in memory; keep at most this much (60 s of 16 kHz PCM16)
+MAX_BUFFERED_BYTES = 60 * 16000 * 2
+
+@register_asr("assemblyai")
+class AssemblyAIASR(ASRProvider):
+    capabilities = ProviderCapabilities(native_streaming=True, partial_results=True)
+    
+    def __init__(self, api_key: str, endpointing_ms: Optional[int] = None):
         self.api_key = api_key
+        self.endpointing_ms = endpointing_ms  # None keeps AssemblyAI's default silence threshold
         self.websocket = None
         self.transcript_callback = None
         self.session = None
         self.is_connected = False
-        self.audio_buffer = []
+        self.audio_buffer = deque()
+        self.buffered = 0
+        self.pending_tasks = set()
+    
+    @classmethod
+    def from_settings(cls, settings) -> "AssemblyAIASR":
+        return cls(settings.asr_api_key, endpointing_ms=settings.asr_endpointing_ms)
+    
+    @classmethod
+    def is_configured(cls, settings) -> bool:
+        return bool(settings.asr_api_key)
         
     async def start_session(self):
         """Start AssemblyAI real-time session with fallback"""
@@ -44,8 +63,15 @@ class AssemblyAIASR:
                         f"wss://api.assemblyai.com/v2/realtime/ws?token={token}&sample_rate=16000"
                     )
                     
+                    if self.endpointing_ms:
+                        await self.websocket.send_str(json.dumps(
+                            {"end_utterance_silence_threshold": self.endpointing_ms}
+                        ))
+                    
                     # Start message listener
-                    asyncio.create_task(self._listen_messages())
+                    task = asyncio.create_task(self._listen_messages())
+                    self.pending_tasks.add(task)
+                    task.add_done_callback(self.pending_tasks.discard)
                     
                     self.is_connected = True
                     logger.info("✅ AssemblyAI real-time WebSocket connected successfully")
@@ -120,7 +146,7 @@ class AssemblyAIASR:
             logger.info("Started AssemblyAI audio stream")
         else:
             # Clear buffer for async Processing
-            self.audio_buffer = []
+            self._clear_buffer()
             logger.info("Ready to buffer audio for async processing")
     
     async def stop_stream(self):
@@ -165,7 +191,7 @@ class AssemblyAIASR:
             await self.transcript_callback("An error occurred while processing your speech.", True)
         
         finally:
-            self.audio_buffer = []
+            self._clear_buffer()
     
     async def process_audio(self, audio_data: bytes):
         """Process audio chunk through AssemblyAI"""
@@ -182,13 +208,29 @@ class AssemblyAIASR:
                 logger.error(f"Error sending audio to AssemblyAI: {e}")
         else:
             self.audio_buffer.append(audio_data)
-            logger.debug(f"Buffered audio chunk: {len(audio_data)} bytes (total: {len(b''.join(self.audio_buffer))})")
+            self.buffered += len(audio_data)
+            while self.buffered > MAX_BUFFERED_BYTES:
+                self.buffered -= len(self.audio_buffer.popleft())
+            logger.debug(f"Buffered audio chunk: {len(audio_data)} bytes (total: {self.buffered})")
+
+    def _clear_buffer(self):
+        self.audio_buffer.clear()
+        self.buffered = 0
+
+    def buffered_bytes(self) -> int:
+        return self.buffered
+
+    def upstream_sockets(self) -> int:
+        return int(bool((self.websocket and not self.websocket.closed) or (self.session and not self.session.closed)))
     
     async def close_session(self):
         """Close AssemblyAI session"""
         self.is_connected = False
+        self._clear_buffer()
         if self.websocket:
             await self.websocket.close()
         if self.session:
             await self.session.close()
+        for task in list(self.pending_tasks):
+            task.cancel()
         logger.info("AssemblyAI session closed")
\ No newline at end of file
@@ -3,16 +3,32 @@ import json
 import logging
 import asyncio
 from typing import Callable, Awaitable, Optional
+from ..providers import ASRProvider, ProviderCapabilities, register_asr
 
 logger = logging.getLogger(__name__)
 
-class DeepgramASR:
-    def __init__(self, api_key: str):
+@register_asr("deepgram")
+class DeepgramASR(ASRProvider):
+    capabilities = ProviderCapabilities(native_streaming=True, partial_results=True, compressed_input=True)
+    
+    def __init__(self, api_key: str, url: str = "wss://api.deepgram.com/v1/listen", endpointing_ms: int = 100):
         self.api_key = api_key
+        self.url = url
+        self.endpointing_ms = endpointing_ms
         self.websocket: Optional[aiohttp.ClientWebSocketResponse] = None
         self.transcript_callback: Optional[Callable[[str, bool], Awaitable[None]]] = None
         self.session: Optional[aiohttp.ClientSession] = None
         self.is_connected = False
+        self.pending_tasks = set()
+    
+    @classmethod
+    def from_settings(cls, settings) -> "DeepgramASR":
+        return cls(settings.asr_api_key, url=settings.deepgram_url,
+                   endpointing_ms=settings.asr_endpointing_ms or 100)
+    
+    @classmethod
+    def is_configured(cls, settings) -> bool:
+        return bool(settings.asr_api_key)
         
     async def start_session(self):
         """Start Deepgram real-time session"""
@@ -23,13 +39,13 @@ class DeepgramASR:
             
             # Connect to Deepgram real-time WebSocket
             self.websocket = await self.session.ws_connect(
-                "wss://api.deepgram.com/v1/listen",
+                self.url,
                 params={
                     "encoding": "linear16",
                     "sample_rate": 16000,
                     "channels": 1,
                     "interim_results": "true",
-                    "endpointing": "100",
+                    "endpointing": str(self.endpointing_ms),
                     "punctuate": "true",
                     "model": "general",
                     "language": "en-US"
@@ -41,7 +57,9 @@ class DeepgramASR:
             logger.info("✅ Deepgram real-time WebSocket connected successfully")
             
             # Start listening for messages
-            asyncio.create_task(self._listen_messages())
+            task = asyncio.create_task(self._listen_messages())
+            self.pending_tasks.add(task)
+            task.add_done_callback(self.pending_tasks.discard)
             
         except Exception as e:
             logger.error(f"❌ Deepgram session error: {e}")
@@ -105,6 +123,14 @@ class DeepgramASR:
             except Exception as e:
                 logger.error(f"Error closing Deepgram stream: {e}")
     
+    async def keepalive(self):
+        """Stop Deepgram timing out the socket while no audio is sent"""
+        if self.websocket and self.is_connected:
+            try:
+                await self.websocket.send_str(json.dumps({"type": "KeepAlive"}))
+            except Exception as e:
+                logger.error(f"Error sending Deepgram keepalive: {e}")
+    
     async def process_audio(self, audio_data: bytes):
         """Process audio chunk through Deepgram"""
         if self.websocket and self.is_connected:
@@ -113,6 +139,9 @@ class DeepgramASR:
             except Exception as e:
                 logger.error(f"Error sending audio to Deepgram: {e}")
     
+    def upstream_sockets(self) -> int:
+        return int(bool((self.websocket and not self.websocket.closed) or (self.session and not self.session.closed)))
+    
     async def close_session(self):
         """Close Deepgram session"""
         self.is_connected = False
@@ -120,4 +149,6 @@ class DeepgramASR:
             await self.websocket.close()
         if self.session:
             await self.session.close()
+        for task in list(self.pending_tasks):
+            task.cancel()
         logger.info("Deepgram session closed")
\ No newline at end of file
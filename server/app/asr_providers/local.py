@@ -0,0 +1,101 @@
+import asyncio
+import importlib.util
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from ..audio_executor import audio_executor
+from ..providers import ASRProvider, ProviderCapabilities, register_asr
+
+logger = logging.getLogger(__name__)
+
+
+@register_asr("local")
+class LocalASR(ASRProvider):
+    """On-box Whisper recognition via faster-whisper on the audio executor.
+
+    Audio is segmented with an energy gate (batched with other sessions'
+    frames on the executor); each utterance is transcribed in a worker
+    process once `endpointing_ms` of silence follows it. No partial
+    results are produced.
+    """
+
+    capabilities = ProviderCapabilities(native_streaming=False, partial_results=False, local=True)
+
+    def __init__(self, model_name: str = "tiny.en", endpointing_ms: int = 500, speech_threshold: int = 500):
+        self.model_name = model_name
+        self.endpointing_ms = endpointing_ms
+        self.speech_threshold = speech_threshold
+        self.transcript_callback: Optional[Callable[[str, bool], Awaitable[None]]] = None
+        self.is_connected = False
+        self.is_streaming = False
+        self.utterance: List[bytes] = []
+        self.silence_ms = 0.0
+        self.pending_tasks = set()
+
+    @classmethod
+    def from_settings(cls, settings) -> "LocalASR":
+        return cls(settings.local_asr_model, endpointing_ms=settings.asr_endpointing_ms or 500)
+
+    @classmethod
+    def is_configured(cls, settings) -> bool:
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    async def start_session(self):
+        """Start local session"""
+        self.is_connected = True
+        logger.info(f"✅ Local ASR session started (model={self.model_name})")
+
+    async def start_stream(self):
+        """Start audio streaming"""
+        self.is_streaming = True
+        self.utterance = []
+        self.silence_ms = 0.0
+
+    async def stop_stream(self):
+        """Stop audio streaming and transcribe any buffered speech"""
+        self._flush()
+        self.is_streaming = False
+
+    async def process_audio(self, audio_data: bytes):
+        """Buffer speech until the endpoint, then transcribe in the pool"""
+        if not (self.is_connected and self.is_streaming):
+            return
+        peak = await audio_executor.submit("peak", audio_data)
+        if peak > self.speech_threshold:
+            self.utterance.append(audio_data)
+            self.silence_ms = 0.0
+        elif self.utterance:
+            self.utterance.append(audio_data)
+            self.silence_ms += len(audio_data) / 32
+            if self.silence_ms >= self.endpointing_ms:
+                self._flush()
+
+    def buffered_bytes(self) -> int:
+        return sum(len(chunk) for chunk in self.utterance)
+
+    async def close_session(self):
+        """Close local session; the shared executor stays up for other sessions"""
+        self.is_connected = False
+        self.is_streaming = False
+        self.utterance = []
+        for task in list(self.pending_tasks):
+            task.cancel()
+        logger.info("Local ASR session closed")
+
+    def _flush(self):
+        if not self.utterance:
+            return
+        pcm = b"".join(self.utterance)
+        self.utterance = []
+        self.silence_ms = 0.0
+        task = asyncio.create_task(self._transcribe(pcm))
+        self.pending_tasks.add(task)
+        task.add_done_callback(self.pending_tasks.discard)
+
+    async def _transcribe(self, pcm: bytes):
+        try:
+            transcript = await audio_executor.submit("transcribe", pcm, model=self.model_name)
+            if transcript and self.transcript_callback and self.is_connected:
+                await self.transcript_callback(transcript, True)
+        except Exception as e:
+            logger.error(f"Local ASR transcription error: {e}")
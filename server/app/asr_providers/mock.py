@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, List, Optional
+
+from ..mock import FailureInjector, LatencyModel
+from ..providers import ASRProvider, register_asr
+from ..utils import is_speech
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCRIPT = [
+    "Hello there",
+    "How are you doing today",
+    "What can you help me with",
+    "Thanks for your help",
+    "Goodbye",
+]
+
+
+@register_asr("mock")
+class MockASR(ASRProvider):
+    """Offline stand-in for DeepgramASR.
+
+    Segments incoming PCM16 with a simple energy gate. While speech is
+    flowing it emits partial transcripts that reveal the next scripted
+    utterance word by word; once `endpointing_ms` of silence follows,
+    the full utterance is delivered as a final after a sampled latency.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, latency: str = "fixed:0", seed: int = 0,
+                 failure_rate: float = 0.0, script: Optional[List[str]] = None,
+                 ms_per_word: int = 300, endpointing_ms: int = 300, speech_threshold: int = 500):
+        self.api_key = api_key
+        rng = random.Random(seed)
+        self.latency = LatencyModel.parse(latency, rng)
+        self.failures = FailureInjector(failure_rate, rng)
+        self.script = script or DEFAULT_SCRIPT
+        self.ms_per_word = ms_per_word
+        self.endpointing_ms = endpointing_ms
+        self.speech_threshold = speech_threshold
+        self.transcript_callback: Optional[Callable[[str, bool], Awaitable[None]]] = None
+        self.is_connected = False
+        self.is_streaming = False
+
+        self.utterance_index = 0
+        self.speech_ms = 0.0
+        self.silence_ms = 0.0
+        self.words_sent = 0
+        self.pending_tasks = set()
+
+    @classmethod
+    def from_settings(cls, settings) -> "MockASR":
+        return cls(latency=settings.mock_asr_latency, seed=settings.mock_seed,
+                   failure_rate=settings.mock_failure_rate,
+                   endpointing_ms=settings.asr_endpointing_ms or 300)
+
+    async def start_session(self):
+        """Start mock session"""
+        self.failures.maybe_fail("ASR session start")
+        await self.latency.wait()
+        self.is_connected = True
+        logger.info("✅ Mock ASR session started")
+
+    def set_callback(self, callback: Callable[[str, bool], Awaitable[None]]):
+        """Set callback for transcript results"""
+        self.transcript_callback = callback
+
+    async def start_stream(self):
+        """Start audio streaming"""
+        self.is_streaming = True
+        self._reset_utterance()
+
+    async def stop_stream(self):
+        """Stop audio streaming, finalising any utterance in progress"""
+        if self.speech_ms > 0:
+            self._schedule_final()
+        self.is_streaming = False
+
+    async def process_audio(self, audio_data: bytes):
+        """Feed one PCM16 frame through the mock recogniser"""
+        if not (self.is_connected and self.is_streaming):
+            return
+        self.failures.maybe_fail("ASR audio")
+
+        frame_ms = len(audio_data) / 32  # 16 kHz * 2 bytes per sample
+        if is_speech(audio_data, self.speech_threshold):
+            self.speech_ms += frame_ms
+            self.silence_ms = 0.0
+            words = self._current_words()
+            revealed = min(len(words), 1 + int(self.speech_ms // self.ms_per_word))
+            if revealed > self.words_sent and self.transcript_callback:
+                self.words_sent = revealed
+                await self.transcript_callback(" ".join(words[:revealed]), False)
+        elif self.speech_ms > 0:
+            self.silence_ms += frame_ms
+            if self.silence_ms >= self.endpointing_ms:
+                self._schedule_final()
+
+    async def close_session(self):
+        """Close mock session"""
+        self.is_connected = False
+        self.is_streaming = False
+        for task in list(self.pending_tasks):
+            task.cancel()
+        logger.info("Mock ASR session closed")
+
+    def _current_words(self) -> List[str]:
+        return self.script[self.utterance_index % len(self.script)].split()
+
+    def _reset_utterance(self):
+        self.speech_ms = 0.0
+        self.silence_ms = 0.0
+        self.words_sent = 0
+
+    def _schedule_final(self):
+        transcript = " ".join(self._current_words())
+        self.utterance_index += 1
+        self._reset_utterance()
+        task = asyncio.create_task(self._deliver_final(transcript))
+        self.pending_tasks.add(task)
+        task.add_done_callback(self.pending_tasks.discard)
+
+    async def _deliver_final(self, transcript: str):
+        await self.latency.wait()
+        if self.transcript_callback and self.is_connected:
+            await self.transcript_callback(transcript, True)
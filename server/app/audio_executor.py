@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from . import audio_ops
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the audio executor cannot accept more work in time"""
+
+
+class TaskTiming(NamedTuple):
+    queue_s: float    # submit -> batch dispatched
+    compute_s: float  # time spent in the op itself (worker-side)
+    total_s: float    # submit -> result available
+    batch_size: int
+
+
+class _Task:
+    __slots__ = ("data", "future", "submitted", "dispatched")
+
+    def __init__(self, data: bytes, future: asyncio.Future):
+        self.data = data
+        self.future = future
+        self.submitted = time.perf_counter()
+        self.dispatched = 0.0
+
+
+class _SegmentPool:
+    """Reusable shared memory segments in power-of-two size classes"""
+
+    MIN_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._free: Dict[int, List[shared_memory.SharedMemory]] = {}
+        self._size_class: Dict[str, int] = {}
+
+    def acquire(self, size: int) -> shared_memory.SharedMemory:
+        size_class = max(self.MIN_SIZE, 1 << max(0, size - 1).bit_length())
+        free = self._free.get(size_class)
+        if free:
+            return free.pop()
+        segment = shared_memory.SharedMemory(create=True, size=size_class)
+        self._size_class[segment.name] = size_class
+        return segment
+
+    def release(self, segment: shared_memory.SharedMemory):
+        self._free.setdefault(self._size_class[segment.name], []).append(segment)
+
+    def close(self):
+        for segments in self._free.values():
+            for segment in segments:
+                segment.close()
+                segment.unlink()
+        self._free.clear()
+        self._size_class.clear()
+
+
+class _OpStats:
+    def __init__(self):
+        self.tasks = 0
+        self.batches = 0
+        self.errors = 0
+        self.queue_s = 0.0
+        self.compute_s = 0.0
+        self.recent_total_s: Deque[float] = deque(maxlen=1024)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self.recent_total_s)
+
+        def pct(p: float) -> Optional[float]:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000 if recent else None
+
+        return {
+            "tasks": self.tasks,
+            "batches": self.batches,
+            "errors": self.errors,
+            "avg_batch_size": self.tasks / self.batches if self.batches else 0.0,
+            "avg_queue_ms": self.queue_s / self.tasks * 1000 if self.tasks else 0.0,
+            "avg_compute_ms_per_task": self.compute_s / self.tasks * 1000 if self.tasks else 0.0,
+            "p50_total_ms": pct(0.50),
+            "p95_total_ms": pct(0.95),
+        }
+
+
+class AudioComputeExecutor:
+    """Process pool for CPU-bound audio work that must stay off the event loop.
+
+    Tasks for the same op and parameters that arrive within `batch_window_ms`
+    (typically frames from many sessions) are coalesced into one worker call.
+    Frames travel through reusable shared memory segments rather than being
+    pickled. At most `max_pending` tasks may be outstanding; further submits
+    wait up to `submit_timeout` and then raise ExecutorSaturated.
+
+    With ``workers=0`` ops run inline on the event loop, which is handy for
+    tests and tiny deployments.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 256, batch_window_ms: float = 2.0,
+                 max_batch: int = 64, submit_timeout: float = 0.05):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.submit_timeout = submit_timeout
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._segments = _SegmentPool()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._queues: Dict[tuple, List[_Task]] = {}
+        self._timers: Dict[tuple, asyncio.TimerHandle] = {}
+        self._batches = set()
+        self._stats: Dict[str, _OpStats] = {}
+        self._in_flight = 0
+        self._rejected = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> "AudioComputeExecutor":
+        return cls(
+            workers=settings.audio_executor_workers,
+            max_pending=settings.audio_executor_max_pending,
+            batch_window_ms=settings.audio_executor_batch_ms,
+            max_batch=settings.audio_executor_max_batch
+        )
+
+    def start(self):
+        """Bind to the running loop and create the worker pool if needed"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._queues = {}
+            self._timers = {}
+        if self.workers and self._pool is None:
+            # Workers must share our resource tracker so segment lifetimes stay with us
+            resource_tracker.ensure_running()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Audio executor started with {self.workers} worker processes")
+
+    async def warm(self):
+        """Spawn every worker process now rather than on the first audio frame"""
+        self.start()
+        if self._pool:
+            await asyncio.gather(*[
+                self._loop.run_in_executor(self._pool, audio_ops.warm) for _ in range(self.workers)
+            ])
+
+    async def shutdown(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        for key in list(self._queues):
+            self._dispatch(key)
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        self._segments.close()
+        logger.info("Audio executor stopped")
+
+    async def submit(self, op: str, data: bytes, **params) -> Any:
+        """Run `op` on one PCM16 buffer; returns a scalar or PCM16 bytes"""
+        result, _ = await self.submit_timed(op, data, **params)
+        return result
+
+    async def submit_timed(self, op: str, data: bytes, **params) -> Tuple[Any, TaskTiming]:
+        """Like submit, but also returns the task's TaskTiming"""
+        if op not in audio_ops.OPS:
+            raise ValueError(f"Unknown audio op: {op}")
+        self.start()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.submit_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise ExecutorSaturated(f"Audio executor saturated ({self.max_pending} tasks pending)")
+
+        self._in_flight += 1
+        try:
+            task = _Task(data[: len(data) - (len(data) % 2)], self._loop.create_future())
+            key = (op, tuple(sorted(params.items())))
+            queue = self._queues.setdefault(key, [])
+            queue.append(task)
+
+            if len(queue) >= min(self.max_batch, audio_ops.OPS[op].max_batch):
+                self._dispatch(key)
+            elif len(queue) == 1:
+                self._timers[key] = self._loop.call_later(self.batch_window, self._dispatch, key)
+
+            return await task.future
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "max_pending": self.max_pending,
+            "rejected": self._rejected,
+            "ops": {op: stats.snapshot() for op, stats in self._stats.items()},
+        }
+
+    def _dispatch(self, key: tuple):
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        tasks = self._queues.pop(key, None)
+        if not tasks:
+            return
+        batch = self._loop.create_task(self._run(key, tasks))
+        self._batches.add(batch)
+        batch.add_done_callback(self._batches.discard)
+
+    async def _run(self, key: tuple, tasks: List[_Task]):
+        op_name, param_items = key
+        params = dict(param_items)
+        stats = self._stats.setdefault(op_name, _OpStats())
+        dispatched = time.perf_counter()
+        for task in tasks:
+            task.dispatched = dispatched
+
+        try:
+            if self._pool is None:
+                results, compute_s = audio_ops.run_inline(op_name, [task.data for task in tasks], params)
+            else:
+                results, compute_s = await self._run_in_pool(op_name, tasks, params)
+        except Exception as e:
+            stats.errors += 1
+            for task in tasks:
+                if not task.future.done():
+                    task.future.set_exception(e)
+            return
+
+        stats.batches += 1
+        stats.compute_s += compute_s
+        done = time.perf_counter()
+        for task, result in zip(tasks, results):
+            timing = TaskTiming(task.dispatched - task.submitted, compute_s / len(tasks),
+                                done - task.submitted, len(tasks))
+            stats.tasks += 1
+            stats.queue_s += timing.queue_s
+            stats.recent_total_s.append(timing.total_s)
+            if not task.future.done():
+                task.future.set_result((result, timing))
+
+    async def _run_in_pool(self, op_name: str, tasks: List[_Task], params: dict):
+        op = audio_ops.OPS[op_name]
+        in_total = sum(len(task.data) for task in tasks)
+        out_total = sum(op.out_bytes(len(task.data), params) for task in tasks)
+        segment = self._segments.acquire(in_total + out_total)
+        try:
+            spans = []
+            cursor = 0
+            for task in tasks:
+                segment.buf[cursor:cursor + len(task.data)] = task.data
+                spans.append((cursor, len(task.data)))
+                cursor += len(task.data)
+
+            results, compute_s = await self._loop.run_in_executor(
+                self._pool, audio_ops.run_batch, op_name, segment.name, spans, in_total, out_total, params
+            )
+            if op.output == "pcm16":
+                results = [bytes(segment.buf[offset:offset + length]) for offset, length in results]
+            return results, compute_s
+        finally:
+            self._segments.release(segment)
+
+
+audio_executor = AudioComputeExecutor.from_settings(settings)
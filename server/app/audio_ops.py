@@ -0,0 +1,177 @@
+"""CPU-bound audio kernels run inside AudioComputeExecutor worker processes.
+
+Each op receives every frame of a batch (possibly from many sessions) at
+once, so equal-length frames can be stacked and processed in a single
+vectorized numpy call. Ops return either one scalar per frame or one
+PCM16 array per frame (written back to shared memory by the executor).
+"""
+import math
+import time
+from multiprocessing import shared_memory, util
+from typing import Callable, Dict, List, NamedTuple
+
+import numpy as np
+
+
+class AudioOp(NamedTuple):
+    fn: Callable[[List[np.ndarray], dict], list]
+    output: str                            # "scalar" or "pcm16"
+    out_bytes: Callable[[int, dict], int]  # PCM16 output capacity for an input size
+    max_batch: int = 64
+
+
+def _stack(frames: List[np.ndarray]):
+    """2D view of the batch if all frames are the same length, else None"""
+    if len(frames) > 1 and len({len(frame) for frame in frames}) == 1:
+        return np.stack(frames)
+    return None
+
+
+def pcm16_rms(frames: List[np.ndarray], params: dict) -> List[float]:
+    stacked = _stack(frames)
+    if stacked is not None:
+        values = np.sqrt(np.mean(stacked.astype(np.float32) ** 2, axis=1))
+        return values.tolist()
+    return [float(np.sqrt(np.mean(frame.astype(np.float32) ** 2))) if len(frame) else 0.0 for frame in frames]
+
+
+def pcm16_peak(frames: List[np.ndarray], params: dict) -> List[int]:
+    stacked = _stack(frames)
+    if stacked is not None:
+        return np.abs(stacked.astype(np.int32)).max(axis=1).tolist()
+    return [int(np.abs(frame.astype(np.int32)).max()) if len(frame) else 0 for frame in frames]
+
+
+def _resample_positions(length: int, src_rate: int, dst_rate: int):
+    out_length = int(math.ceil(length * dst_rate / src_rate))
+    positions = np.arange(out_length, dtype=np.float64) * (src_rate / dst_rate)
+    left = np.minimum(positions.astype(np.int64), length - 1)
+    right = np.minimum(left + 1, length - 1)
+    weight = (positions - left).astype(np.float32)
+    return left, right, weight
+
+
+def resample_pcm16(frames: List[np.ndarray], params: dict) -> List[np.ndarray]:
+    """Linear-interpolation resampling of PCM16 from src_rate to dst_rate"""
+    src_rate, dst_rate = params["src_rate"], params["dst_rate"]
+    if src_rate == dst_rate:
+        return [frame.copy() for frame in frames]
+
+    stacked = _stack(frames)
+    if stacked is not None:
+        left, right, weight = _resample_positions(stacked.shape[1], src_rate, dst_rate)
+        data = stacked.astype(np.float32)
+        out = data[:, left] * (1 - weight) + data[:, right] * weight
+        return list(np.clip(np.rint(out), -32768, 32767).astype(np.int16))
+
+    results = []
+    for frame in frames:
+        if not len(frame):
+            results.append(frame.copy())
+            continue
+        left, right, weight = _resample_positions(len(frame), src_rate, dst_rate)
+        data = frame.astype(np.float32)
+        out = data[left] * (1 - weight) + data[right] * weight
+        results.append(np.clip(np.rint(out), -32768, 32767).astype(np.int16))
+    return results
+
+
+def _resample_out_bytes(in_bytes: int, params: dict) -> int:
+    return 2 * int(math.ceil(in_bytes / 2 * params["dst_rate"] / params["src_rate"]))
+
+
+# Whisper models are loaded lazily, once per worker process
+_whisper_models: Dict[str, object] = {}
+
+
+def whisper_transcribe(frames: List[np.ndarray], params: dict) -> List[str]:
+    """Transcribe whole utterances with faster-whisper (optional dependency)"""
+    model_name = params["model"]
+    if model_name not in _whisper_models:
+        from faster_whisper import WhisperModel
+        _whisper_models[model_name] = WhisperModel(model_name, device="cpu", compute_type="int8")
+    model = _whisper_models[model_name]
+
+    results = []
+    for frame in frames:
+        segments, _ = model.transcribe(frame.astype(np.float32) / 32768.0, language="en",
+                                       beam_size=1, vad_filter=False)
+        results.append(" ".join(segment.text.strip() for segment in segments).strip())
+    return results
+
+
+OPS: Dict[str, AudioOp] = {
+    "rms": AudioOp(pcm16_rms, "scalar", lambda n, p: 0),
+    "peak": AudioOp(pcm16_peak, "scalar", lambda n, p: 0),
+    "resample": AudioOp(resample_pcm16, "pcm16", _resample_out_bytes),
+    "transcribe": AudioOp(whisper_transcribe, "scalar", lambda n, p: 0, max_batch=1),
+}
+
+
+# Shared memory segments this worker has attached to, by name
+_segments: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    segment = _segments.get(name)
+    if segment is None:
+        if not _segments:
+            # Pool workers exit through multiprocessing, which skips atexit but runs finalizers
+            util.Finalize(None, close_segments, exitpriority=10)
+        segment = _segments[name] = shared_memory.SharedMemory(name=name)
+    return segment
+
+
+def close_segments():
+    """Detach from every cached segment; the parent process owns and unlinks them"""
+    for segment in _segments.values():
+        try:
+            segment.close()
+        except BufferError:
+            pass  # a view is still alive; the mapping goes away with the process
+    _segments.clear()
+
+
+def run_batch(op_name: str, segment_name: str, spans: List[tuple], out_offset: int, out_capacity: int,
+              params: dict):
+    """Worker entry point: run one op over a batch laid out in shared memory.
+
+    Inputs are read in place from `spans` (offset, length) in the segment;
+    PCM16 outputs are written back after `out_offset` and returned as spans,
+    so audio never crosses the process boundary through pickle.
+    """
+    started = time.perf_counter()
+    op = OPS[op_name]
+    buf = _attach(segment_name).buf
+    frames = [np.frombuffer(buf, dtype=np.int16, count=length // 2, offset=offset) for offset, length in spans]
+    try:
+        results = op.fn(frames, params)
+        if op.output == "pcm16":
+            out_spans = []
+            cursor = out_offset
+            for result in results:
+                if cursor + result.nbytes > out_offset + out_capacity:
+                    raise ValueError(f"{op_name} output exceeds reserved capacity")
+                np.ndarray(len(result), dtype=np.int16, buffer=buf, offset=cursor)[:] = result
+                out_spans.append((cursor, result.nbytes))
+                cursor += result.nbytes
+            results = out_spans
+    finally:
+        # Views must be released before the segment can be closed or resized
+        del frames
+    return results, time.perf_counter() - started
+
+
+def warm() -> bool:
+    """No-op used to spawn and import workers before the first real task"""
+    return True
+
+
+def run_inline(op_name: str, frames: List[bytes], params: dict):
+    """Same as run_batch but in-process on plain bytes (no worker pool)"""
+    started = time.perf_counter()
+    op = OPS[op_name]
+    results = op.fn([np.frombuffer(frame, dtype=np.int16) for frame in frames], params)
+    if op.output == "pcm16":
+        results = [result.astype(np.int16, copy=False).tobytes() for result in results]
+    return results, time.perf_counter() - started
@@ -0,0 +1,369 @@
+import asyncio
+import base64
+import io
+import json
+import logging
+import re
+import secrets
+import time
+import wave
+import zipfile
+from typing import AsyncGenerator, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from .config import settings
+from .providers import ProviderCapabilities, ProviderSet
+from .transcode import OutputFormat, TTSTranscoder, negotiate_output_format
+
+logger = logging.getLogger(__name__)
+
+
+class BatchItem(BaseModel):
+    text: str = Field(min_length=1)
+    voice: Optional[str] = None
+    id: Optional[str] = None
+
+
+class BatchTTSRequest(BaseModel):
+    items: List[BatchItem] = Field(min_length=1)
+    voice: str = "en_us_001"
+    audio_format: dict = {}
+    output: Literal["ndjson", "zip"] = "ndjson"
+
+
+class JobPrompt(BaseModel):
+    prompt: str = Field(min_length=1)
+    voice: Optional[str] = None
+    id: Optional[str] = None
+
+
+class BatchJobRequest(BaseModel):
+    prompts: List[JobPrompt] = Field(min_length=1)
+    voice: str = "en_us_001"
+    audio_format: dict = {}
+
+
+def batch_output_format(requested: dict, capabilities: ProviderCapabilities) -> OutputFormat:
+    """Batch files are whole WAV or MP3 files.
+
+    MP3 is the provider's own output passed through, so it is only offered
+    when the provider emits MP3; otherwise, like Opus (no container here),
+    it becomes WAV.
+    """
+    codec = str(requested.get("codec", "pcm16")).lower()
+    if codec == "opus" or (codec == "mp3" and capabilities.audio_format != "mp3"):
+        requested = {**requested, "codec": "pcm16"}
+    return negotiate_output_format({"codec": "pcm16", **requested})
+
+
+def _extension(audio_format: OutputFormat) -> str:
+    return "mp3" if audio_format.passthrough else "wav"
+
+
+def _mime_type(audio_format: OutputFormat) -> str:
+    return "audio/mpeg" if audio_format.passthrough else "audio/wav"
+
+
+def _wav(pcm: bytes, sample_rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class BatchStats:
+    """Worker-wide batch TTS / job counters for /metrics"""
+
+    def __init__(self):
+        self.items = 0
+        self.deduplicated = 0
+        self.rendered = 0
+        self.failed = 0
+        self.jobs = 0
+        self.render_s = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "items": self.items,
+            "deduplicated": self.deduplicated,
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "jobs": self.jobs,
+            "avg_render_ms": self.render_s / self.rendered * 1000 if self.rendered else None,
+        }
+
+
+class BatchRenderer:
+    """Renders many texts through one TTS (and LLM) provider instance.
+
+    Identical (text, voice) pairs are synthesized once. Every render holds
+    a slot of `limiter`, which is shared by all batch requests and jobs in
+    the worker, so bulk work never takes more than that many provider
+    requests at a time away from realtime sessions.
+    """
+
+    def __init__(self, providers: ProviderSet, audio_format: OutputFormat, limiter: asyncio.Semaphore,
+                 stats: BatchStats):
+        self.providers = providers
+        self.audio_format = audio_format
+        self.limiter = limiter
+        self.stats = stats
+        self.tts = None
+        self.llm = None
+
+    async def __aenter__(self) -> "BatchRenderer":
+        self.tts = self.providers.create_tts()
+        if self.tts is None:
+            raise RuntimeError("TTS provider not available")
+        if self.audio_format.passthrough and self.tts.capabilities.audio_format != "mp3":
+            raise RuntimeError(f"{type(self.tts).__name__} emits {self.tts.capabilities.audio_format}, "
+                               f"not MP3; request WAV instead")
+        await self.tts.start_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.tts.close_session()
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        stream = self.tts.stream_tts(text, voice=voice, output_format=self.audio_format)
+        if self.audio_format.passthrough:
+            audio = b"".join([chunk async for chunk in stream if chunk])
+        else:
+            transcoder = TTSTranscoder(self.audio_format, self.tts.capabilities.sample_rate)
+            pcm = b"".join([frame async for frame in transcoder.frames(stream)])
+            audio = _wav(pcm, self.audio_format.sample_rate) if pcm else b""
+        if not audio:
+            raise RuntimeError("TTS produced no audio")
+        return audio
+
+    async def reply(self, prompt: str) -> str:
+        if self.llm is None:
+            self.llm = self.providers.create_llm()
+        return await self.llm.process_query(prompt)
+
+    async def _render(self, item: dict, ask_llm: bool) -> dict:
+        async with self.limiter:
+            started = time.perf_counter()
+            try:
+                if ask_llm:
+                    item["text"] = await self.reply(item["prompt"])
+                item["audio"] = await self.synthesize(item["text"], item["voice"])
+                self.stats.rendered += 1
+                self.stats.render_s += time.perf_counter() - started
+            except Exception as e:
+                logger.warning(f"📦 Batch item {item['index']} failed: {e}")
+                item["error"] = str(e)
+                self.stats.failed += 1
+        return item
+
+    async def run(self, items: List[dict], ask_llm: bool = False) -> AsyncGenerator[dict, None]:
+        """Yield each item (with `audio` or `error`) as soon as it is rendered.
+
+        Items are dicts with `index`, `id`, `voice` and `text` (or `prompt`
+        when `ask_llm`); duplicates come back with `duplicate_of` set to the
+        index of the item that was actually rendered.
+        """
+        self.stats.items += len(items)
+        source = "prompt" if ask_llm else "text"
+        first: Dict[tuple, dict] = {}
+        duplicates: Dict[int, List[dict]] = {}
+        for item in items:
+            key = (item[source].strip(), item["voice"])
+            if key in first:
+                duplicates.setdefault(first[key]["index"], []).append(item)
+                self.stats.deduplicated += 1
+            else:
+                first[key] = item
+        tasks = [asyncio.create_task(self._render(item, ask_llm)) for item in first.values()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                yield item
+                for duplicate in duplicates.get(item["index"], []):
+                    duplicate.update({key: item.get(key) for key in ("text", "error")},
+                                     duplicate_of=item["index"], audio=item.get("audio"))
+                    yield duplicate
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def batch_items(entries, default_voice: str, source: str) -> List[dict]:
+    return [{
+        "index": index,
+        "id": entry.id or str(index),
+        "voice": entry.voice or default_voice,
+        source: getattr(entry, source),
+    } for index, entry in enumerate(entries)]
+
+
+def result_record(item: dict, audio_format: OutputFormat, include_audio: bool = True) -> dict:
+    """JSON view of a rendered item (one NDJSON line / manifest entry)"""
+    record = {key: item[key] for key in ("index", "id", "voice", "prompt", "text", "duplicate_of", "error")
+              if item.get(key) is not None}
+    audio = item.get("audio")
+    if audio:
+        record.update(audio_format.describe(), mime_type=_mime_type(audio_format), bytes=len(audio))
+        if include_audio:
+            record["audio"] = base64.b64encode(audio).decode("utf-8")
+    return record
+
+
+def ndjson_line(item: dict, audio_format: OutputFormat) -> bytes:
+    return (json.dumps(result_record(item, audio_format)) + "\n").encode("utf-8")
+
+
+async def stream_batch(renderer: BatchRenderer, items: List[dict]) -> AsyncGenerator[bytes, None]:
+    """NDJSON body for /tts/batch: one line per item, in completion order"""
+    async with renderer:
+        async for item in renderer.run(items):
+            yield ndjson_line(item, renderer.audio_format)
+
+
+async def render_batch(renderer: BatchRenderer, items: List[dict]) -> List[dict]:
+    async with renderer:
+        return [item async for item in renderer.run(items)]
+
+
+def zip_archive(items: List[dict], audio_format: OutputFormat) -> bytes:
+    """One audio file per rendered item plus manifest.json, ordered by index"""
+    buffer = io.BytesIO()
+    files: Dict[int, str] = {}
+    manifest = []
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:  # audio does not deflate
+        for item in sorted(items, key=lambda item: item["index"]):
+            record = result_record(item, audio_format, include_audio=False)
+            if item.get("audio") is not None:
+                owner = item.get("duplicate_of", item["index"])
+                if owner not in files:
+                    safe_id = re.sub(r"[^A-Za-z0-9._-]", "_", item["id"])[:64]
+                    files[owner] = f"{item['index']:04d}_{safe_id}.{_extension(audio_format)}"
+                    archive.writestr(files[owner], item["audio"])
+                record["file"] = files[owner]
+            manifest.append(record)
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+    return buffer.getvalue()
+
+
+class BatchJob:
+    """A background LLM+TTS job over many prompts"""
+
+    def __init__(self, items: List[dict], audio_format: OutputFormat):
+        self.id = secrets.token_urlsafe(12)
+        self.items = items
+        self.audio_format = audio_format
+        self.results: List[dict] = []
+        self.bytes = 0  # rendered audio held for the results (duplicates share their original's)
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def describe(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.items),
+            "completed": len(self.results),
+            "failed": sum(1 for item in self.results if item.get("error")),
+            "bytes": self.bytes,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobStore:
+    """In-memory batch jobs.
+
+    Finished jobs are kept for `ttl_s` for their results, and the audio
+    held by all jobs is capped at `max_bytes`: past it the oldest finished
+    jobs are dropped early, new jobs are refused, and a running job that
+    would still exceed it fails.
+    """
+
+    def __init__(self, limiter: asyncio.Semaphore, stats: BatchStats, max_jobs: int = 100,
+                 ttl_s: float = 3600.0, max_bytes: int = 256 * 1024 * 1024):
+        self.limiter = limiter
+        self.stats = stats
+        self.max_jobs = max_jobs
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.jobs: Dict[str, BatchJob] = {}
+
+    @classmethod
+    def from_settings(cls, settings, limiter: asyncio.Semaphore, stats: BatchStats) -> "JobStore":
+        return cls(limiter, stats, max_jobs=settings.batch_max_jobs, ttl_s=settings.batch_job_ttl_s,
+                   max_bytes=int(settings.batch_job_store_mb * 1024 * 1024))
+
+    def stored_bytes(self) -> int:
+        return sum(job.bytes for job in self.jobs.values())
+
+    def submit(self, providers: ProviderSet, items: List[dict], audio_format: OutputFormat) -> BatchJob:
+        self._purge()
+        if len(self.jobs) >= self.max_jobs:
+            raise OverflowError(f"Too many batch jobs (max {self.max_jobs})")
+        if self.stored_bytes() >= self.max_bytes:
+            raise OverflowError(f"Batch job results are full ({self.max_bytes // (1024 * 1024)} MB)")
+        job = BatchJob(items, audio_format)
+        self.jobs[job.id] = job
+        self.stats.jobs += 1
+        job.task = asyncio.create_task(self._run(job, providers))
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        self._purge()
+        return self.jobs.get(job_id)
+
+    async def close_all(self):
+        running = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    def _purge(self):
+        """Drop expired jobs, then the oldest finished ones while over `max_bytes`"""
+        cutoff = time.time() - self.ttl_s
+        for job_id in [job.id for job in self.jobs.values() if job.finished_at and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+        stored = self.stored_bytes()
+        for job in sorted((job for job in self.jobs.values() if job.finished_at), key=lambda job: job.finished_at):
+            if stored <= self.max_bytes:
+                break
+            stored -= job.bytes
+            del self.jobs[job.id]
+            logger.info(f"📦 Dropped results of batch job {job.id} early: job store over {self.max_bytes} bytes")
+
+    async def _run(self, job: BatchJob, providers: ProviderSet):
+        job.status = "running"
+        try:
+            async with BatchRenderer(providers, job.audio_format, self.limiter, self.stats) as renderer:
+                async for item in renderer.run(job.items, ask_llm=True):
+                    job.results.append(item)
+                    if item.get("audio") and item.get("duplicate_of") is None:
+                        job.bytes += len(item["audio"])
+                        if self.stored_bytes() > self.max_bytes:
+                            self._purge()
+                            if self.stored_bytes() > self.max_bytes:
+                                raise OverflowError(f"Results exceed the job store limit of {self.max_bytes} bytes")
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"❌ Batch job {job.id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = time.time()
+            logger.info(f"📦 Batch job {job.id} {job.status}: {len(job.results)}/{len(job.items)} items")
+
+
+batch_stats = BatchStats()
+# Provider requests all batch work in this worker may have in flight at once
+batch_limiter = asyncio.Semaphore(settings.batch_max_concurrency)
+job_store = JobStore.from_settings(settings, batch_limiter, batch_stats)
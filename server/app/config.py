@@ -1,38 +1,158 @@
-import os
-from dotenv import load_dotenv
-from typing import List
-
-# Load environment variables from .env file
-load_dotenv()
-
-class Settings:
-    def __init__(self):
-        # ASR Configuration
-        self.asr_provider = os.getenv("ASR_PROVIDER", "assemblyai")
-        self.asr_api_key = os.getenv("ASR_API_KEY")
-        self.murf_api_key = os.getenv("MURF_API_KEY")
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        
-        # Server Configuration
-        self.port = int(os.getenv("PORT", "8000"))
-        self.backend_url = os.getenv("BACKEND_URL", "http://localhost:8000")
-        self.frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
-        
-        # CORS
-        self.allowed_origins = [
-            "http://localhost:5173",
-            "http://localhost:3000", 
-            "http://127.0.0.1:5173",
-            "http://localhost:5174"
-        ]
-        
-        # Debug: Print all environment variables
-        print("🔍 Environment Variables Check:")
-        print(f"   Current Directory: {os.getcwd()}")
-        print(f"   .env file exists: {os.path.exists('.env')}")
-        print(f"   ASR_PROVIDER: {os.getenv('ASR_PROVIDER')}")
-        print(f"   ASR_API_KEY: {'✅ SET' if self.asr_api_key else '❌ MISSING'}")
-        print(f"   MURF_API_KEY: {'✅ SET' if self.murf_api_key else '❌ MISSING'}")
-        print(f"   OPENAI_API_KEY: {'✅ SET' if self.openai_api_key else '❌ NOT SET'}")
-
-settings = Settings()
\ No newline at end of file
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Union
+
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+logger = logging.getLogger(__name__)
+
+# Same lookup load_dotenv() did: repo root, then server/, then the working directory
+_APP_DIR = Path(__file__).resolve().parent
+ENV_FILES = (_APP_DIR.parent.parent / ".env", _APP_DIR.parent / ".env", Path(".env"))
+
+class Settings(BaseSettings):
+    """Validated once from the environment and .env (env vars win)"""
+
+    model_config = SettingsConfigDict(env_file=ENV_FILES, env_file_encoding="utf-8", extra="ignore")
+
+    # ASR Configuration
+    asr_provider: str = "assemblyai"
+    asr_api_key: Optional[str] = None
+    murf_api_key: Optional[str] = None
+    openai_api_key: Optional[str] = None
+
+    # Provider selection ("mock" runs fully offline, "local" runs on this box)
+    tts_provider: str = "murf"
+    llm_provider: str = "openai"
+
+    # Extra modules that register providers (comma-separated import paths)
+    provider_plugins: Union[List[str], str] = []
+
+    # Local on-box providers (ASR_PROVIDER=local, TTS_PROVIDER=local)
+    local_asr_model: str = "tiny.en"
+    local_tts_binary: str = "espeak-ng"
+
+    # Audio compute executor (process pool for CPU-bound audio work; 0 workers = inline)
+    audio_executor_workers: int = Field(2, ge=0)
+    audio_executor_max_pending: int = Field(256, ge=1)
+    audio_executor_batch_ms: float = Field(2.0, ge=0)
+    audio_executor_max_batch: int = Field(64, ge=1)
+
+    # Mock provider behaviour: latency specs are "<distribution>:<a>:<b>" in ms
+    mock_seed: int = 0
+    mock_asr_latency: str = "normal:150:30"
+    mock_llm_latency: str = "lognormal:400:120"
+    mock_tts_latency: str = "normal:250:50"
+    mock_failure_rate: float = Field(0.0, ge=0, le=1)
+
+    # Provider endpoints (overridable for local stubs and benchmarks)
+    deepgram_url: str = "wss://api.deepgram.com/v1/listen"
+    murf_base_url: str = "https://api.murf.ai/v1"
+    openai_base_url: Optional[str] = None
+
+    # Server Configuration
+    port: int = 8000
+    backend_url: str = "http://localhost:8000"
+    frontend_url: str = "http://localhost:5173"
+
+    # Endpointing: ASR_ENDPOINTING_MS is passed to the provider (unset = provider default);
+    # adaptive mode merges fragmentary finals within a per-session grace window
+    asr_endpointing_ms: Optional[int] = Field(None, ge=10)
+    endpointing_adaptive: bool = False
+    endpointing_min_grace_ms: float = Field(80.0, ge=0)
+    endpointing_max_grace_ms: float = Field(900.0, ge=0)
+    endpointing_vad: bool = False  # hold the turn open on server-detected speech
+
+    # Speculative LLM prefetch: start the reply once a partial transcript is stable
+    speculation_enabled: bool = False
+    speculation_stable_ms: float = Field(300.0, ge=0)
+    speculation_min_words: int = Field(2, ge=1)
+    speculation_match_threshold: float = Field(0.9, ge=0, le=1)
+    speculation_max_per_minute: float = Field(30.0, ge=0)  # spend cap per worker
+    speculation_tts: bool = False  # also synthesize the reply's first sentence early
+
+    # Most unplayed TTS audio kept ahead of a client that sends playback acks
+    playback_lead_ms: float = Field(800.0, ge=0)
+
+    # Session resumption: a dropped /ws session is kept this long for the client to
+    # reconnect with its resume token (0 = close immediately); at most this many
+    # un-acked / undelivered messages are retained for replay
+    resume_grace_s: float = Field(15.0, ge=0)
+    resume_buffer_messages: int = Field(2000, ge=1)
+
+    # Multiplexed /ws/mux: many sessions per socket. Output is batched every
+    # MUX_BATCH_MS; each stream may queue MUX_STREAM_QUEUE outbound messages and
+    # MUX_INBOUND_FRAMES unprocessed audio frames before it is held back / dropped
+    mux_max_streams: int = Field(64, ge=1)
+    mux_batch_ms: float = Field(5.0, ge=0)
+    mux_stream_queue: int = Field(256, ge=1)
+    mux_inbound_frames: int = Field(50, ge=1)
+
+    # Outbound writer: a client with more than OUTBOUND_QUEUE_MESSAGES unsent messages,
+    # or whose oldest unsent message is OUTBOUND_MAX_LAG_S old, is disconnected
+    outbound_queue_messages: int = Field(1000, ge=1)
+    outbound_max_lag_s: float = Field(10.0, gt=0)
+
+    # Murf voice list: refreshed in the background once older than this
+    voice_catalog_ttl_s: float = Field(3600.0, gt=0)
+
+    # Batch TTS (/tts/batch) and LLM+TTS jobs (/jobs): provider requests in flight per
+    # worker across all batch work, items per request, and job retention (time and memory)
+    batch_max_concurrency: int = Field(4, ge=1)
+    batch_max_items: int = Field(1000, ge=1)
+    batch_max_jobs: int = Field(100, ge=1)
+    batch_job_ttl_s: float = Field(3600.0, gt=0)
+    batch_job_store_mb: float = Field(256.0, gt=0)
+
+    # Session resource accounting: raise (instead of logging) when a closed session still
+    # owns running tasks or open upstream sockets, and serve /debug/sessions and /debug/memory
+    leak_check_strict: bool = False
+    debug_endpoints: bool = False
+
+    # Cold start (process launch -> lifespan ready) budget for autoscaling
+    startup_target_ms: float = 2000.0
+
+    # CORS
+    allowed_origins: List[str] = [
+        "http://localhost:5173",
+        "http://localhost:3000",
+        "http://127.0.0.1:5173",
+        "http://localhost:5174"
+    ]
+
+    @field_validator("asr_provider", "tts_provider", "llm_provider")
+    @classmethod
+    def _normalize_provider(cls, value: str) -> str:
+        return value.strip().lower()
+
+    @field_validator("provider_plugins", mode="before")
+    @classmethod
+    def _split_plugins(cls, value):
+        if isinstance(value, str):
+            return [module.strip() for module in value.split(",") if module.strip()]
+        return value
+
+    @field_validator("asr_api_key", "murf_api_key", "openai_api_key", "openai_base_url")
+    @classmethod
+    def _empty_to_none(cls, value: Optional[str]) -> Optional[str]:
+        return value or None
+
+    def log_summary(self):
+        """One-line configuration summary (replaces the old print block)"""
+        logger.info(
+            f"🔍 Config: asr={self.asr_provider} ({'✅ key' if self.asr_api_key else '❌ no key'}), "
+            f"tts={self.tts_provider} ({'✅ key' if self.murf_api_key else '❌ no key'}), "
+            f"llm={self.llm_provider} ({'✅ key' if self.openai_api_key else 'fallback'})"
+        )
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
+
+def __getattr__(name: str):
+    # `from .config import settings` builds Settings on first use, once
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
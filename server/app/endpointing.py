@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_PUNCTUATION = (".", "?", "!")
+
+
+class EndpointingStats:
+    """Worker-wide turn assembly counters for /metrics"""
+
+    def __init__(self):
+        self.turns = 0
+        self.finals = 0
+        self.fragments_merged = 0
+        self.holds = 0
+        self.added_delay_s = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "turns": self.turns,
+            "finals": self.finals,
+            "fragments_merged": self.fragments_merged,
+            "holds": self.holds,
+            "avg_added_delay_ms": self.added_delay_s / self.turns * 1000 if self.turns else 0.0,
+        }
+
+
+class PauseModel:
+    """Running mean/deviation (EWMA) of pauses between fragments of one turn"""
+
+    def __init__(self, initial_ms: float = 350.0, alpha: float = 0.2):
+        self.alpha = alpha
+        self.mean_ms = initial_ms
+        self.var_ms2 = (initial_ms / 2) ** 2
+
+    def observe(self, pause_ms: float):
+        delta = pause_ms - self.mean_ms
+        self.mean_ms += self.alpha * delta
+        self.var_ms2 = (1 - self.alpha) * (self.var_ms2 + self.alpha * delta * delta)
+
+    def upper_ms(self) -> float:
+        """A pause this long would usually have ended a mid-turn gap already"""
+        return self.mean_ms + 2 * math.sqrt(self.var_ms2)
+
+
+class TurnAssembler:
+    """Merges fragmentary ASR finals into one user turn before the reply starts.
+
+    Each final opens a grace window. A final ending in terminal punctuation
+    gets the short `min_grace_ms`; otherwise the window follows this
+    session's measured mid-turn pauses, clamped to [min, max]. A partial
+    (or, with server VAD, speech onset) inside the window means the user
+    kept talking: the window is held open and that pause is learned. When
+    the window expires, the merged text is passed to `on_turn`. Turns are
+    delivered one at a time, in order.
+
+    With ``adaptive=False`` every final is its own turn, delivered at once.
+    """
+
+    def __init__(self, on_turn: Callable[[str], Awaitable[None]], stats: EndpointingStats,
+                 adaptive: bool = True, min_grace_ms: float = 80, max_grace_ms: float = 900,
+                 initial_pause_ms: float = 350):
+        self.on_turn = on_turn
+        self.stats = stats
+        self.adaptive = adaptive
+        self.min_grace_ms = min_grace_ms
+        self.max_grace_ms = max_grace_ms
+        self.pauses = PauseModel(initial_pause_ms)
+        self.fragments: List[str] = []
+        self._last_final_at = 0.0
+        self._in_grace = False  # the last final's grace window is still running
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._delivery: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls, settings, on_turn: Callable[[str], Awaitable[None]]) -> "TurnAssembler":
+        return cls(on_turn, endpointing_stats, adaptive=settings.endpointing_adaptive,
+                   min_grace_ms=settings.endpointing_min_grace_ms,
+                   max_grace_ms=settings.endpointing_max_grace_ms)
+
+    @property
+    def pending_text(self) -> str:
+        return " ".join(self.fragments)
+
+    def with_pending(self, text: str) -> str:
+        """`text` prefixed by fragments already waiting in this turn"""
+        return " ".join(self.fragments + [text]) if text else self.pending_text
+
+    def grace_ms(self, text: str) -> float:
+        if text.rstrip().endswith(TERMINAL_PUNCTUATION):
+            return self.min_grace_ms
+        return min(self.max_grace_ms, max(self.min_grace_ms, self.pauses.upper_ms()))
+
+    async def on_final(self, text: str):
+        text = text.strip()
+        if not text:
+            return
+        self.stats.finals += 1
+        self.fragments.append(text)
+        self._last_final_at = time.perf_counter()
+        if not self.adaptive:
+            await self._deliver_now()
+            return
+        self._in_grace = True
+        self._arm(self.grace_ms(text))
+
+    def on_partial(self, text: str):
+        """The user is still talking; keep the pending turn open"""
+        if text.strip():
+            self._hold()
+
+    def on_speech(self, active: bool):
+        """Server VAD signal for the latest input frame"""
+        if active:
+            self._hold()
+
+    def flush(self):
+        """End the pending turn now rather than after its grace window (the client stopped recording)"""
+        if self.fragments:
+            self._cancel_timer()
+            self._expire()
+
+    def cancel(self):
+        self._cancel_timer()
+        self.fragments = []
+        self._in_grace = False
+        if self._delivery and not self._delivery.done():
+            self._delivery.cancel()
+
+    def tasks(self) -> List[asyncio.Task]:
+        """The turn delivery still running, if any"""
+        return [self._delivery] if self._delivery and not self._delivery.done() else []
+
+    def _hold(self):
+        if not self.adaptive or not self._in_grace:
+            return
+        # A continuation after a final tells us how long this user pauses mid-turn
+        self.pauses.observe((time.perf_counter() - self._last_final_at) * 1000)
+        self._in_grace = False
+        self.stats.holds += 1
+        # The next final re-arms the grace window; this only guards against a lost final
+        self._arm(self.max_grace_ms * 2)
+
+    def _arm(self, delay_ms: float):
+        self._cancel_timer()
+        self._timer = asyncio.get_running_loop().call_later(delay_ms / 1000, self._expire)
+
+    def _expire(self):
+        self._timer = None
+        text, added_delay = self._take()
+        if not text:
+            return
+        previous = self._delivery
+
+        async def deliver():
+            if previous and not previous.done():
+                await asyncio.gather(previous, return_exceptions=True)
+            await self.on_turn(text)
+
+        self._delivery = asyncio.create_task(deliver())
+        logger.debug(f"🗣️ Turn complete after {added_delay * 1000:.0f} ms grace: {text}")
+
+    async def _deliver_now(self):
+        self._cancel_timer()
+        text, _ = self._take()
+        if self._delivery and not self._delivery.done():
+            await asyncio.gather(self._delivery, return_exceptions=True)
+        await self.on_turn(text)
+
+    def _take(self):
+        """Pop the pending turn and record its stats"""
+        if not self.fragments:
+            return "", 0.0
+        text = " ".join(self.fragments)
+        added_delay = time.perf_counter() - self._last_final_at
+        self.stats.turns += 1
+        self.stats.fragments_merged += len(self.fragments) - 1
+        self.stats.added_delay_s += added_delay
+        self.fragments = []
+        self._in_grace = False
+        return text, added_delay
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+
+endpointing_stats = EndpointingStats()
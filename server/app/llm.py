@@ -1,21 +1,49 @@
-import openai
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from .providers import LLMProvider, register_llm
+
+if TYPE_CHECKING:
+    import openai
 
 logger = logging.getLogger(__name__)
 
-class LLMProcessor:
-    def __init__(self, api_key: Optional[str] = None):
+@register_llm("openai")
+class LLMProcessor(LLMProvider):
+    # One client (and connection pool) per worker, shared by every session
+    _clients: Dict[Tuple[str, Optional[str]], "openai.AsyncOpenAI"] = {}
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
         self.api_key = api_key
         self.client = None
         
         if api_key:
             try:
-                self.client = openai.AsyncOpenAI(api_key=api_key)
-                logger.info("OpenAI client initialized successfully")
+                self.client = self._shared_client(api_key, base_url)
             except Exception as e:
                 logger.error(f"OpenAI client initialization failed: {e}")
     
+    @classmethod
+    def from_settings(cls, settings) -> "LLMProcessor":
+        if settings.openai_api_key:
+            return cls(settings.openai_api_key, base_url=settings.openai_base_url)
+        return cls()
+    
+    @classmethod
+    async def prepare(cls, settings):
+        """Build the shared client at startup so the first turn skips TLS/httpx setup"""
+        if settings.openai_api_key:
+            cls._shared_client(settings.openai_api_key, settings.openai_base_url)
+    
+    @classmethod
+    def _shared_client(cls, api_key: str, base_url: Optional[str]) -> "openai.AsyncOpenAI":
+        key = (api_key, base_url)
+        if key not in cls._clients:
+            # Imported here: the SDK costs ~0.5 s and keyless/mock workers never need it
+            import openai
+            cls._clients[key] = openai.AsyncOpenAI(api_key=api_key, base_url=base_url)
+            logger.info("OpenAI client initialized successfully")
+        return cls._clients[key]
+    
     async def process_query(self, query: str) -> str:
         """Process user query and generate intelligent response"""
         if self.client:
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import shutil
+from typing import AsyncGenerator
+
+from .providers import ProviderCapabilities, TTSProvider, register_tts
+
+logger = logging.getLogger(__name__)
+
+
+@register_tts("local")
+class LocalTTS(TTSProvider):
+    """On-box speech synthesis with the espeak-ng binary (WAV output)"""
+
+    capabilities = ProviderCapabilities(local=True, sample_rate=22050, audio_format="wav")
+
+    # Map the public voice IDs onto espeak-ng voices
+    VOICES = {
+        "en_us_001": "en-us",
+        "en_uk_001": "en-gb",
+        "en_au_001": "en-us",
+    }
+
+    def __init__(self, binary: str = "espeak-ng", words_per_minute: int = 175):
+        self.binary = binary
+        self.words_per_minute = words_per_minute
+
+    @classmethod
+    def from_settings(cls, settings) -> "LocalTTS":
+        return cls(settings.local_tts_binary)
+
+    @classmethod
+    def is_configured(cls, settings) -> bool:
+        return shutil.which(settings.local_tts_binary) is not None
+
+    async def stream_tts(self, text: str, voice: str = "en_us_001", output_format=None) -> AsyncGenerator[bytes, None]:
+        """Synthesize `text` in a subprocess and yield the WAV file"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.binary, "--stdout", "-v", self.VOICES.get(voice, "en-us"),
+                "-s", str(self.words_per_minute), text,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            audio_data, error = await process.communicate()
+            if process.returncode != 0:
+                raise Exception(f"{self.binary} exited with {process.returncode}: {error.decode(errors='replace')}")
+            logger.info(f"Local TTS Success: Generated {len(audio_data)} bytes of audio")
+            yield audio_data
+        except Exception as e:
+            logger.error(f"Local TTS error: {e}")
+            yield b""
+
+    async def get_available_voices(self):
+        return [
+            {"id": voice_id, "name": f"espeak-ng ({espeak_voice})", "language": espeak_voice}
+            for voice_id, espeak_voice in self.VOICES.items()
+        ]
@@ -1,11 +1,27 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import logging
 import json
-import base64
 import asyncio
+from collections import Counter
+from typing import Optional
 from .config import settings
+from .providers import ProviderSet, resolve_providers
+from .audio_executor import audio_executor
+from .startup import startup_profile
+from .playback import playback_stats
+from .endpointing import endpointing_stats
+from .speculation import speculation_stats
+from .session import VoiceSession, session_store
+from .voices import voice_catalog
+from .mux import MuxConnection, mux_stats
+from .outbound import OutboundWriter, outbound_stats
+from .resources import memory_profiler, resource_stats
+from .batch import (BatchJobRequest, BatchRenderer, BatchTTSRequest, batch_items, batch_limiter,
+                    batch_output_format, batch_stats, job_store, ndjson_line, render_batch,
+                    stream_batch, zip_archive)
 
 # Configure more detailed logging
 logging.basicConfig(
@@ -14,10 +30,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Do all one-time work here so the first connection pays none of it
+    startup_profile.target_ms = settings.startup_target_ms
+    settings.log_summary()
+    # Worker processes boot while this process imports providers
+    warming = asyncio.create_task(audio_executor.warm())
+    await asyncio.sleep(0)
+    with startup_profile.phase("providers"):
+        # Resolve (and import) provider classes once per worker instead of on every connection
+        providers = get_providers(app)
+    with startup_profile.phase("provider_prepare"):
+        await providers.prepare()
+    with startup_profile.phase("audio_executor"):
+        await warming
+    startup_profile.mark_ready()
+    yield
+    await session_store.close_all()
+    await job_store.close_all()
+    await audio_executor.shutdown()
+
+def get_providers(app: FastAPI) -> ProviderSet:
+    if getattr(app.state, "providers", None) is None:
+        app.state.providers = resolve_providers(settings)
+    return app.state.providers
+
 app = FastAPI(
     title="Voice Chat Agent API",
     version="1.0.0",
-    description="Production-ready voice chat with Murf Falcon TTS and real-time ASR"
+    description="Production-ready voice chat with Murf Falcon TTS and real-time ASR",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -32,20 +75,29 @@ app.add_middleware(
 class ConnectionManager:
     def __init__(self):
         self.active_connections = []
+        self.writers = {}  # websocket -> OutboundWriter
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
+        self.writers[websocket] = OutboundWriter.from_settings(settings, websocket, outbound_stats)
     
-    def disconnect(self, websocket: WebSocket):
+    async def disconnect(self, websocket: WebSocket):
+        """Forget the connection once its writer has flushed what was already queued"""
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        writer = self.writers.pop(websocket, None)
+        if writer:
+            await writer.aclose()
     
     async def send_json(self, websocket: WebSocket, message: dict):
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            logger.error(f"Error sending message: {e}")
+        """Queue `message` on the connection's writer, waiting only while its backlog is high"""
+        writer = self.writers.get(websocket)
+        if writer is None or writer.closed:
+            logger.debug(f"Dropping {message.get('type')} message for closed connection")
+            return
+        await writer.wait_writable()
+        writer.put(message)
 
 manager = ConnectionManager()
 
@@ -64,216 +116,167 @@ async def root():
 async def health_check():
     return JSONResponse(content={"status": "healthy"})
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for capacity planning"""
+    return {
+        "active_connections": len(manager.active_connections),
+        "audio_executor": audio_executor.stats(),
+        "speculation": speculation_stats.snapshot(),
+        "endpointing": endpointing_stats.snapshot(),
+        "playback": playback_stats.snapshot(),
+        "sessions": session_store.snapshot(),
+        "mux": mux_stats.snapshot(),
+        "outbound": outbound_stats.snapshot(),
+        "batch": batch_stats.snapshot(),
+        "voice_catalog": voice_catalog.stats(),
+        "resources": resource_stats.snapshot(),
+        "startup": startup_profile.report()
+    }
+
 @app.get("/config")
-async def get_config():
-    """Return public configuration"""
+async def get_config(locale: Optional[str] = None, style: Optional[str] = None):
+    """Return public configuration; `locale` / `style` filter the voice list"""
+    voices = voice_catalog.voices()
+    if locale:
+        voices = voice_catalog.by_locale(locale)
+    if style:
+        voices = [voice for voice in voices if voice in voice_catalog.by_style(style)]
     return {
         "asr_provider": settings.asr_provider,
         "asr_available": bool(settings.asr_api_key),
         "tts_available": bool(settings.murf_api_key),
-        "supported_voices": [
-            {"id": "en_us_001", "name": "Falcon US English", "language": "en-US"},
-            {"id": "en_uk_001", "name": "Falcon UK English", "language": "en-GB"},
-            {"id": "en_au_001", "name": "Falcon Australian English", "language": "en-AU"}
-        ]
+        "voice_catalog": voice_catalog.stats(),
+        "supported_voices": [voice.describe() for voice in voices]
     }
 
+def require_debug_endpoints():
+    if not settings.debug_endpoints:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.get("/debug/sessions")
+async def debug_sessions():
+    """Per-session resource accounting for every live session in this worker"""
+    require_debug_endpoints()
+    tasks = Counter(task.get_coro().__qualname__ for task in asyncio.all_tasks())
+    return {
+        "event_loop_tasks": sum(tasks.values()),
+        "tasks_by_coroutine": dict(tasks.most_common()),
+        "totals": resource_stats.snapshot(),
+        "sessions": resource_stats.sessions(),
+    }
+
+@app.get("/debug/memory")
+async def debug_memory(top: int = 20):
+    """tracemalloc diff since the previous call; the first call starts tracing"""
+    require_debug_endpoints()
+    return memory_profiler.snapshot(top)
+
+@app.delete("/debug/memory")
+async def stop_memory_profiling():
+    require_debug_endpoints()
+    return memory_profiler.stop()
+
+def batch_providers(count: int) -> ProviderSet:
+    """Providers for a batch request, after checking it can be served"""
+    if count > settings.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"At most {settings.batch_max_items} items per request")
+    providers = get_providers(app)
+    if providers.tts is None:
+        raise HTTPException(status_code=503, detail="TTS provider not available")
+    return providers
+
+@app.post("/tts/batch")
+async def batch_tts(request: BatchTTSRequest):
+    """Synthesize many texts; NDJSON lines as items finish, or a zip of audio files"""
+    providers = batch_providers(len(request.items))
+    audio_format = batch_output_format(request.audio_format, providers.tts.capabilities)
+    items = batch_items(request.items, request.voice, "text")
+    renderer = BatchRenderer(providers, audio_format, batch_limiter, batch_stats)
+    if request.output == "zip":
+        results = await render_batch(renderer, items)
+        return Response(
+            content=zip_archive(results, audio_format),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="tts-batch.zip"'}
+        )
+    return StreamingResponse(stream_batch(renderer, items), media_type="application/x-ndjson")
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: BatchJobRequest):
+    """Queue an LLM+TTS job: each prompt is answered, then the answer synthesized"""
+    providers = batch_providers(len(request.prompts))
+    try:
+        job = job_store.submit(providers, batch_items(request.prompts, request.voice, "prompt"),
+                               batch_output_format(request.audio_format, providers.tts.capabilities))
+    except OverflowError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.describe()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.describe()
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, output: str = "ndjson"):
+    """Results of a finished job (NDJSON or zip); 409 while it is still running"""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if job.finished_at is None:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    results = sorted(job.results, key=lambda item: item["index"])
+    if output == "zip":
+        return Response(
+            content=zip_archive(results, job.audio_format),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="job-{job.id}.zip"'}
+        )
+    return Response(content=b"".join(ndjson_line(item, job.audio_format) for item in results),
+                    media_type="application/x-ndjson")
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, resume: Optional[str] = None, last_seq: int = 0):
     await manager.connect(websocket)
     logger.info("🔌 New WebSocket connection established")
     
-    # Import providers here to avoid circular imports
-    from .asr_providers.assemblyai import AssemblyAIASR
-    from .asr_providers.deepgram import DeepgramASR
-    from .murf import MurfTTS
-    from .llm import LLMProcessor
+    async def send(message: dict):
+        await manager.send_json(websocket, message)
     
-    # Initialize providers
-    asr_provider = None
-    tts_provider = None
-    llm_processor = None
+    # Reattach to a session parked by a dropped connection, if the token is still live
+    session = session_store.claim(resume) if resume else None
     
     try:
-        # Initialize ASR provider
-               # Initialize ASR provider
-        if settings.asr_api_key:
-            try:
-                logger.info(f"Initializing {settings.asr_provider} ASR provider...")
-                if settings.asr_provider == "assemblyai":
-                    asr_provider = AssemblyAIASR(settings.asr_api_key)
-                else:
-                    asr_provider = DeepgramASR(settings.asr_api_key)
-                
-                await asr_provider.start_session()
-                logger.info(f"✅ {settings.asr_provider} ASR provider initialized successfully")
-                
-            except Exception as e:
-                logger.error(f"❌ Failed to initialize ASR provider: {e}")
-                # Even if initialization fails, create a demo provider
-                asr_provider = AssemblyAIASR("demo")
-                await asr_provider.start_session()
-                logger.info("🔄 Using demo ASR provider as fallback")
+        if session:
+            await session.attach(send, last_seq)
         else:
-            logger.warning("No ASR API key provided - using demo mode")
-            asr_provider = AssemblyAIASR("demo")
-            await asr_provider.start_session()
-        
-        # Initialize TTS provider
-        if settings.murf_api_key:
-            try:
-                tts_provider = MurfTTS(settings.murf_api_key)
-                logger.info("✅ Murf TTS provider initialized successfully")
-            except Exception as e:
-                logger.error(f"❌ Failed to initialize Murf TTS: {e}")
-                tts_provider = None
-        else:
-            logger.warning("No Murf API key provided - TTS functionality disabled")
-        
-        # Initialize LLM processor
-        if settings.openai_api_key:
-            llm_processor = LLMProcessor(settings.openai_api_key)
-            logger.info("✅ OpenAI LLM processor initialized")
-        else:
-            llm_processor = LLMProcessor()
-            logger.info("⚡ Using fallback LLM responses")
-        
-        current_voice = "en_us_001"
-        is_recording = False
-        
-        async def handle_asr_transcript(transcript: str, is_final: bool):
-            """Handle ASR transcript results"""
-            logger.info(f"🎤 ASR Transcript (final={is_final}): {transcript}")
-            
-            await manager.send_json(websocket, {
-                "type": "transcript",
-                "text": transcript,
-                "is_final": is_final,
-                "speaker": "user"
-            })
+            if resume:
+                logger.info("🔁 Resume token unknown or expired - starting a new session")
+            session = VoiceSession(get_providers(websocket.app), send)
+            await session.start()
             
-            # If final transcript, process with LLM and generate TTS
-            if is_final and transcript.strip():
-                try:
-                    logger.info(f"🤖 Processing query: {transcript}")
-                    
-                    # Get response from LLM
-                    response_text = await llm_processor.process_query(transcript)
-                    logger.info(f"🤖 LLM Response: {response_text}")
-                    
-                    await manager.send_json(websocket, {
-                        "type": "transcript",
-                        "text": response_text,
-                        "is_final": True,
-                        "speaker": "agent"
-                    })
-                    
-                    # Generate TTS audio if Murf is available
-                    if tts_provider and response_text:
-                        logger.info(f"🔊 Generating TTS for: {response_text}")
-                        try:
-                            audio_chunks = []
-                            async for audio_chunk in tts_provider.stream_tts(
-                                response_text, 
-                                voice=current_voice
-                            ):
-                                if audio_chunk and len(audio_chunk) > 0:
-                                    audio_chunks.append(audio_chunk)
-                                    await manager.send_json(websocket, {
-                                        "type": "audio_chunk",
-                                        "payload": base64.b64encode(audio_chunk).decode('utf-8')
-                                    })
-                                    logger.info(f"🔊 Sent audio chunk: {len(audio_chunk)} bytes")
-                            
-                            if audio_chunks:
-                                total_audio = sum(len(chunk) for chunk in audio_chunks)
-                                logger.info(f"✅ TTS completed: {total_audio} total bytes sent")
-                            else:
-                                logger.warning("❌ No audio chunks generated by TTS")
-                                
-                        except Exception as e:
-                            logger.error(f"❌ TTS generation error: {e}")
-                            await manager.send_json(websocket, {
-                                "type": "error",
-                                "message": f"TTS Error: {str(e)}"
-                            })
-                    else:
-                        logger.warning("⚠️ TTS not available - skipping audio generation")
-                        
-                except Exception as e:
-                    logger.error(f"❌ Error processing response: {e}")
-                    await manager.send_json(websocket, {
-                        "type": "error",
-                        "message": f"Failed to generate response: {str(e)}"
-                    })
-        
-        # Set ASR callback if ASR provider is available
-        if asr_provider:
-            asr_provider.set_callback(handle_asr_transcript)
-            logger.info("✅ ASR callback set")
-        
-        # Send initial status
-        await manager.send_json(websocket, {
-            "type": "status",
-            "status": "connected",
-            "message": "Voice chat agent ready",
-            "capabilities": {
-                "asr": asr_provider is not None,
-                "tts": tts_provider is not None,
-                "llm": llm_processor is not None
-            }
-        })
-        logger.info("✅ Initial status sent to client")
+            # Send initial status
+            await session.send({**session.status_message(), "resumed": False} if resume else session.status_message())
+            logger.info("✅ Initial status sent to client")
         
         # Main message loop
         while True:
             try:
                 data = await websocket.receive()
+                if data.get("type") == "websocket.disconnect":
+                    logger.info("🔌 WebSocket client disconnected")
+                    break
                 logger.debug(f"📥 Received WebSocket data type: {list(data.keys())}")
                 
                 if "text" in data:
-                    message_data = json.loads(data["text"])
-                    message_type = message_data.get("type")
-                    logger.info(f"📥 Received message: {message_type}")
-                    
-                    if message_type == "start":
-                        if asr_provider:
-                            await asr_provider.start_stream()
-                            is_recording = True
-                            await manager.send_json(websocket, {
-                                "type": "status", 
-                                "status": "recording"
-                            })
-                            logger.info("🎤 Recording started - ready for audio")
-                        else:
-                            await manager.send_json(websocket, {
-                                "type": "error",
-                                "message": "ASR not available - cannot start recording"
-                            })
-                            
-                    elif message_type == "stop":
-                        if asr_provider:
-                            await asr_provider.stop_stream()
-                        is_recording = False
-                        await manager.send_json(websocket, {
-                            "type": "status", 
-                            "status": "stopped"
-                        })
-                        logger.info("⏹️ Recording stopped")
-                        
-                    elif message_type == "config":
-                        current_voice = message_data.get("voice", current_voice)
-                        logger.info(f"⚙️ Configuration updated: voice={current_voice}")
+                    await session.handle_message(json.loads(data["text"]))
                 
                 elif "bytes" in data:
                     # Handle binary audio data
-                    audio_data = data["bytes"]
-                    logger.debug(f"🎵 Received audio chunk: {len(audio_data)} bytes")
-                    
-                    if is_recording and asr_provider:
-                        await asr_provider.process_audio(audio_data)
-                    elif is_recording and not asr_provider:
-                        logger.warning("⚠️ Audio received but no ASR provider available")
+                    await session.handle_audio(data["bytes"])
                     
             except Exception as e:
                 logger.error(f"❌ Error processing WebSocket message: {e}")
@@ -291,13 +294,52 @@ async def websocket_endpoint(websocket: WebSocket):
             "message": f"Connection error: {str(e)}"
         })
     finally:
-        # Cleanup
+        # Cleanup: keep the session around for a reconnect, or close it
         logger.info("🧹 Cleaning up WebSocket connection...")
-        if asr_provider:
-            await asr_provider.close_session()
-        manager.disconnect(websocket)
+        if session:
+            await session_store.release(session)
+        await manager.disconnect(websocket)
         logger.info("✅ WebSocket connection cleaned up")
 
+@app.websocket("/ws/mux")
+async def mux_websocket_endpoint(websocket: WebSocket):
+    """Multiplexed protocol: many voice sessions, addressed by stream id, on one socket"""
+    await manager.connect(websocket)
+    logger.info("🔌 New multiplexed WebSocket connection established")
+    
+    async def send(message: dict):
+        await manager.send_json(websocket, message)
+    
+    connection = MuxConnection.from_settings(settings, get_providers(websocket.app), send, mux_stats)
+    
+    try:
+        while True:
+            try:
+                data = await websocket.receive()
+                if data.get("type") == "websocket.disconnect":
+                    logger.info("🔌 Multiplexed WebSocket client disconnected")
+                    break
+                
+                if "text" in data:
+                    await connection.handle_text(data["text"])
+                elif "bytes" in data:
+                    await connection.handle_bytes(data["bytes"])
+                    
+            except Exception as e:
+                logger.error(f"❌ Error processing multiplexed message: {e}")
+                await manager.send_json(websocket, {
+                    "type": "error",
+                    "message": str(e)
+                })
+                
+    except WebSocketDisconnect:
+        logger.info("🔌 Multiplexed WebSocket client disconnected")
+    finally:
+        logger.info("🧹 Cleaning up multiplexed WebSocket connection...")
+        await manager.disconnect(websocket)
+        await connection.close()
+        logger.info("✅ Multiplexed WebSocket connection cleaned up")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=settings.port)
\ No newline at end of file
@@ -0,0 +1,169 @@
+import asyncio
+import io
+import logging
+import math
+import random
+import wave
+from typing import AsyncGenerator, Optional
+
+from .llm import LLMProcessor
+from .providers import ProviderCapabilities, TTSProvider, register_llm, register_tts
+from .voices import voice_catalog
+
+logger = logging.getLogger(__name__)
+
+
+class MockProviderError(Exception):
+    """Raised by mock providers when failure injection triggers"""
+
+
+class LatencyModel:
+    """Samples latencies (in seconds) from a configurable distribution.
+
+    Specs look like ``"fixed:200"``, ``"uniform:100:300"``, ``"normal:200:40"``
+    or ``"lognormal:200:80"`` (mean and standard deviation in milliseconds).
+    """
+
+    DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, distribution: str = "fixed", a: float = 0.0, b: float = 0.0,
+                 rng: Optional[random.Random] = None):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.distribution = distribution
+        self.a = a
+        self.b = b
+        self.rng = rng or random.Random(0)
+
+    @classmethod
+    def parse(cls, spec: str, rng: Optional[random.Random] = None) -> "LatencyModel":
+        parts = spec.split(":")
+        values = [float(p) for p in parts[1:]] + [0.0, 0.0]
+        return cls(parts[0], values[0], values[1], rng=rng)
+
+    def sample(self) -> float:
+        if self.distribution == "fixed":
+            ms = self.a
+        elif self.distribution == "uniform":
+            ms = self.rng.uniform(self.a, self.b)
+        elif self.distribution == "normal":
+            ms = self.rng.gauss(self.a, self.b)
+        else:
+            # Parameterised by the mean/stddev of the resulting distribution
+            mean, std = max(self.a, 1e-6), self.b
+            sigma = math.sqrt(math.log(1 + (std / mean) ** 2))
+            ms = self.rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        return max(0.0, ms) / 1000
+
+    async def wait(self):
+        await asyncio.sleep(self.sample())
+
+
+class FailureInjector:
+    """Raises MockProviderError with a fixed probability"""
+
+    def __init__(self, rate: float = 0.0, rng: Optional[random.Random] = None):
+        self.rate = rate
+        self.rng = rng or random.Random(0)
+
+    def maybe_fail(self, what: str):
+        if self.rate and self.rng.random() < self.rate:
+            raise MockProviderError(f"Injected mock failure: {what}")
+
+
+def wav_tone(duration_ms: int, sample_rate: int = 24000, freq: float = 220.0, offset: int = 0) -> bytes:
+    """Render a quiet sine tone as a standalone, decodable WAV file"""
+    count = sample_rate * duration_ms // 1000
+    frames = bytearray()
+    for i in range(offset, offset + count):
+        value = int(1500 * math.sin(2 * math.pi * freq * i / sample_rate))
+        frames += value.to_bytes(2, "little", signed=True)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+@register_tts("mock")
+class MockTTS(TTSProvider):
+    """Offline stand-in for MurfTTS.
+
+    Streams standalone WAV segments whose total duration scales with the
+    text length, paced like a real-time synthesiser after a sampled
+    first-byte latency.
+    """
+
+    capabilities = ProviderCapabilities(sample_rate=24000, audio_format="wav")
+
+    def __init__(self, api_key: Optional[str] = None, latency: str = "fixed:0", seed: int = 0,
+                 failure_rate: float = 0.0, chunk_ms: int = 500, ms_per_char: int = 60,
+                 realtime_factor: float = 0.25):
+        self.api_key = api_key
+        rng = random.Random(seed)
+        self.latency = LatencyModel.parse(latency, rng)
+        self.failures = FailureInjector(failure_rate, rng)
+        self.chunk_ms = chunk_ms
+        self.ms_per_char = ms_per_char
+        self.realtime_factor = realtime_factor
+        self.sample_rate = self.capabilities.sample_rate
+
+    @classmethod
+    def from_settings(cls, settings) -> "MockTTS":
+        return cls(latency=settings.mock_tts_latency, seed=settings.mock_seed,
+                   failure_rate=settings.mock_failure_rate)
+
+    async def stream_tts(self, text: str, voice: str = "en_us_001", output_format=None) -> AsyncGenerator[bytes, None]:
+        """Stream mock TTS audio in fixed-duration WAV segments"""
+        self.failures.maybe_fail("TTS request")
+        await self.latency.wait()
+
+        remaining_ms = max(self.chunk_ms, len(text) * self.ms_per_char)
+        offset = 0
+        while remaining_ms > 0:
+            duration = min(self.chunk_ms, remaining_ms)
+            self.failures.maybe_fail("TTS stream")
+            yield wav_tone(duration, self.sample_rate, offset=offset)
+            offset += self.sample_rate * duration // 1000
+            remaining_ms -= duration
+            if remaining_ms > 0:
+                await asyncio.sleep(duration / 1000 * self.realtime_factor)
+        logger.debug(f"Mock TTS rendered {len(text)} chars for voice {voice}")
+
+    async def get_available_voices(self):
+        """Return the bundled Murf voice snapshot"""
+        return [voice.describe() for voice in voice_catalog.snapshot]
+
+
+@register_llm("mock")
+class MockLLM(LLMProcessor):
+    """Offline stand-in for LLMProcessor with deterministic replies.
+
+    Latency is a sampled time-to-first-token plus a per-word generation
+    cost, so longer answers take proportionally longer like a real model.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, latency: str = "fixed:0", seed: int = 0,
+                 failure_rate: float = 0.0, ms_per_word: float = 15.0):
+        super().__init__(None)
+        self.api_key = api_key
+        rng = random.Random(seed)
+        self.latency = LatencyModel.parse(latency, rng)
+        self.failures = FailureInjector(failure_rate, rng)
+        self.ms_per_word = ms_per_word
+
+    @classmethod
+    def from_settings(cls, settings) -> "MockLLM":
+        return cls(latency=settings.mock_llm_latency, seed=settings.mock_seed,
+                   failure_rate=settings.mock_failure_rate)
+
+    async def process_query(self, query: str) -> str:
+        """Return the canned fallback response after simulated model latency"""
+        self.failures.maybe_fail("LLM request")
+        response = self._fallback_response(query)
+        await self.latency.wait()
+        await asyncio.sleep(len(response.split()) * self.ms_per_word / 1000)
+        return response
@@ -2,15 +2,37 @@ import aiohttp
 import json
 import logging
 from typing import AsyncGenerator, List, Dict, Any
+from .providers import ProviderCapabilities, TTSProvider, register_tts
+from .voices import voice_catalog
 
 logger = logging.getLogger(__name__)
 
-class MurfTTS:
-    def __init__(self, api_key: str):
+# Output sample rates the Murf API accepts
+MURF_SAMPLE_RATES = (8000, 24000, 44100, 48000)
+
+@register_tts("murf")
+class MurfTTS(TTSProvider):
+    capabilities = ProviderCapabilities(sample_rate=24000, audio_format="mp3")
+    
+    def __init__(self, api_key: str, base_url: str = "https://api.murf.ai/v1"):
         self.api_key = api_key
-        self.base_url = "https://api.murf.ai/v1"
+        self.base_url = base_url
+    
+    @classmethod
+    def from_settings(cls, settings) -> "MurfTTS":
+        return cls(settings.murf_api_key, base_url=settings.murf_base_url)
+    
+    @classmethod
+    def is_configured(cls, settings) -> bool:
+        return bool(settings.murf_api_key)
+    
+    @classmethod
+    async def prepare(cls, settings):
+        """Point the voice catalog at the live Murf list and start loading it"""
+        voice_catalog.fetcher = cls.from_settings(settings).fetch_voices
+        voice_catalog.revalidate()
         
-    async def stream_tts(self, text: str, voice: str = "en_us_001") -> AsyncGenerator[bytes, None]:
+    async def stream_tts(self, text: str, voice: str = "en_us_001", output_format=None) -> AsyncGenerator[bytes, None]:
         """Stream TTS audio from Murf AI"""
         try:
             headers = {
@@ -18,22 +40,26 @@ class MurfTTS:
                 "Content-Type": "application/json"
             }
             
-            # Map voice IDs to Murf voice parameters
-            voice_map = {
-                "en_us_001": {"voiceId": "Ronnie", "model": "Falcon"},
-                "en_uk_001": {"voiceId": "Reece", "model": "Falcon"}, 
-                "en_au_001": {"voiceId": "Matilda", "model": "Falcon"}
-            }
+            # Map the public voice ID onto Murf voice parameters
+            voice_params = voice_catalog.resolve(voice)
             
-            voice_params = voice_map.get(voice, {"voiceId": "Ronnie", "model": "Falcon"})
+            # Ask for uncompressed audio when the client wants frames, so we
+            # never have to decode MP3; pick the smallest rate >= the target
+            audio_format, sample_rate = "MP3", 24000
+            if output_format is not None and not output_format.passthrough:
+                audio_format = "WAV"
+                sample_rate = min(
+                    (rate for rate in MURF_SAMPLE_RATES if rate >= output_format.sample_rate),
+                    default=MURF_SAMPLE_RATES[-1]
+                )
             
             # Murf API payload
             data = {
                 "text": text,
-                "voiceId": voice_params["voiceId"],
-                "model": voice_params["model"],
-                "format": "MP3",
-                "sampleRate": 24000,
+                "voiceId": voice_params.voice_id,
+                "model": voice_params.model,
+                "format": audio_format,
+                "sampleRate": sample_rate,
                 "channelType": "MONO",
                 "prosody": {
                     "rate": "medium",
@@ -77,33 +103,22 @@ class MurfTTS:
             yield b""
     
     async def get_available_voices(self) -> List[Dict[str, Any]]:
-        """Get list of available Murf voices"""
-        try:
-            headers = {
-                "api-key": self.api_key,
-                "Content-Type": "application/json"
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/studio/voices",
-                    headers=headers
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("voices", [])
-                    else:
-                        logger.error(f"Failed to fetch voices: {response.status}")
-                        return self._get_default_voices()
-                        
-        except Exception as e:
-            logger.error(f"Error fetching Murf voices: {e}")
-            return self._get_default_voices()
+        """Get list of available Murf voices (cached; see VoiceCatalog)"""
+        return [voice.describe() for voice in voice_catalog.voices()]
     
-    def _get_default_voices(self) -> List[Dict[str, Any]]:
-        """Return default voice list if API fails"""
-        return [
-            {"id": "en_us_001", "name": "Falcon US English (Ronnie)", "language": "en-US", "voiceId": "Ronnie", "model": "Falcon"},
-            {"id": "en_uk_001", "name": "Falcon UK English (Reece)", "language": "en-GB", "voiceId": "Reece", "model": "Falcon"},
-            {"id": "en_au_001", "name": "Falcon Australian English (Matilda)", "language": "en-AU", "voiceId": "Matilda", "model": "Falcon"}
-        ]
\ No newline at end of file
+    async def fetch_voices(self) -> List[Dict[str, Any]]:
+        """Fetch the live Murf voice list; raises on failure"""
+        headers = {
+            "api-key": self.api_key,
+            "Content-Type": "application/json"
+        }
+        
+        async with aiohttp.ClientSession() as session:
+            async with session.get(
+                f"{self.base_url}/studio/voices",
+                headers=headers
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to fetch voices: {response.status}")
+                data = await response.json()
+                return data.get("voices", []) if isinstance(data, dict) else data
@@ -0,0 +1,309 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from .outbound import partial_key
+from .providers import ProviderSet
+from .resources import ResourceLeak
+from .session import VoiceSession
+
+logger = logging.getLogger(__name__)
+
+# Binary frames on a multiplexed socket: [id length: 1 byte][stream id, UTF-8][PCM16 audio]
+MAX_STREAM_ID_BYTES = 255
+
+
+class MuxProtocolError(ValueError):
+    """A frame or control message that does not follow the multiplexed protocol"""
+
+
+def encode_frame(stream_id: str, payload: bytes) -> bytes:
+    raw_id = stream_id.encode("utf-8")
+    if not raw_id or len(raw_id) > MAX_STREAM_ID_BYTES:
+        raise MuxProtocolError(f"Stream id must be 1-{MAX_STREAM_ID_BYTES} bytes")
+    return bytes([len(raw_id)]) + raw_id + payload
+
+
+def decode_frame(data: bytes) -> Tuple[str, bytes]:
+    if not data or len(data) < 1 + data[0] or data[0] == 0:
+        raise MuxProtocolError("Truncated stream frame header")
+    end = 1 + data[0]
+    return data[1:end].decode("utf-8"), data[end:]
+
+
+class MuxStats:
+    """Worker-wide multiplexing counters for /metrics"""
+
+    def __init__(self):
+        self.connections = 0
+        self.streams_opened = 0
+        self.batches = 0
+        self.messages = 0
+        self.frames_dropped = 0  # inbound audio dropped because a stream fell behind
+        self.messages_rejected = 0  # inbound control messages refused for the same reason
+        self.start_failures = 0
+        self.send_waits = 0      # times a stream's outbound queue was full
+        self.partials_merged = 0  # queued partial transcripts replaced by a newer one
+
+    def snapshot(self) -> dict:
+        return {
+            "connections": self.connections,
+            "streams_opened": self.streams_opened,
+            "batches": self.batches,
+            "messages": self.messages,
+            "avg_batch_size": self.messages / self.batches if self.batches else None,
+            "frames_dropped": self.frames_dropped,
+            "messages_rejected": self.messages_rejected,
+            "start_failures": self.start_failures,
+            "send_waits": self.send_waits,
+            "partials_merged": self.partials_merged,
+        }
+
+
+class MuxStream:
+    """One voice session on a multiplexed connection, with its own queues"""
+
+    def __init__(self, stream_id: str, outbound_limit: int):
+        self.id = stream_id
+        self.session: Optional[VoiceSession] = None
+        self.inbound: asyncio.Queue = asyncio.Queue()
+        self.inbound_audio = 0
+        self.inbound_messages = 0
+        self.outbound: Deque[dict] = deque()
+        self.partials: Dict[Tuple, dict] = {}  # the queued partial transcript per speaker
+        self.credit = asyncio.Semaphore(outbound_limit)
+        self.worker: Optional[asyncio.Task] = None
+
+
+class MuxConnection:
+    """Many independent voice sessions over one WebSocket.
+
+    Every JSON message carries a `stream` id; audio frames carry it in a short
+    binary header (see `encode_frame`). Streams are opened and closed with
+    `{"type": "open" | "close", "stream": id}`. Each stream has its own
+    inbound worker, so a stream whose ASR or LLM is slow only delays itself:
+    its audio frames are dropped once `inbound_audio_limit` are waiting, and
+    its control messages are refused with a stream error past the same limit.
+    Outbound messages wait in per-stream queues of at most `outbound_limit`
+    (a full queue pauses only that stream's pipeline) and one writer drains
+    them round-robin into `{"type": "batch", "messages": [...]}` frames.
+    As on a plain connection, a queued partial transcript is replaced by the
+    speaker's next partial and dropped by its final.
+    """
+
+    def __init__(self, providers: ProviderSet, send: Callable[[dict], Awaitable[None]], stats: MuxStats,
+                 max_streams: int = 64, batch_ms: float = 5.0, outbound_limit: int = 256,
+                 inbound_audio_limit: int = 50, max_batch: int = 64, quota: int = 8):
+        self.providers = providers
+        self._send = send
+        self.stats = stats
+        self.max_streams = max_streams
+        self.batch_s = batch_ms / 1000
+        self.outbound_limit = outbound_limit
+        self.inbound_audio_limit = inbound_audio_limit
+        self.max_batch = max_batch
+        self.quota = quota  # messages per stream per round, so one stream cannot fill a batch
+        self.streams: Dict[str, MuxStream] = {}
+        self._ready: Deque[str] = deque()  # streams with queued output, in round-robin order
+        self._wake = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+        stats.connections += 1
+
+    @classmethod
+    def from_settings(cls, settings, providers: ProviderSet, send: Callable[[dict], Awaitable[None]],
+                      stats: MuxStats) -> "MuxConnection":
+        return cls(providers, send, stats, max_streams=settings.mux_max_streams,
+                   batch_ms=settings.mux_batch_ms, outbound_limit=settings.mux_stream_queue,
+                   inbound_audio_limit=settings.mux_inbound_frames)
+
+    # Client input
+
+    async def handle_text(self, text: str):
+        message = json.loads(text)
+        stream_id = message.get("stream")
+        if not isinstance(stream_id, str) or not stream_id:
+            raise MuxProtocolError("Multiplexed messages need a 'stream' id")
+        message_type = message.get("type")
+        if message_type == "open":
+            await self.open_stream(stream_id)
+        elif message_type == "close":
+            await self.close_stream(stream_id)
+        elif stream_id in self.streams:
+            stream = self.streams[stream_id]
+            if stream.inbound_messages >= self.inbound_audio_limit:
+                self.stats.messages_rejected += 1
+                await self._send_error(stream_id, f"Stream is busy, {message_type!r} message dropped")
+                return
+            stream.inbound_messages += 1
+            stream.inbound.put_nowait(message)
+        else:
+            await self._send_error(stream_id, "Unknown stream")
+
+    async def handle_bytes(self, data: bytes):
+        stream_id, audio = decode_frame(data)
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            return
+        if stream.inbound_audio >= self.inbound_audio_limit:
+            self.stats.frames_dropped += 1
+            return
+        stream.inbound_audio += 1
+        stream.inbound.put_nowait(audio)
+
+    # Stream lifecycle
+
+    async def open_stream(self, stream_id: str):
+        if stream_id in self.streams:
+            await self._send_error(stream_id, "Stream already open")
+            return
+        if len(self.streams) >= self.max_streams:
+            await self._send_error(stream_id, f"Too many streams (max {self.max_streams})")
+            return
+        if len(stream_id.encode("utf-8")) > MAX_STREAM_ID_BYTES:
+            await self._send_error(stream_id, "Stream id too long")
+            return
+        stream = MuxStream(stream_id, self.outbound_limit)
+        self.streams[stream_id] = stream
+        self.stats.streams_opened += 1
+
+        async def send(message: dict):
+            await self._enqueue(stream, message)
+
+        # Resumption is per connection; a multiplexed client reopens its streams
+        stream.session = VoiceSession(self.providers, send, resumable=False)
+        stream.worker = asyncio.create_task(self._stream_loop(stream))
+        logger.info(f"🔀 Stream {stream_id} opened ({len(self.streams)} on this connection)")
+
+    async def close_stream(self, stream_id: str):
+        stream = self.streams.pop(stream_id, None)
+        if stream is None:
+            return
+        await self._shutdown(stream)
+        await self._send({"type": "batch", "messages": [{"type": "status", "status": "closed", "stream": stream_id}]})
+        logger.info(f"🔀 Stream {stream_id} closed")
+
+    async def close(self):
+        for stream_id in list(self.streams):
+            await self._shutdown(self.streams.pop(stream_id))
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+
+    async def _shutdown(self, stream: MuxStream):
+        if stream.worker:
+            stream.worker.cancel()
+            await asyncio.gather(stream.worker, return_exceptions=True)
+        if stream.session:
+            try:
+                await stream.session.close()
+            except ResourceLeak as e:
+                logger.error(f"🧹 Stream {stream.id}: {e}")
+        stream.outbound.clear()
+        stream.partials.clear()
+
+    async def _stream_loop(self, stream: MuxStream):
+        session = stream.session
+        try:
+            await session.start()
+        except Exception as e:
+            logger.error(f"❌ Could not start session on stream {stream.id}: {e}")
+            self.stats.start_failures += 1
+            if self.streams.get(stream.id) is stream:
+                del self.streams[stream.id]
+            try:
+                await session.close()
+            except Exception as close_error:
+                logger.warning(f"Error closing failed session on stream {stream.id}: {close_error}")
+            await self._send_error(stream.id, f"Could not start session: {e}")
+            return
+        await session.send({**session.status_message(), "stream": stream.id})
+        while True:
+            item = await stream.inbound.get()
+            try:
+                if isinstance(item, bytes):
+                    stream.inbound_audio -= 1
+                    await session.handle_audio(item)
+                else:
+                    stream.inbound_messages -= 1
+                    await session.handle_message(item)
+            except Exception as e:
+                logger.error(f"❌ Error processing message on stream {stream.id}: {e}")
+                await session.send({"type": "error", "message": str(e)})
+
+    # Output
+
+    async def _enqueue(self, stream: MuxStream, message: dict):
+        message = {**message, "stream": stream.id}
+        key = partial_key(message)
+        if key is not None and self._merge_partial(stream, key, message):
+            return
+        if stream.credit.locked():
+            self.stats.send_waits += 1
+        await stream.credit.acquire()
+        if self.streams.get(stream.id) is not stream:
+            return  # closed while waiting
+        if key is not None and self._merge_partial(stream, key, message):
+            stream.credit.release()  # another partial was queued while this one waited
+            return
+        if key is not None and not message.get("is_final"):
+            stream.partials[key] = message
+        stream.outbound.append(message)
+        if len(stream.outbound) == 1:
+            self._ready.append(stream.id)
+        self._wake.set()
+
+    def _merge_partial(self, stream: MuxStream, key: Tuple, message: dict) -> bool:
+        """Supersede the speaker's queued partial; True if `message` took its place"""
+        pending = stream.partials.pop(key, None)
+        if pending is None:
+            return False
+        self.stats.partials_merged += 1
+        index = next(i for i, queued in enumerate(stream.outbound) if queued is pending)
+        if not message.get("is_final"):
+            stream.outbound[index] = message  # keeps the slot (and credit) of the older partial
+            stream.partials[key] = message
+            return True
+        del stream.outbound[index]  # the final is queued in order, behind what came before it
+        stream.credit.release()
+        return False
+
+    async def _send_error(self, stream_id: str, text: str):
+        await self._send({"type": "batch", "messages": [{"type": "error", "message": text, "stream": stream_id}]})
+
+    def _next_batch(self) -> list:
+        batch = []
+        while self._ready and len(batch) < self.max_batch:
+            stream = self.streams.get(self._ready.popleft())
+            if stream is None:
+                continue
+            for _ in range(min(self.quota, self.max_batch - len(batch))):
+                if not stream.outbound:
+                    break
+                message = stream.outbound.popleft()
+                key = partial_key(message)
+                if key is not None and stream.partials.get(key) is message:
+                    del stream.partials[key]
+                batch.append(message)
+                stream.credit.release()
+            if stream.outbound:
+                self._ready.append(stream.id)
+        return batch
+
+    async def _write_loop(self):
+        while True:
+            await self._wake.wait()
+            if self.batch_s:
+                # Let other streams' messages from the same moment join this frame
+                await asyncio.sleep(self.batch_s)
+            self._wake.clear()
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    break
+                self.stats.batches += 1
+                self.stats.messages += len(batch)
+                await self._send({"type": "batch", "messages": batch})
+
+
+mux_stats = MuxStats()
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Tuple
+
+from fastapi import WebSocket
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients that cannot keep up ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def dumps(message: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(message).decode("utf-8")
+    return json.dumps(message, separators=(",", ":"))
+
+
+def partial_key(message: dict) -> Optional[Tuple]:
+    """Coalescing key for transcript messages; None for everything else"""
+    if message.get("type") != "transcript":
+        return None
+    return (message.get("stream"), message.get("speaker"))
+
+
+class OutboundStats:
+    """Worker-wide outbound writer counters for /metrics"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+        self.partials_merged = 0
+        self.send_errors = 0
+        self.slow_consumers = 0
+        self.max_queue_depth = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "serializer": "orjson" if orjson is not None else "json",
+            "messages": self.messages,
+            "bytes": self.bytes,
+            "partials_merged": self.partials_merged,
+            "send_errors": self.send_errors,
+            "slow_consumers": self.slow_consumers,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class OutboundWriter:
+    """Per-connection writer task: producers enqueue, one task serializes and sends.
+
+    Messages go out in order, except partial transcripts: they are held
+    aside (one per speaker/stream, the newest replacing the older) and only
+    written when nothing else is waiting, so audio and final transcripts are
+    never stuck behind them. A final transcript drops its speaker's pending
+    partial. Producers that call `wait_writable` pause above half of
+    `max_queue`; a client whose backlog still exceeds `max_queue` messages,
+    or whose oldest queued message is `max_lag_s` old, is a slow consumer
+    and is disconnected before the backlog grows without bound.
+    """
+
+    def __init__(self, websocket: WebSocket, stats: OutboundStats, max_queue: int = 1000,
+                 max_lag_s: float = 10.0):
+        self.websocket = websocket
+        self.stats = stats
+        self.max_queue = max_queue
+        self.max_lag_s = max_lag_s
+        self.high_water = max(1, max_queue // 2)
+        self.queue: Deque[Tuple[float, dict]] = deque()
+        self.partials: "OrderedDict[Tuple, dict]" = OrderedDict()
+        self.closed = False
+        self._wake = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._idle = asyncio.Event()  # nothing queued or being sent
+        self._idle.set()
+        self._closer: Optional[asyncio.Task] = None
+        self._task = asyncio.create_task(self._run())
+
+    @classmethod
+    def from_settings(cls, settings, websocket: WebSocket, stats: OutboundStats) -> "OutboundWriter":
+        return cls(websocket, stats, max_queue=settings.outbound_queue_messages,
+                   max_lag_s=settings.outbound_max_lag_s)
+
+    def depth(self) -> int:
+        # Held partials are at most one per speaker, so only the ordered queue can grow
+        return len(self.queue)
+
+    def lag_s(self) -> float:
+        return time.monotonic() - self.queue[0][0] if self.queue else 0.0
+
+    def put(self, message: dict):
+        if self.closed:
+            return
+        key = partial_key(message)
+        if key is not None and not message.get("is_final"):
+            if self.partials.pop(key, None) is not None:
+                self.stats.partials_merged += 1
+            self.partials[key] = message
+        else:
+            if key is not None and self.partials.pop(key, None) is not None:
+                self.stats.partials_merged += 1
+            self.queue.append((time.monotonic(), message))
+        self._idle.clear()
+        depth = self.depth()
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, depth)
+        if depth > self.max_queue or self.lag_s() > self.max_lag_s:
+            self._give_up(f"{depth} messages queued, {self.lag_s():.1f}s behind")
+            return
+        self._wake.set()
+
+    async def wait_writable(self):
+        """Backpressure: wait while the backlog is above the high-water mark"""
+        while not self.closed and self.depth() >= self.high_water:
+            if self.lag_s() > self.max_lag_s:
+                self._give_up(f"backlog of {self.depth()} not draining")
+                return
+            self._drained.clear()
+            try:
+                await asyncio.wait_for(self._drained.wait(), self.max_lag_s)
+            except asyncio.TimeoutError:
+                pass
+
+    def _next(self) -> Optional[dict]:
+        if self.queue:
+            return self.queue.popleft()[1]
+        if self.partials:
+            return self.partials.popitem(last=False)[1]
+        return None
+
+    def _give_up(self, reason: str):
+        self.stats.slow_consumers += 1
+        logger.warning(f"🐌 Disconnecting slow consumer ({reason})")
+        self.close()
+        self._closer = asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE), 1.0)
+        except Exception as e:
+            logger.debug(f"Error closing slow consumer: {e}")
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while (message := self._next()) is not None:
+                text = dumps(message)
+                try:
+                    await self.websocket.send_text(text)
+                except Exception as e:
+                    self.stats.send_errors += 1
+                    logger.error(f"Error sending message: {e}")
+                    self.close()
+                    return
+                self.stats.messages += 1
+                self.stats.bytes += len(text)
+                if self.depth() < self.high_water:
+                    self._drained.set()
+            self._idle.set()
+
+    async def drain(self, timeout: float = 1.0) -> bool:
+        """Wait until everything queued so far has been sent; False on timeout"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def aclose(self, timeout: float = 1.0):
+        """Flush the backlog (for up to `timeout`), then stop the writer and any socket close"""
+        if not self.closed and not await self.drain(timeout):
+            logger.debug(f"Closing writer with {self.depth()} messages unsent")
+        self.close()
+        current = asyncio.current_task()
+        tasks = [task for task in (self._task, self._closer) if task is not None and task is not current]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        """Stop at once, dropping anything still queued"""
+        self.closed = True
+        self.queue.clear()
+        self.partials.clear()
+        self._drained.set()
+        self._idle.set()
+        if asyncio.current_task() is not self._task:
+            self._task.cancel()
+
+
+outbound_stats = OutboundStats()
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PlaybackStats:
+    """Worker-wide client playback counters for /metrics"""
+
+    def __init__(self):
+        self.turns = 0
+        self.playback_starts = 0
+        self.underruns = 0
+        self.underrun_ms = 0.0
+        self.paced_s = 0.0
+        self.recent_turn_to_playback_s: Deque[float] = deque(maxlen=1024)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self.recent_turn_to_playback_s)
+
+        def pct(p: float) -> Optional[float]:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000 if recent else None
+
+        return {
+            "turns": self.turns,
+            "playback_starts": self.playback_starts,
+            "underruns": self.underruns,
+            "underrun_ms": self.underrun_ms,
+            "paced_ms": self.paced_s * 1000,
+            "p50_turn_to_playback_ms": pct(0.50),
+            "p95_turn_to_playback_ms": pct(0.95),
+        }
+
+
+class PlaybackTracker:
+    """Sequencing, pacing and client playback acks for one session's TTS audio.
+
+    Every audio_chunk gets a session-wide `seq`, the `turn` it belongs to,
+    its presentation offset within the turn (`pts_ms`, framed formats only)
+    and the server send time. Clients that send playback acks (config
+    ``playback_acks``) report when a turn became audible and when their
+    buffer ran dry; the tracker then keeps at most `lead_ms` of audio
+    ahead of the client's playhead instead of bursting the whole reply.
+    """
+
+    def __init__(self, stats: PlaybackStats, lead_ms: float = 800):
+        self.stats = stats
+        self.lead_s = lead_ms / 1000
+        self.acks_enabled = False
+        self.seq = 0
+        self.turn = 0
+        self.turn_committed_at = 0.0  # when the user turn this reply answers was committed
+        self.turn_audible = False     # client has acked the start of playback for this turn
+        self.turn_chunks = 0
+        self.turn_audio_s = 0.0   # audio sent so far in this turn
+        self.playhead_origin: Optional[float] = None  # server time the client's playhead was at pts 0
+
+    @classmethod
+    def from_settings(cls, settings) -> "PlaybackTracker":
+        return cls(playback_stats, lead_ms=settings.playback_lead_ms)
+
+    def begin_turn(self, committed_at: Optional[float] = None) -> int:
+        """Start a reply turn; `committed_at` (perf_counter) anchors its turn-to-playback latency"""
+        self.turn += 1
+        self.turn_committed_at = time.perf_counter() if committed_at is None else committed_at
+        self.turn_audible = False
+        self.turn_chunks = 0
+        self.turn_audio_s = 0.0
+        self.playhead_origin = None
+        self.stats.turns += 1
+        return self.turn
+
+    def stamp(self, message: dict, frame_ms: Optional[float] = None) -> dict:
+        """Add sequencing fields to an outgoing audio_chunk message"""
+        self.seq += 1
+        message.update({
+            "seq": self.seq,
+            "turn": self.turn,
+            "pts_ms": round(self.turn_audio_s * 1000, 3) if frame_ms else None,
+            "sent_at": time.time() * 1000,
+        })
+        self.turn_chunks += 1
+        if frame_ms:
+            self.turn_audio_s += frame_ms / 1000
+        return message
+
+    def end_turn(self) -> dict:
+        """Body of the audio_end message that closes a turn's audio"""
+        return {"turn": self.turn, "last_seq": self.seq, "chunks": self.turn_chunks,
+                "duration_ms": round(self.turn_audio_s * 1000, 3)}
+
+    async def pace(self):
+        """Wait while the client already holds more than `lead_ms` of unplayed audio"""
+        if not self.acks_enabled or self.turn_audio_s == 0:
+            return
+        now = time.perf_counter()
+        if self.playhead_origin is None:
+            # Until the client reports playback start, assume it began with the first frame
+            self.playhead_origin = now
+        ahead = self.turn_audio_s - (now - self.playhead_origin)
+        if ahead > self.lead_s:
+            delay = ahead - self.lead_s
+            self.stats.paced_s += delay
+            await asyncio.sleep(delay)
+
+    def on_ack(self, ack: dict):
+        """Handle a client `playback` message (start / underrun / end)"""
+        if ack.get("turn") != self.turn:
+            return
+        event = ack.get("event")
+        now = time.perf_counter()
+        if event == "start":
+            if not self.turn_audible:
+                # From the committed user turn to the first chunk the client played
+                self.turn_audible = True
+                self.stats.playback_starts += 1
+                self.stats.recent_turn_to_playback_s.append(now - self.turn_committed_at)
+            # The chunk at `pts_ms` started playing now
+            self.playhead_origin = now - float(ack.get("pts_ms") or 0) / 1000
+        elif event == "underrun":
+            gap_ms = float(ack.get("gap_ms") or 0)
+            self.stats.underruns += 1
+            self.stats.underrun_ms += gap_ms
+            if self.playhead_origin is not None:
+                # The client's playhead stalled for the gap
+                self.playhead_origin += gap_ms / 1000
+            logger.debug(f"🔇 Client underrun in turn {self.turn} at seq {ack.get('seq')}: {gap_ms:.0f} ms")
+
+
+playback_stats = PlaybackStats()
@@ -0,0 +1,286 @@
+import asyncio
+import importlib
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import AbstractSet, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Type
+
+from .startup import startup_profile
+
+logger = logging.getLogger(__name__)
+
+# Entry point group third-party packages use to ship provider plugins
+PLUGIN_ENTRY_POINT_GROUP = "voice_chat_agent.providers"
+
+BUILTIN_PROVIDER_MODULES = [
+    ".asr_providers.assemblyai",
+    ".asr_providers.deepgram",
+    ".asr_providers.mock",
+    ".asr_providers.local",
+    ".murf",
+    ".local_tts",
+    ".llm",
+    ".mock",
+]
+
+
+@dataclass(frozen=True)
+class ProviderCapabilities:
+    """What a backend can do, so callers can adapt instead of special-casing names"""
+    native_streaming: bool = False   # consumes/produces audio incrementally
+    partial_results: bool = False    # ASR emits interim transcripts
+    compressed_input: bool = False   # ASR accepts compressed audio (e.g. Opus)
+    local: bool = False              # runs on this box, no network round trip
+    sample_rate: int = 16000         # ASR input / TTS output sample rate
+    audio_format: str = "pcm16"      # ASR input / TTS output encoding
+
+
+class ASRProvider(ABC):
+    """Streaming speech recognition session: one instance per connection"""
+
+    capabilities = ProviderCapabilities(native_streaming=True, partial_results=True)
+    transcript_callback: Optional[Callable[[str, bool], Awaitable[None]]] = None
+    # Background tasks this session owns; every one must be done once close_session returns
+    pending_tasks: AbstractSet[asyncio.Task] = frozenset()
+
+    @classmethod
+    def from_settings(cls, settings) -> "ASRProvider":
+        return cls()
+
+    @classmethod
+    def is_configured(cls, settings) -> bool:
+        return True
+
+    @classmethod
+    async def prepare(cls, settings):
+        """Warm per-worker resources (clients, models) once at startup (optional)"""
+
+    def set_callback(self, callback: Callable[[str, bool], Awaitable[None]]):
+        """Set callback for transcript results"""
+        self.transcript_callback = callback
+
+    @abstractmethod
+    async def start_session(self):
+        """Open the upstream session"""
+
+    @abstractmethod
+    async def start_stream(self):
+        """Begin a recording"""
+
+    @abstractmethod
+    async def stop_stream(self):
+        """End a recording, flushing any pending result"""
+
+    @abstractmethod
+    async def process_audio(self, audio_data: bytes):
+        """Feed one chunk of input audio"""
+
+    async def keepalive(self):
+        """Keep the upstream session open while the client is away (optional)"""
+
+    def buffered_bytes(self) -> int:
+        """Input audio held in memory, for per-session resource accounting"""
+        return 0
+
+    def upstream_sockets(self) -> int:
+        """Open connections to the upstream service"""
+        return 0
+
+    @abstractmethod
+    async def close_session(self):
+        """Release all upstream resources"""
+
+
+class TTSProvider(ABC):
+    """Text-to-speech backend"""
+
+    capabilities = ProviderCapabilities(sample_rate=24000, audio_format="mp3")
+
+    @classmethod
+    def from_settings(cls, settings) -> "TTSProvider":
+        return cls()
+
+    @classmethod
+    def is_configured(cls, settings) -> bool:
+        return True
+
+    @classmethod
+    async def prepare(cls, settings):
+        """Warm per-worker resources (clients, models) once at startup (optional)"""
+
+    async def start_session(self):
+        """Acquire per-connection resources (optional)"""
+
+    async def close_session(self):
+        """Release per-connection resources (optional)"""
+
+    @abstractmethod
+    def stream_tts(self, text: str, voice: str = "en_us_001", output_format=None) -> AsyncGenerator[bytes, None]:
+        """Yield encoded audio chunks for `text`.
+
+        `output_format` is the transcode.OutputFormat the client negotiated;
+        providers may use it to pick the closest native format, and the
+        caller transcodes whatever comes back.
+        """
+
+    async def get_available_voices(self) -> List[Dict]:
+        return []
+
+
+class LLMProvider(ABC):
+    """Response generator for final user transcripts"""
+
+    capabilities = ProviderCapabilities()
+
+    @classmethod
+    def from_settings(cls, settings) -> "LLMProvider":
+        return cls()
+
+    @classmethod
+    def is_configured(cls, settings) -> bool:
+        return True
+
+    @classmethod
+    async def prepare(cls, settings):
+        """Warm per-worker resources (clients, models) once at startup (optional)"""
+
+    @abstractmethod
+    async def process_query(self, query: str) -> str:
+        """Return the agent's reply to `query`"""
+
+
+PROVIDER_KINDS = {"asr": ASRProvider, "tts": TTSProvider, "llm": LLMProvider}
+
+
+class ProviderRegistry:
+    """Name -> provider class lookup for each provider kind"""
+
+    def __init__(self):
+        self._providers: Dict[str, Dict[str, type]] = {kind: {} for kind in PROVIDER_KINDS}
+
+    def register(self, kind: str, name: str):
+        """Class decorator registering a provider under `name`"""
+        def decorator(cls):
+            if not issubclass(cls, PROVIDER_KINDS[kind]):
+                raise TypeError(f"{cls.__name__} must subclass {PROVIDER_KINDS[kind].__name__}")
+            self._providers[kind][name] = cls
+            return cls
+        return decorator
+
+    def get(self, kind: str, name: str) -> Optional[type]:
+        return self._providers[kind].get(name)
+
+    def names(self, kind: str) -> List[str]:
+        return sorted(self._providers[kind])
+
+
+registry = ProviderRegistry()
+
+
+def register_asr(name: str):
+    return registry.register("asr", name)
+
+
+def register_tts(name: str):
+    return registry.register("tts", name)
+
+
+def register_llm(name: str):
+    return registry.register("llm", name)
+
+
+def _timed_import(module: str, package: Optional[str] = None):
+    start = time.perf_counter()
+    importlib.import_module(module, package)
+    startup_profile.record_import(module.lstrip("."), time.perf_counter() - start)
+
+
+def load_providers(extra_modules: Optional[List[str]] = None):
+    """Import built-in provider modules and any plugins so they self-register.
+
+    A module that fails to import (usually a missing optional dependency)
+    is logged and skipped; its providers are simply not registered.
+    """
+    for module in BUILTIN_PROVIDER_MODULES:
+        try:
+            _timed_import(module, __package__)
+        except ImportError as e:
+            logger.error(f"❌ Skipping provider module {module.lstrip('.')}: {e}")
+    for module in extra_modules or []:
+        try:
+            _timed_import(module)
+        except ImportError as e:
+            logger.error(f"❌ Skipping provider module {module}: {e}")
+
+    for entry_point in entry_points(group=PLUGIN_ENTRY_POINT_GROUP):
+        try:
+            entry_point.load()
+            logger.info(f"Loaded provider plugin: {entry_point.name}")
+        except Exception as e:
+            logger.error(f"❌ Failed to load provider plugin {entry_point.name}: {e}")
+
+
+class ProviderSet:
+    """Provider classes chosen for this worker; creates per-connection instances"""
+
+    def __init__(self, settings, asr: Optional[Type[ASRProvider]], tts: Optional[Type[TTSProvider]],
+                 llm: Type[LLMProvider]):
+        self.settings = settings
+        self.asr = asr
+        self.tts = tts
+        self.llm = llm
+
+    def create_asr(self) -> ASRProvider:
+        if self.asr is None:
+            return self.create_fallback_asr()
+        return self.asr.from_settings(self.settings)
+
+    def create_fallback_asr(self) -> ASRProvider:
+        """Demo AssemblyAI session used when the configured ASR is unavailable"""
+        return registry.get("asr", "assemblyai")("demo")
+
+    def create_tts(self) -> Optional[TTSProvider]:
+        return self.tts.from_settings(self.settings) if self.tts else None
+
+    def create_llm(self) -> LLMProvider:
+        return self.llm.from_settings(self.settings)
+
+    async def prepare(self):
+        """Run each selected provider's startup hook; failures only log"""
+        for cls in (self.asr, self.tts, self.llm):
+            if cls is None:
+                continue
+            try:
+                await cls.prepare(self.settings)
+            except Exception as e:
+                logger.error(f"❌ Failed to prepare {cls.__name__}: {e}")
+
+
+def _select(kind: str, name: str, settings) -> Optional[type]:
+    cls = registry.get(kind, name)
+    if cls is None:
+        logger.error(f"❌ Unknown {kind.upper()} provider '{name}' (available: {', '.join(registry.names(kind))})")
+        return None
+    if not cls.is_configured(settings):
+        logger.warning(f"{kind.upper()} provider '{name}' is not configured")
+        return None
+    return cls
+
+
+def resolve_providers(settings) -> ProviderSet:
+    """Pick provider classes from settings; done once per worker at startup"""
+    load_providers(settings.provider_plugins)
+
+    asr = _select("asr", settings.asr_provider, settings)
+    if asr is None:
+        logger.warning("Falling back to demo ASR provider")
+    tts = _select("tts", settings.tts_provider, settings)
+    if tts is None:
+        logger.warning("TTS functionality disabled")
+    llm = _select("llm", settings.llm_provider, settings) or registry.get("llm", "openai")
+
+    logger.info(f"Providers resolved: asr={asr.__name__ if asr else 'demo'}, "
+                f"tts={tts.__name__ if tts else 'none'}, llm={llm.__name__}")
+    return ProviderSet(settings, asr, tts, llm)
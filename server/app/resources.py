@@ -0,0 +1,157 @@
+import asyncio
+import gc
+import time
+import tracemalloc
+import weakref
+from typing import List, Optional
+
+
+class ResourceLeak(AssertionError):
+    """A closed session still owns running tasks or open upstream sockets"""
+
+
+class SessionResources:
+    """Audio a session has taken in and sent out"""
+
+    def __init__(self):
+        self.opened_at = time.monotonic()
+        self.bytes_in = 0
+        self.audio_in_s = 0.0
+        self.bytes_out = 0
+        self.chunks_out = 0
+        self.audio_out_s = 0.0  # framed formats only; MP3 passthrough has no known duration
+
+    def record_input(self, audio: bytes, sample_rate: int):
+        self.bytes_in += len(audio)
+        self.audio_in_s += len(audio) / 2 / sample_rate  # PCM16 mono
+
+    def record_output(self, audio: bytes, frame_ms: Optional[float]):
+        self.bytes_out += len(audio)
+        self.chunks_out += 1
+        if frame_ms:
+            self.audio_out_s += frame_ms / 1000
+
+    def snapshot(self) -> dict:
+        return {
+            "age_s": time.monotonic() - self.opened_at,
+            "bytes_in": self.bytes_in,
+            "audio_in_s": self.audio_in_s,
+            "bytes_out": self.bytes_out,
+            "chunks_out": self.chunks_out,
+            "audio_out_s": self.audio_out_s,
+        }
+
+
+async def await_released(tasks: List[asyncio.Task], timeout: float = 1.0) -> List[asyncio.Task]:
+    """Wait for (already cancelled) tasks to finish; return the ones that did not"""
+    current = asyncio.current_task()
+    tasks = [task for task in tasks if task is not current and not task.done()]
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
+    return [task for task in tasks if not task.done()]
+
+
+class ResourceStats:
+    """Worker-wide session resource accounting for /metrics and /debug/sessions.
+
+    Live sessions are tracked weakly, so the registry itself can never be
+    what keeps a finished session in memory.
+    """
+
+    def __init__(self):
+        self.sessions_opened = 0
+        self.sessions_closed = 0
+        self.leak_checks = 0
+        self.leaks = 0
+        self.leaked_tasks = 0
+        self.leaked_sockets = 0
+        self._live = weakref.WeakSet()
+
+    def track(self, session):
+        self.sessions_opened += 1
+        self._live.add(session)
+
+    def record_close(self, leaked_tasks: int, leaked_sockets: int):
+        self.sessions_closed += 1
+        self.leak_checks += 1
+        if leaked_tasks or leaked_sockets:
+            self.leaks += 1
+            self.leaked_tasks += leaked_tasks
+            self.leaked_sockets += leaked_sockets
+
+    def sessions(self) -> List[dict]:
+        return [session.resource_snapshot() for session in list(self._live) if not session.closed]
+
+    def snapshot(self) -> dict:
+        live = self.sessions()
+        return {
+            "sessions_opened": self.sessions_opened,
+            "sessions_closed": self.sessions_closed,
+            "live_sessions": len(live),
+            "uncollected_sessions": len(self._live) - len(live),  # closed, still waiting for the GC
+            "buffered_bytes": sum(session["buffered_bytes"] for session in live),
+            "live_tasks": sum(session["live_tasks"] for session in live),
+            "upstream_sockets": sum(session["upstream_sockets"] for session in live),
+            "audio_in_s": sum(session["audio_in_s"] for session in live),
+            "audio_out_s": sum(session["audio_out_s"] for session in live),
+            "leak_checks": self.leak_checks,
+            "leaks": self.leaks,
+            "leaked_tasks": self.leaked_tasks,
+            "leaked_sockets": self.leaked_sockets,
+        }
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots on demand, each diffed against the previous one.
+
+    Tracing costs CPU and memory, so it only runs between the first
+    `snapshot()` and `stop()`.
+    """
+
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def snapshot(self, top: int = 20) -> dict:
+        gc.collect()  # leave unreachable garbage out of the diff; only live objects count
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._previous = tracemalloc.take_snapshot()
+            return {"tracing": True, "started": True, "top": []}
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        if self._previous is not None:
+            stats = snapshot.compare_to(self._previous, "lineno")
+        else:
+            stats = snapshot.statistics("lineno")
+        self._previous = snapshot
+        return {
+            "tracing": True,
+            "started": False,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [{
+                "where": str(stat.traceback[0]),
+                "size": stat.size,
+                "count": stat.count,
+                "size_diff": getattr(stat, "size_diff", None),
+                "count_diff": getattr(stat, "count_diff", None),
+            } for stat in stats[:top]],
+        }
+
+    def stop(self) -> dict:
+        was_tracing = tracemalloc.is_tracing()
+        tracemalloc.stop()
+        self._previous = None
+        return {"tracing": False, "stopped": was_tracing}
+
+
+resource_stats = ResourceStats()
+memory_profiler = MemoryProfiler()
@@ -0,0 +1,562 @@
+import asyncio
+import base64
+import logging
+import secrets
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from .audio_executor import ExecutorSaturated, audio_executor
+from .config import settings
+from .endpointing import TurnAssembler
+from .playback import PlaybackTracker
+from .providers import ProviderSet
+from .resources import ResourceLeak, SessionResources, await_released, resource_stats
+from .speculation import SpeculativeReply, SpeculativeResponder, split_first_sentence
+from .transcode import LEGACY_OUTPUT_FORMAT, TTSTranscoder, negotiate_output_format
+from .utils import SPEECH_THRESHOLD
+from .voices import voice_catalog
+
+logger = logging.getLogger(__name__)
+
+SendFn = Callable[[dict], Awaitable[None]]
+
+# Capture rates a client may configure; input is resampled to 16 kHz for ASR
+MIN_INPUT_SAMPLE_RATE = 8000
+MAX_INPUT_SAMPLE_RATE = 48000
+
+
+class VoiceSession:
+    """One voice conversation: providers, negotiated formats and turn state.
+
+    The session does not own a socket; everything it emits goes through
+    `send`, which the caller points at the current transport. That lets a
+    session survive a dropped connection (see `detach`/`attach`): while
+    detached, outgoing messages queue up, and sent TTS chunks the client
+    has not acknowledged are kept so a reconnecting client can pick up
+    after the last sequence number it received.
+    """
+
+    def __init__(self, providers: ProviderSet, send: SendFn, resumable: bool = True):
+        self.providers = providers
+        self._send = send
+        self.token = secrets.token_urlsafe(24)
+        self.attached = True
+        self.closed = False
+        self.resumable = resumable and settings.resume_grace_s > 0
+        self.pending: Deque[dict] = deque(maxlen=settings.resume_buffer_messages)  # emitted while detached
+        self.unacked: Deque[dict] = deque(maxlen=settings.resume_buffer_messages)  # audio_chunks sent while attached
+        self.evicted_seq = 0    # newest audio_chunk pushed out of a full resume buffer since the last attach
+        self.evicted_other = 0  # other messages pushed out of it (emitted while detached)
+        self.started = False
+
+        self.asr_provider = None
+        self.tts_provider = None
+        self.llm_processor = None
+        self.speculator: Optional[SpeculativeResponder] = None
+        self.turns: Optional[TurnAssembler] = None
+        self.playback = PlaybackTracker.from_settings(settings)  # audio_chunk sequencing and client acks
+
+        self.current_voice = "en_us_001"
+        self.is_recording = False
+        self.input_sample_rate = 16000  # what the client captures at; ASR expects 16 kHz
+        self.output_format = LEGACY_OUTPUT_FORMAT  # TTS format negotiated by the client
+
+        self.resources = SessionResources()
+        resource_stats.track(self)
+
+    async def start(self):
+        """Open provider sessions and wire up the turn pipeline"""
+        providers = self.providers
+        # Initialize ASR provider
+        try:
+            self.asr_provider = providers.create_asr()
+            await self.asr_provider.start_session()
+            logger.info(f"✅ {type(self.asr_provider).__name__} ASR provider initialized successfully")
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize ASR provider: {e}")
+            # Even if initialization fails, create a demo provider
+            self.asr_provider = providers.create_fallback_asr()
+            await self.asr_provider.start_session()
+            logger.info("🔄 Using demo ASR provider as fallback")
+
+        # Initialize TTS provider
+        try:
+            self.tts_provider = providers.create_tts()
+            if self.tts_provider:
+                await self.tts_provider.start_session()
+                logger.info(f"✅ {type(self.tts_provider).__name__} TTS provider initialized successfully")
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize TTS provider: {e}")
+            self.tts_provider = None
+
+        # Initialize LLM processor
+        self.llm_processor = providers.create_llm()
+        logger.info(f"✅ {type(self.llm_processor).__name__} LLM processor initialized")
+
+        if settings.speculation_enabled:
+            self.speculator = SpeculativeResponder.from_settings(settings, self.speculate_response)
+        # Merges fragmentary finals into one turn before replying
+        self.turns = TurnAssembler.from_settings(settings, self.respond_to_turn)
+
+        # Set ASR callback if ASR provider is available
+        if self.asr_provider:
+            self.asr_provider.set_callback(self.handle_asr_transcript)
+            logger.info("✅ ASR callback set")
+        self.started = True
+
+    def status_message(self) -> dict:
+        message = {
+            "type": "status",
+            "status": "connected",
+            "message": "Voice chat agent ready",
+            "capabilities": {
+                "asr": self.asr_provider is not None,
+                "tts": self.tts_provider is not None,
+                "llm": self.llm_processor is not None
+            }
+        }
+        if self.resumable:
+            message.update({"resume_token": self.token, "resume_grace_s": settings.resume_grace_s})
+        return message
+
+    async def send(self, message: dict):
+        if not self.attached:
+            self._retain(self.pending, message)
+            return
+        if self.resumable and message.get("type") == "audio_chunk":
+            self._retain(self.unacked, message)
+        await self._send(message)
+
+    def _retain(self, buffer: Deque[dict], message: dict):
+        """Keep `message` for replay, noting what a full buffer pushes out"""
+        if len(buffer) == buffer.maxlen:
+            evicted = buffer[0]
+            if evicted.get("type") == "audio_chunk":
+                self.evicted_seq = max(self.evicted_seq, evicted["seq"])
+            else:
+                self.evicted_other += 1
+        buffer.append(message)
+
+    # Transport lifecycle
+
+    def detach(self):
+        """The transport went away; queue output until `attach` or close"""
+        self.attached = False
+        logger.info(f"⏸️ Session detached; keeping it for {settings.resume_grace_s}s")
+
+    async def attach(self, send: SendFn, last_seq: int = 0):
+        """Continue on a new transport, replaying audio after `last_seq`"""
+        self._send = send
+        self.token = secrets.token_urlsafe(24)  # tokens are single-use
+        self.ack_audio(last_seq)
+        replay = list(self.unacked) + list(self.pending)
+        # Audio after `last_seq`, or any other message, fell out of a full buffer
+        gap = self.evicted_seq > last_seq or self.evicted_other > 0
+        self.unacked.clear()
+        self.pending.clear()
+        self.attached = True
+        await self.send({**self.status_message(), "status": "resumed", "message": "Session resumed",
+                         "replayed": len(replay)})
+        if gap:
+            replayed_seqs = [message["seq"] for message in replay if message.get("type") == "audio_chunk"]
+            first_seq = replayed_seqs[0] if replayed_seqs else self.evicted_seq + 1
+            await self.send({"type": "resume_gap", "last_seq": last_seq, "first_seq": first_seq,
+                             "dropped_messages": self.evicted_other,
+                             "message": f"Resume buffer overflowed; audio continues at seq {first_seq}"})
+            logger.warning(f"🕳️ Resumed after seq {last_seq} with a gap; replay starts at seq {first_seq}")
+        self.evicted_seq = 0
+        self.evicted_other = 0
+        for message in replay:
+            await self.send(message)
+        logger.info(f"▶️ Session resumed after seq {last_seq}; replayed {len(replay)} messages")
+
+    def ack_audio(self, seq: int):
+        """Forget retained audio chunks up to and including `seq`"""
+        while self.unacked and self.unacked[0]["seq"] <= seq:
+            self.unacked.popleft()
+
+    async def keepalive(self):
+        """Keep upstream sessions open while no audio is flowing"""
+        if self.asr_provider:
+            await self.asr_provider.keepalive()
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        owned = self.owned_tasks()  # cancel() below forgets the tasks it cancels
+        if self.speculator:
+            self.speculator.cancel()
+        if self.turns:
+            self.turns.cancel()
+        if self.asr_provider:
+            await self.asr_provider.close_session()
+        if self.tts_provider:
+            await self.tts_provider.close_session()
+        try:
+            await self.check_released(owned)
+        finally:
+            self._break_cycles()
+
+    # Resource accounting
+
+    def owned_tasks(self) -> List[asyncio.Task]:
+        """Background tasks started on this session's behalf that are still running"""
+        tasks = []
+        if self.asr_provider:
+            tasks.extend(self.asr_provider.pending_tasks)
+        if self.turns:
+            tasks.extend(self.turns.tasks())
+        if self.speculator:
+            tasks.extend(self.speculator.tasks())
+        return [task for task in tasks if not task.done()]
+
+    def upstream_sockets(self) -> int:
+        return self.asr_provider.upstream_sockets() if self.asr_provider else 0
+
+    def resource_snapshot(self) -> dict:
+        """What this session holds and has streamed, for /debug/sessions and /metrics"""
+        retained = [*self.pending, *self.unacked]
+        return {
+            "attached": self.attached,
+            "recording": self.is_recording,
+            "buffered_bytes": ((self.asr_provider.buffered_bytes() if self.asr_provider else 0)
+                               + sum(len(message.get("payload", "")) for message in retained)),
+            "retained_messages": len(retained),
+            "live_tasks": len(self.owned_tasks()),
+            "upstream_sockets": self.upstream_sockets(),
+            **self.resources.snapshot(),
+        }
+
+    def _break_cycles(self):
+        """Drop component references back to this session, so refcounting frees it on disconnect"""
+        if self.asr_provider:
+            self.asr_provider.transcript_callback = None
+        self.turns = None
+        self.speculator = None
+
+    async def check_released(self, tasks: List[asyncio.Task]):
+        """Leak check on close: every owned task finished and no upstream socket left open"""
+        leaked = await await_released(tasks + self.owned_tasks())
+        sockets = self.upstream_sockets()
+        resource_stats.record_close(len(leaked), sockets)
+        if leaked or sockets:
+            message = f"Session closed with {len(leaked)} running tasks and {sockets} open upstream sockets"
+            if settings.leak_check_strict:
+                raise ResourceLeak(message)
+            logger.warning(f"🧹 {message}")
+
+    # Client input
+
+    async def handle_message(self, message_data: dict):
+        message_type = message_data.get("type")
+        logger.info(f"📥 Received message: {message_type}")
+
+        if message_type == "start":
+            if self.asr_provider:
+                await self.asr_provider.start_stream()
+                self.is_recording = True
+                await self.send({
+                    "type": "status",
+                    "status": "recording"
+                })
+                logger.info("🎤 Recording started - ready for audio")
+            else:
+                await self.send({
+                    "type": "error",
+                    "message": "ASR not available - cannot start recording"
+                })
+
+        elif message_type == "stop":
+            if self.asr_provider:
+                await self.asr_provider.stop_stream()
+            if self.turns:
+                self.turns.flush()  # no more speech is coming; reply without waiting out the grace window
+            self.is_recording = False
+            await self.send({
+                "type": "status",
+                "status": "stopped"
+            })
+            logger.info("⏹️ Recording stopped")
+
+        elif message_type == "playback":
+            self.playback.on_ack(message_data)
+            if message_data.get("seq") is not None and message_data.get("event") in ("start", "end", "received"):
+                self.ack_audio(int(message_data["seq"]))
+
+        elif message_type == "config":
+            if "voice" in message_data:
+                voice = voice_catalog.get(str(message_data["voice"]))
+                if voice:
+                    self.current_voice = voice.id
+                else:
+                    await self.send({
+                        "type": "error",
+                        "message": f"Unknown voice '{message_data['voice']}' - keeping {self.current_voice}"
+                    })
+            if "sample_rate" in message_data:
+                try:
+                    sample_rate = int(message_data["sample_rate"])
+                except (TypeError, ValueError):
+                    sample_rate = 0
+                if MIN_INPUT_SAMPLE_RATE <= sample_rate <= MAX_INPUT_SAMPLE_RATE:
+                    self.input_sample_rate = sample_rate
+                else:
+                    await self.send({
+                        "type": "error",
+                        "message": f"Unsupported sample_rate {message_data['sample_rate']!r} - keeping "
+                                   f"{self.input_sample_rate} ({MIN_INPUT_SAMPLE_RATE}-{MAX_INPUT_SAMPLE_RATE} Hz)"
+                    })
+            self.playback.acks_enabled = bool(message_data.get("playback_acks", self.playback.acks_enabled))
+            if "audio_format" in message_data:
+                self.output_format = negotiate_output_format(message_data["audio_format"])
+                await self.send({
+                    "type": "audio_format",
+                    **self.output_format.describe()
+                })
+            logger.info(f"⚙️ Configuration updated: voice={self.current_voice}, "
+                        f"sample_rate={self.input_sample_rate}, output={self.output_format.codec}")
+
+    async def handle_audio(self, audio_data: bytes):
+        logger.debug(f"🎵 Received audio chunk: {len(audio_data)} bytes")
+        self.resources.record_input(audio_data, self.input_sample_rate)
+
+        if self.is_recording and self.asr_provider:
+            if self.input_sample_rate != 16000:
+                try:
+                    audio_data = await audio_executor.submit(
+                        "resample", audio_data, src_rate=self.input_sample_rate, dst_rate=16000
+                    )
+                except ExecutorSaturated:
+                    logger.warning("⚠️ Audio executor saturated - dropping audio frame")
+                    return
+            if self.turns and settings.endpointing_vad:
+                try:
+                    peak = await audio_executor.submit("peak", audio_data)
+                except ExecutorSaturated:
+                    logger.debug("⚠️ Audio executor saturated - skipping VAD for this frame")
+                else:
+                    self.turns.on_speech(peak > SPEECH_THRESHOLD)
+            await self.asr_provider.process_audio(audio_data)
+        elif self.is_recording and not self.asr_provider:
+            logger.warning("⚠️ Audio received but no ASR provider available")
+
+    # Turn pipeline
+
+    def tts_stream(self, text: str, audio_format):
+        """TTS audio for `text`, framed and transcoded into `audio_format`"""
+        stream = self.tts_provider.stream_tts(text, voice=self.current_voice, output_format=audio_format)
+        if not audio_format.passthrough:
+            transcoder = TTSTranscoder(audio_format, self.tts_provider.capabilities.sample_rate)
+            stream = transcoder.frames(stream)
+        return stream
+
+    async def send_audio_chunk(self, audio_chunk: bytes, audio_format):
+        message = {
+            "type": "audio_chunk",
+            "payload": base64.b64encode(audio_chunk).decode('utf-8')
+        }
+        if not audio_format.passthrough:
+            message.update(audio_format.describe())
+        frame_ms = None if audio_format.passthrough else audio_format.frame_ms
+        self.playback.stamp(message, frame_ms)
+        self.resources.record_output(audio_chunk, frame_ms)
+        await self.send(message)
+        logger.debug(f"🔊 Sent audio chunk: {len(audio_chunk)} bytes")
+        await self.playback.pace()
+
+    async def speculate_response(self, transcript: str) -> SpeculativeReply:
+        """Reply to a stable partial ahead of the final transcript"""
+        reply = SpeculativeReply(await self.llm_processor.process_query(transcript))
+        if settings.speculation_tts and self.tts_provider and reply.text:
+            first_sentence, reply.remainder = split_first_sentence(reply.text)
+            reply.audio_format, reply.voice = self.output_format, self.current_voice
+            try:
+                async for audio_chunk in self.tts_stream(first_sentence, reply.audio_format):
+                    if audio_chunk:
+                        reply.audio.append(audio_chunk)
+            except Exception as e:
+                # The text is still usable; the turn synthesizes everything itself
+                logger.warning(f"🔮 Speculative TTS failed: {e}")
+                reply.audio = []
+        return reply
+
+    async def respond_to_turn(self, transcript: str):
+        """Process a complete user turn with LLM and generate TTS"""
+        if not transcript.strip():
+            return
+        committed_at = time.perf_counter()
+        try:
+            reply = await self.speculator.on_final(transcript) if self.speculator else None
+            if reply:
+                logger.info(f"🔮 Using speculative response for: {transcript}")
+                response_text = reply.text
+            else:
+                logger.info(f"🤖 Processing query: {transcript}")
+                # Get response from LLM
+                response_text = await self.llm_processor.process_query(transcript)
+            logger.info(f"🤖 LLM Response: {response_text}")
+
+            await self.send({
+                "type": "transcript",
+                "text": response_text,
+                "is_final": True,
+                "speaker": "agent"
+            })
+
+            # Generate TTS audio if Murf is available
+            if self.tts_provider and response_text:
+                logger.info(f"🔊 Generating TTS for: {response_text}")
+                await self._speak(response_text, reply, committed_at)
+            else:
+                logger.warning("⚠️ TTS not available - skipping audio generation")
+
+        except Exception as e:
+            logger.error(f"❌ Error processing response: {e}")
+            await self.send({
+                "type": "error",
+                "message": f"Failed to generate response: {str(e)}"
+            })
+
+    async def _speak(self, response_text: str, reply: Optional[SpeculativeReply], committed_at: float):
+        try:
+            audio_format = self.output_format
+            chunks = total_audio = 0
+            self.playback.begin_turn(committed_at)
+            remaining_text = response_text
+            if (reply and reply.audio and reply.audio_format == audio_format
+                    and reply.voice == self.current_voice):
+                # First sentence was synthesized during speculation
+                for audio_chunk in reply.audio:
+                    chunks, total_audio = chunks + 1, total_audio + len(audio_chunk)
+                    await self.send_audio_chunk(audio_chunk, audio_format)
+                remaining_text = reply.remainder
+
+            if remaining_text:
+                async for audio_chunk in self.tts_stream(remaining_text, audio_format):
+                    if audio_chunk and len(audio_chunk) > 0:
+                        chunks, total_audio = chunks + 1, total_audio + len(audio_chunk)
+                        await self.send_audio_chunk(audio_chunk, audio_format)
+
+            if chunks:
+                await self.send({"type": "audio_end", **self.playback.end_turn()})
+                logger.info(f"✅ TTS completed: {chunks} chunks, {total_audio} total bytes sent")
+            else:
+                logger.warning("❌ No audio chunks generated by TTS")
+
+        except Exception as e:
+            logger.error(f"❌ TTS generation error: {e}")
+            await self.send({
+                "type": "error",
+                "message": f"TTS Error: {str(e)}"
+            })
+
+    async def handle_asr_transcript(self, transcript: str, is_final: bool):
+        """Handle ASR transcript results"""
+        logger.info(f"🎤 ASR Transcript (final={is_final}): {transcript}")
+
+        await self.send({
+            "type": "transcript",
+            "text": transcript,
+            "is_final": is_final,
+            "speaker": "user"
+        })
+
+        if not is_final:
+            self.turns.on_partial(transcript)
+            if self.speculator:
+                self.speculator.on_partial(self.turns.with_pending(transcript))
+        elif transcript.strip():
+            await self.turns.on_final(transcript)
+        elif self.speculator:
+            self.speculator.cancel()
+
+
+class SessionStats:
+    """Worker-wide resumption counters for /metrics"""
+
+    def __init__(self):
+        self.parked = 0
+        self.resumed = 0
+        self.expired = 0
+        self.rejected = 0
+
+    def snapshot(self, detached: int) -> dict:
+        return {
+            "detached": detached,
+            "parked": self.parked,
+            "resumed": self.resumed,
+            "expired": self.expired,
+            "rejected_tokens": self.rejected,
+        }
+
+
+class SessionStore:
+    """Detached sessions waiting for their client to reconnect, by resume token"""
+
+    def __init__(self, grace_s: float = 30.0, keepalive_s: float = 5.0):
+        self.grace_s = grace_s
+        self.keepalive_s = keepalive_s
+        self.stats = SessionStats()
+        self._detached: Dict[str, VoiceSession] = {}
+        self._reapers: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> "SessionStore":
+        return cls(grace_s=settings.resume_grace_s)
+
+    async def release(self, session: VoiceSession):
+        """Called when a session's transport closes: park it, or close it if it cannot be resumed"""
+        if self.grace_s <= 0 or not session.resumable or session.closed or not session.started:
+            await self._close(session)
+            return
+        session.detach()
+        self._detached[session.token] = session
+        self._reapers[session.token] = asyncio.create_task(self._reap(session))
+        self.stats.parked += 1
+
+    def claim(self, token: str) -> Optional[VoiceSession]:
+        """Take a detached session back out of the store, if the token is live"""
+        session = self._detached.pop(token, None)
+        if session is None:
+            self.stats.rejected += 1
+            return None
+        self._reapers.pop(token).cancel()
+        self.stats.resumed += 1
+        return session
+
+    def snapshot(self) -> dict:
+        return self.stats.snapshot(len(self._detached))
+
+    async def close_all(self):
+        for token in list(self._detached):
+            self._reapers.pop(token).cancel()
+            await self._close(self._detached.pop(token))
+
+    async def _reap(self, session: VoiceSession):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.grace_s
+        try:
+            while loop.time() < deadline:
+                await asyncio.sleep(min(self.keepalive_s, deadline - loop.time()))
+                try:
+                    await session.keepalive()
+                except Exception as e:
+                    logger.warning(f"Keepalive failed for detached session: {e}")
+        except asyncio.CancelledError:
+            return
+        if self._detached.pop(session.token, None) is session:
+            self._reapers.pop(session.token, None)
+            self.stats.expired += 1
+            logger.info("⌛ Detached session expired without reconnect")
+            await self._close(session)
+
+    async def _close(self, session: VoiceSession):
+        """Close on behalf of a transport or timer: a strict-mode leak is logged, not raised into its cleanup"""
+        try:
+            await session.close()
+        except ResourceLeak as e:
+            logger.error(f"🧹 {e}")
+
+
+session_store = SessionStore.from_settings(settings)
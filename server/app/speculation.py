@@ -0,0 +1,202 @@
+import asyncio
+import difflib
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s']")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase, punctuation-free, single-spaced text for comparing transcripts"""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def transcript_similarity(first: str, second: str) -> float:
+    """Word-level similarity ratio (0-1) between two transcripts"""
+    first_words = normalize_transcript(first).split()
+    second_words = normalize_transcript(second).split()
+    if not first_words and not second_words:
+        return 1.0
+    return difflib.SequenceMatcher(None, first_words, second_words).ratio()
+
+
+def split_first_sentence(text: str) -> Tuple[str, str]:
+    """Split `text` into its first sentence and the rest"""
+    parts = _SENTENCE_END.split(text.strip(), maxsplit=1)
+    return parts[0], parts[1] if len(parts) > 1 else ""
+
+
+@dataclass
+class SpeculativeReply:
+    """A reply prepared before the final transcript arrived"""
+    text: str
+    # First sentence synthesized ahead of time, and what it was synthesized for
+    audio: List[bytes] = field(default_factory=list)
+    audio_format: Any = None
+    voice: Optional[str] = None
+    remainder: str = ""
+
+
+class SpeculationBudget:
+    """Worker-wide cap on speculative calls (token bucket, refilled per minute)"""
+
+    def __init__(self, per_minute: float = 30.0):
+        self.per_minute = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class SpeculationStats:
+    """Worker-wide hit/waste counters for /metrics"""
+
+    def __init__(self):
+        self.started = 0
+        self.committed = 0
+        self.discarded = 0
+        self.over_budget = 0
+        self.saved_s = 0.0
+
+    def snapshot(self) -> dict:
+        settled = self.committed + self.discarded
+        return {
+            "started": self.started,
+            "committed": self.committed,
+            "discarded": self.discarded,
+            "over_budget": self.over_budget,
+            "hit_rate": self.committed / settled if settled else None,
+            "waste_rate": self.discarded / settled if settled else None,
+            "avg_saved_ms": self.saved_s / self.committed * 1000 if self.committed else 0.0,
+        }
+
+
+class _Speculation:
+    __slots__ = ("text", "task", "started", "finished")
+
+    def __init__(self, text: str, task: asyncio.Task):
+        self.text = text
+        self.task = task
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+
+class SpeculativeResponder:
+    """Starts a turn's response early, from a partial transcript that stopped changing.
+
+    Every partial re-arms a `stable_ms` timer; when it fires, `run(text)` is
+    started for that partial if the budget allows. The final transcript then
+    either commits the speculation (similarity >= `match_threshold`), reusing
+    its result, or cancels it. A partial that diverges from the speculated
+    text cancels it early. One speculation per session at a time.
+    """
+
+    def __init__(self, run: Callable[[str], Awaitable[Any]], budget: SpeculationBudget,
+                 stats: SpeculationStats, stable_ms: float = 300, min_words: int = 2,
+                 match_threshold: float = 0.9):
+        self.run = run
+        self.budget = budget
+        self.stats = stats
+        self.stable_s = stable_ms / 1000
+        self.min_words = min_words
+        self.match_threshold = match_threshold
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._current: Optional[_Speculation] = None
+
+    @classmethod
+    def from_settings(cls, settings, run: Callable[[str], Awaitable[Any]]) -> "SpeculativeResponder":
+        return cls(run, speculation_budget, speculation_stats,
+                   stable_ms=settings.speculation_stable_ms,
+                   min_words=settings.speculation_min_words,
+                   match_threshold=settings.speculation_match_threshold)
+
+    def on_partial(self, text: str):
+        """Feed a partial transcript; (re)arms the stability timer"""
+        if self._current and normalize_transcript(text) != normalize_transcript(self._current.text):
+            if transcript_similarity(text, self._current.text) < self.match_threshold:
+                self._discard("partial diverged")
+        if self._timer:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self.stable_s, self._start, text)
+
+    async def on_final(self, text: str) -> Optional[Any]:
+        """Return the speculated result if it matches `text`, else None (and cancel it)"""
+        final_at = time.perf_counter()
+        self._cancel_timer()
+        speculation, self._current = self._current, None
+        if speculation is None:
+            return None
+        if transcript_similarity(text, speculation.text) < self.match_threshold:
+            self._settle(speculation, committed=False)
+            logger.info(f"🔮 Speculation missed: '{speculation.text}' vs final '{text}'")
+            return None
+        try:
+            result = await speculation.task
+        except Exception as e:
+            logger.warning(f"🔮 Speculative response failed: {e}")
+            self._settle(speculation, committed=False)
+            return None
+        self._settle(speculation, committed=True, final_at=final_at)
+        return result
+
+    def cancel(self):
+        """Drop any timer and in-flight speculation (e.g. on disconnect)"""
+        self._cancel_timer()
+        if self._current:
+            self._discard("session ended")
+
+    def tasks(self) -> List[asyncio.Task]:
+        """The in-flight speculation, if any"""
+        return [self._current.task] if self._current and not self._current.task.done() else []
+
+    def _start(self, text: str):
+        self._timer = None
+        if self._current or len(normalize_transcript(text).split()) < self.min_words:
+            return
+        if not self.budget.try_acquire():
+            self.stats.over_budget += 1
+            return
+        speculation = _Speculation(text, asyncio.create_task(self.run(text)))
+        speculation.task.add_done_callback(lambda _: setattr(speculation, "finished", time.perf_counter()))
+        self._current = speculation
+        self.stats.started += 1
+        logger.debug(f"🔮 Speculating on stable partial: {text}")
+
+    def _discard(self, reason: str):
+        speculation, self._current = self._current, None
+        self._settle(speculation, committed=False)
+        logger.debug(f"🔮 Speculation discarded ({reason}): {speculation.text}")
+
+    def _settle(self, speculation: _Speculation, committed: bool, final_at: float = 0.0):
+        if committed:
+            self.stats.committed += 1
+            # Work done before the final arrived is latency the turn didn't pay
+            done_at = min(speculation.finished or final_at, final_at)
+            self.stats.saved_s += max(0.0, done_at - speculation.started)
+        else:
+            speculation.task.cancel()
+            self.stats.discarded += 1
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+
+speculation_budget = SpeculationBudget(settings.speculation_max_per_minute)
+speculation_stats = SpeculationStats()
@@ -0,0 +1,71 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def process_age_ms() -> Optional[float]:
+    """Milliseconds since this process was exec'd (Linux /proc), else None"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime) counts clock ticks since boot; comm may contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime_s = float(f.read().split()[0])
+        started_s = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return max(0.0, (uptime_s - started_s) * 1000)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """Where a worker's cold start went: imports, lifespan phases, time to ready"""
+
+    def __init__(self, target_ms: float = 2000.0):
+        self.target_ms = target_ms
+        self.created = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.imports: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self.process_to_ready_ms: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (time.perf_counter() - start) * 1000
+
+    def record_import(self, module: str, elapsed_s: float):
+        self.imports[module] = elapsed_s * 1000
+
+    def mark_ready(self):
+        self.ready_ms = (time.perf_counter() - self.created) * 1000
+        self.process_to_ready_ms = process_age_ms()
+        total = self.process_to_ready_ms if self.process_to_ready_ms is not None else self.ready_ms
+        slowest = sorted(self.phases.items(), key=lambda item: item[1], reverse=True)[:3]
+        breakdown = ", ".join(f"{name}={ms:.0f}ms" for name, ms in slowest)
+        if total > self.target_ms:
+            logger.warning(f"🐢 Ready in {total:.0f} ms (target {self.target_ms:.0f} ms): {breakdown}")
+        else:
+            logger.info(f"🚀 Ready in {total:.0f} ms ({breakdown})")
+
+    def report(self) -> dict:
+        total = self.process_to_ready_ms if self.process_to_ready_ms is not None else self.ready_ms
+        return {
+            "ready": self.ready_ms is not None,
+            "process_to_ready_ms": self.process_to_ready_ms,
+            "lifespan_ms": sum(self.phases.values()),
+            "phases_ms": dict(self.phases),
+            "provider_imports_ms": dict(self.imports),
+            "target_ms": self.target_ms,
+            "within_target": None if total is None else total <= self.target_ms,
+        }
+
+
+# Created at import so module import time is included in the profile
+startup_profile = StartupProfile()
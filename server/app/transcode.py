@@ -0,0 +1,181 @@
+import asyncio
+import importlib.util
+import io
+import logging
+import shutil
+import wave
+from dataclasses import dataclass
+from typing import AsyncGenerator, AsyncIterator
+
+import numpy as np
+
+from .audio_executor import audio_executor
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_CODECS = ("mp3", "pcm16", "opus")
+PCM_SAMPLE_RATES = (8000, 16000, 22050, 24000, 44100, 48000)
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+FRAME_DURATIONS_MS = (10, 20, 40, 60)
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    """Audio format the client asked to receive TTS in"""
+    codec: str = "mp3"
+    sample_rate: int = 24000
+    frame_ms: int = 20
+
+    @property
+    def passthrough(self) -> bool:
+        """MP3 is forwarded exactly as the provider produced it"""
+        return self.codec == "mp3"
+
+    @property
+    def samples_per_frame(self) -> int:
+        return self.sample_rate * self.frame_ms // 1000
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.samples_per_frame * 2
+
+    def describe(self) -> dict:
+        return {"codec": self.codec, "sample_rate": self.sample_rate, "frame_ms": self.frame_ms}
+
+
+# What clients that never negotiate get: provider MP3, unframed
+LEGACY_OUTPUT_FORMAT = OutputFormat()
+
+
+def opus_available() -> bool:
+    return importlib.util.find_spec("opuslib") is not None
+
+
+def _nearest(value: int, allowed) -> int:
+    return min(allowed, key=lambda option: abs(option - value))
+
+
+def negotiate_output_format(requested: dict) -> OutputFormat:
+    """Clamp a client's requested format to one this server can produce"""
+    codec = str(requested.get("codec", "mp3")).lower()
+    if codec not in SUPPORTED_CODECS:
+        logger.warning(f"Unsupported output codec '{codec}', using mp3")
+        return LEGACY_OUTPUT_FORMAT
+    if codec == "opus" and not opus_available():
+        logger.warning("opuslib not installed - falling back to pcm16 output")
+        codec = "pcm16"
+    if codec == "mp3":
+        return LEGACY_OUTPUT_FORMAT
+
+    rates = OPUS_SAMPLE_RATES if codec == "opus" else PCM_SAMPLE_RATES
+    sample_rate = _nearest(int(requested.get("sample_rate", 24000)), rates)
+    frame_ms = _nearest(int(requested.get("frame_ms", 20)), FRAME_DURATIONS_MS)
+    return OutputFormat(codec, sample_rate, frame_ms)
+
+
+def is_mp3(chunk: bytes) -> bool:
+    return chunk[:3] == b"ID3" or (len(chunk) > 1 and chunk[0] == 0xFF and chunk[1] & 0xE0 == 0xE0)
+
+
+def parse_wav(chunk: bytes):
+    """Return (pcm16 bytes, sample rate) for a mono/stereo 16-bit WAV"""
+    with wave.open(io.BytesIO(chunk), "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError("Only 16-bit WAV is supported")
+        pcm = wav.readframes(wav.getnframes())
+        if wav.getnchannels() == 2:
+            # Keep the left channel
+            pcm = np.frombuffer(pcm, dtype=np.int16)[::2].tobytes()
+        return pcm, wav.getframerate()
+
+
+class TTSTranscoder:
+    """Turns provider TTS output into fixed-duration frames in an OutputFormat.
+
+    WAV and raw PCM16 input is resampled on the audio executor; MP3 input
+    is decoded and resampled by a streaming ffmpeg subprocess. Either way
+    the event loop only slices frames. The last frame is padded with
+    silence so every frame has exactly `frame_ms` of audio.
+    """
+
+    def __init__(self, output_format: OutputFormat, source_rate: int = 24000):
+        self.output_format = output_format
+        self.source_rate = source_rate
+        self.encoder = None
+        if output_format.codec == "opus":
+            import opuslib
+            self.encoder = opuslib.Encoder(output_format.sample_rate, 1, opuslib.APPLICATION_VOIP)
+
+    async def frames(self, chunks: AsyncIterator[bytes]) -> AsyncGenerator[bytes, None]:
+        frame_bytes = self.output_format.frame_bytes
+        pending = bytearray()
+        async for pcm in self._pcm(chunks):
+            pending += pcm
+            while len(pending) >= frame_bytes:
+                frame = bytes(pending[:frame_bytes])
+                del pending[:frame_bytes]
+                yield self._encode(frame)
+        if pending:
+            yield self._encode(bytes(pending) + b"\x00" * (frame_bytes - len(pending)))
+
+    def _encode(self, frame: bytes) -> bytes:
+        if self.encoder:
+            return self.encoder.encode(frame, self.output_format.samples_per_frame)
+        return frame
+
+    async def _pcm(self, chunks: AsyncIterator[bytes]) -> AsyncGenerator[bytes, None]:
+        """PCM16 at the target rate, whatever the provider sent"""
+        iterator = chunks.__aiter__()
+        async for chunk in iterator:
+            if not chunk:
+                continue
+            if is_mp3(chunk):
+                async for pcm in self._decode_mp3(chunk, iterator):
+                    yield pcm
+                return
+            if chunk[:4] == b"RIFF":
+                pcm, rate = parse_wav(chunk)
+            else:
+                pcm, rate = chunk, self.source_rate
+            yield await self._resample(pcm, rate)
+
+    async def _resample(self, pcm: bytes, rate: int) -> bytes:
+        if rate == self.output_format.sample_rate or not pcm:
+            return pcm
+        return await audio_executor.submit("resample", pcm, src_rate=rate, dst_rate=self.output_format.sample_rate)
+
+    async def _decode_mp3(self, first: bytes, rest: AsyncIterator[bytes]) -> AsyncGenerator[bytes, None]:
+        if not shutil.which("ffmpeg"):
+            raise RuntimeError("ffmpeg is required to transcode MP3 TTS output")
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "mp3", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(self.output_format.sample_rate), "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE
+        )
+
+        async def feed():
+            try:
+                process.stdin.write(first)
+                await process.stdin.drain()
+                async for chunk in rest:
+                    if chunk:
+                        process.stdin.write(chunk)
+                        await process.stdin.drain()
+            finally:
+                process.stdin.close()
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                pcm = await process.stdout.read(self.output_format.frame_bytes * 10)
+                if not pcm:
+                    break
+                yield pcm
+            await feeder
+        finally:
+            if not feeder.done():
+                feeder.cancel()
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
@@ -1,5 +1,6 @@
 import logging
 import time
+from array import array
 from functools import wraps
 
 def rate_limit(max_calls: int, time_window: int):
@@ -29,4 +30,14 @@ def setup_logging():
             logging.StreamHandler(),
             logging.FileHandler('app.log')
         ]
-    )
\ No newline at end of file
+    )
+
+# PCM16 peak above which a frame counts as speech
+SPEECH_THRESHOLD = 500
+
+
+def is_speech(audio_data: bytes, threshold: int = SPEECH_THRESHOLD) -> bool:
+    """Energy gate: True if any PCM16 sample exceeds `threshold`"""
+    samples = array("h")
+    samples.frombytes(audio_data[: len(audio_data) - (len(audio_data) % 2)])
+    return bool(samples) and max(max(samples), -min(samples)) > threshold
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Voices shipped with the server, used until (or whenever) the live list cannot be fetched
+SNAPSHOT_PATH = Path(__file__).parent / "data" / "murf_voices.json"
+DEFAULT_VOICE_ID = "en_us_001"
+
+
+@dataclass(frozen=True)
+class Voice:
+    id: str          # what clients send in `config` messages
+    voice_id: str    # Murf's voiceId
+    name: str
+    locale: str
+    model: str = "Falcon"
+    gender: Optional[str] = None
+    styles: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_murf(cls, entry: dict) -> "Voice":
+        """Normalize one entry of Murf's voice list (or the bundled snapshot)"""
+        voice_id = entry.get("voiceId") or entry["id"]
+        return cls(
+            id=entry.get("id") or voice_id,
+            voice_id=voice_id,
+            name=entry.get("displayName") or entry.get("name") or voice_id,
+            locale=entry.get("locale") or entry.get("language") or "",
+            model=entry.get("model") or "Falcon",
+            gender=entry.get("gender"),
+            styles=tuple(entry.get("availableStyles") or entry.get("styles") or ()),
+        )
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "language": self.locale,
+            "gender": self.gender,
+            "styles": list(self.styles),
+        }
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH) -> List[Voice]:
+    with open(path) as f:
+        return [Voice.from_murf(entry) for entry in json.load(f)["voices"]]
+
+
+class VoiceCatalog:
+    """The TTS voice list, indexed for O(1) lookup by id, locale and style.
+
+    Starts from the bundled snapshot so lookups work before (and without)
+    any network access. With a `fetcher`, the live list replaces it and is
+    considered fresh for `ttl_s`; after that it is still served while one
+    background refresh runs (stale-while-revalidate). A failed refresh keeps
+    the current list and is retried after `retry_s`. Snapshot voices whose
+    ids are missing from the live list stay available as aliases, so the
+    stable public ids (`en_us_001`, ...) keep working.
+    """
+
+    def __init__(self, fetcher: Optional[Callable[[], Awaitable[List[dict]]]] = None,
+                 ttl_s: float = 3600.0, retry_s: float = 60.0, snapshot: Optional[List[Voice]] = None):
+        self.fetcher = fetcher
+        self.ttl_s = ttl_s
+        self.retry_s = retry_s
+        self.snapshot = snapshot if snapshot is not None else load_snapshot()
+        self.source = "snapshot"
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self._fresh_until = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._index(self.snapshot)
+
+    def _index(self, voices: List[Voice]):
+        by_id: Dict[str, Voice] = {}
+        by_locale: Dict[str, List[Voice]] = {}
+        by_style: Dict[str, List[Voice]] = {}
+        for voice in voices:
+            by_id[voice.id] = voice
+            by_id.setdefault(voice.voice_id, voice)
+            by_locale.setdefault(voice.locale.lower(), []).append(voice)
+            for style in voice.styles:
+                by_style.setdefault(style.lower(), []).append(voice)
+        # Swap whole indexes so readers never see a half-built catalog
+        self._voices, self._by_id, self._by_locale, self._by_style = voices, by_id, by_locale, by_style
+
+    def get(self, voice_id: str) -> Optional[Voice]:
+        return self._by_id.get(voice_id)
+
+    def resolve(self, voice_id: str) -> Voice:
+        """The voice for `voice_id`, or the default voice when it is unknown"""
+        return self._by_id.get(voice_id) or self._by_id.get(DEFAULT_VOICE_ID) or self._voices[0]
+
+    def by_locale(self, locale: str) -> List[Voice]:
+        return self._by_locale.get(locale.lower(), [])
+
+    def by_style(self, style: str) -> List[Voice]:
+        return self._by_style.get(style.lower(), [])
+
+    def voices(self) -> List[Voice]:
+        """Current voices; kicks off a background refresh when they are stale"""
+        self.revalidate()
+        return self._voices
+
+    def revalidate(self):
+        if self.fetcher is None or time.monotonic() < self._fresh_until:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self) -> bool:
+        """Fetch the live list now; on failure keep what we have"""
+        if self.fetcher is None:
+            return False
+        try:
+            entries = await self.fetcher()
+            live = [Voice.from_murf(entry) for entry in entries]
+            if not live:
+                raise ValueError("empty voice list")
+        except Exception as e:
+            self.refresh_failures += 1
+            self._fresh_until = time.monotonic() + self.retry_s
+            logger.warning(f"🗣️ Voice catalog refresh failed, keeping {self.source} list: {e}")
+            return False
+        live_ids = {voice.id for voice in live}
+        self._index(live + [voice for voice in self.snapshot if voice.id not in live_ids])
+        self.source = "live"
+        self.refreshes += 1
+        self._fresh_until = time.monotonic() + self.ttl_s
+        logger.info(f"🗣️ Voice catalog refreshed: {len(live)} live voices")
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "voices": len(self._voices),
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+
+voice_catalog = VoiceCatalog(ttl_s=settings.voice_catalog_ttl_s)
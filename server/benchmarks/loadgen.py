@@ -0,0 +1,414 @@
+"""Synthetic load generator for the /ws voice pipeline.
+
+Spins up local stub ASR/LLM/TTS servers, starts the API in a subprocess
+pointed at them, and drives N simulated clients that stream PCM16 at
+real-time pace. Run from the ``server`` directory:
+
+    python -m benchmarks.loadgen --clients 50 --turns 3 --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+import wave
+from collections import deque
+from typing import Dict, List, Optional
+
+import aiohttp
+import websockets
+
+from app.utils import is_speech
+
+from .stubs import StubLatency, StubProviders
+
+logger = logging.getLogger(__name__)
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+
+SAMPLE_RATE = 16000
+
+# Metrics compared against the baseline, and whether higher values are better
+TRACKED_METRICS = {
+    "connect_latency_ms.p50": False,
+    "connect_latency_ms.p95": False,
+    "turn_latency_ms.p50": False,
+    "turn_latency_ms.p95": False,
+    "turn_latency_ms.p99": False,
+    "frames_per_second": True,
+    "cpu_percent_per_session": False,
+    "memory_kb_per_session": False,
+}
+
+
+def synthetic_pcm(speech_ms: int = 1500, silence_ms: int = 1000, freq: float = 220.0) -> bytes:
+    """One utterance of PCM16 mono at 16 kHz: a tone followed by silence"""
+    speech_samples = SAMPLE_RATE * speech_ms // 1000
+    samples = bytearray()
+    for i in range(speech_samples):
+        value = int(8000 * math.sin(2 * math.pi * freq * i / SAMPLE_RATE))
+        samples += value.to_bytes(2, "little", signed=True)
+    samples += b"\x00\x00" * (SAMPLE_RATE * silence_ms // 1000)
+    return bytes(samples)
+
+
+def load_pcm(path: str) -> bytes:
+    """Load a recording as raw PCM16 mono 16 kHz (WAV or headerless .pcm/.raw)"""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1 or wav.getframerate() != SAMPLE_RATE:
+                raise ValueError("WAV input must be PCM16 mono at 16 kHz")
+            return wav.readframes(wav.getnframes())
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def split_frames(pcm: bytes, frame_ms: int) -> List[bytes]:
+    frame_bytes = SAMPLE_RATE * 2 * frame_ms // 1000
+    return [pcm[i:i + frame_bytes] for i in range(0, len(pcm), frame_bytes)]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def _lookup(report: dict, dotted: str) -> Optional[float]:
+    value = report
+    for part in dotted.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float = 0.10) -> List[str]:
+    """Return a description of every tracked metric that regressed beyond tolerance"""
+    regressions = []
+    for metric, higher_is_better in TRACKED_METRICS.items():
+        current = _lookup(report, metric)
+        previous = _lookup(baseline, metric)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{metric}: {previous:.2f} -> {current:.2f} ({change:+.1%})")
+    return regressions
+
+
+class ProcessSampler:
+    """Samples CPU time and RSS of a process from /proc (Linux only)"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+
+    def cpu_seconds(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / self.clock_ticks
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def rss_kb(self) -> Optional[int]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except (OSError, ValueError):
+            return None
+        return None
+
+
+class ClientStats:
+    def __init__(self):
+        self.connect_latency_ms: Optional[float] = None
+        self.turn_latencies_ms: List[float] = []
+        self.frames_sent = 0
+        self.audio_chunks = 0
+        self.audio_bytes = 0
+        self.errors: List[str] = []
+
+
+async def simulate_client(url: str, frames: List[bytes], speech_flags: List[bool], frame_ms: int,
+                          turns: int, response_timeout: float) -> ClientStats:
+    """One voice session: connect, stream `turns` utterances in real time, measure replies"""
+    stats = ClientStats()
+    speech_ends = deque()
+    awaiting_audio = False
+    turns_done = asyncio.Event()
+    ready = asyncio.Event()
+    recording = asyncio.Event()
+
+    started = time.perf_counter()
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+
+            async def receiver():
+                nonlocal awaiting_audio
+                async for raw in ws:
+                    message = json.loads(raw)
+                    kind = message.get("type")
+                    if kind == "status" and message.get("status") == "connected":
+                        stats.connect_latency_ms = (time.perf_counter() - started) * 1000
+                        ready.set()
+                    elif kind == "status" and message.get("status") == "recording":
+                        recording.set()
+                    elif kind == "transcript" and message.get("speaker") == "agent":
+                        awaiting_audio = True
+                    elif kind == "audio_chunk":
+                        stats.audio_chunks += 1
+                        stats.audio_bytes += len(message.get("payload", "")) * 3 // 4
+                        if awaiting_audio and speech_ends:
+                            stats.turn_latencies_ms.append((time.perf_counter() - speech_ends.popleft()) * 1000)
+                            awaiting_audio = False
+                            if len(stats.turn_latencies_ms) >= turns:
+                                turns_done.set()
+                    elif kind == "error":
+                        stats.errors.append(message.get("message", ""))
+
+            receive_task = asyncio.create_task(receiver())
+            try:
+                await asyncio.wait_for(ready.wait(), response_timeout)
+                await ws.send(json.dumps({"type": "start"}))
+                await asyncio.wait_for(recording.wait(), response_timeout)
+
+                # Pace against an absolute schedule so send jitter does not accumulate
+                frame_s = frame_ms / 1000
+                t0 = time.perf_counter()
+                index = 0
+                for _ in range(turns):
+                    previous_speech = False
+                    for frame, speech in zip(frames, speech_flags):
+                        delay = t0 + index * frame_s - time.perf_counter()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                        await ws.send(frame)
+                        if previous_speech and not speech:
+                            speech_ends.append(time.perf_counter())
+                        previous_speech = speech
+                        stats.frames_sent += 1
+                        index += 1
+
+                try:
+                    await asyncio.wait_for(turns_done.wait(), response_timeout)
+                except asyncio.TimeoutError:
+                    stats.errors.append(f"timed out waiting for {turns - len(stats.turn_latencies_ms)} replies")
+                await ws.send(json.dumps({"type": "stop"}))
+            finally:
+                receive_task.cancel()
+    except Exception as e:
+        stats.errors.append(f"{type(e).__name__}: {e}")
+    return stats
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_health(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server at {base_url} did not become healthy within {timeout}s")
+
+
+async def run_benchmark(clients: int = 10, turns: int = 2, frame_ms: int = 20, ramp_s: float = 1.0,
+                        pcm: Optional[bytes] = None, latency: Optional[StubLatency] = None,
+                        response_timeout: float = 30.0, url: Optional[str] = None,
+                        server_pid: Optional[int] = None) -> dict:
+    """Run one load test and return the report dict"""
+    pcm = pcm or synthetic_pcm()
+    frames = split_frames(pcm, frame_ms)
+    speech_flags = [is_speech(frame) for frame in frames]
+
+    stubs = StubProviders(latency)
+    server = None
+    await stubs.start()
+    try:
+        if url is None:
+            port = _free_port()
+            env = {**os.environ, **stubs.env()}
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                 "--port", str(port), "--log-level", "warning"],
+                cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            server_pid = server.pid
+            await _wait_for_health(f"http://127.0.0.1:{port}")
+            url = f"ws://127.0.0.1:{port}/ws"
+
+        sampler = ProcessSampler(server_pid) if server_pid else None
+        idle_rss = sampler.rss_kb() if sampler else None
+        peak_rss = idle_rss
+        cpu_start = sampler.cpu_seconds() if sampler else None
+
+        async def launch(i: int) -> ClientStats:
+            await asyncio.sleep(ramp_s * i / max(1, clients))
+            return await simulate_client(url, frames, speech_flags, frame_ms, turns, response_timeout)
+
+        wall_start = time.perf_counter()
+        tasks = [asyncio.create_task(launch(i)) for i in range(clients)]
+        while not all(task.done() for task in tasks):
+            await asyncio.sleep(0.25)
+            if sampler:
+                rss = sampler.rss_kb()
+                if rss and (peak_rss is None or rss > peak_rss):
+                    peak_rss = rss
+        results = [task.result() for task in tasks]
+        wall_s = time.perf_counter() - wall_start
+        cpu_end = sampler.cpu_seconds() if sampler else None
+    finally:
+        if server:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        await stubs.stop()
+
+    connect = [r.connect_latency_ms for r in results if r.connect_latency_ms is not None]
+    turn_latencies = [ms for r in results for ms in r.turn_latencies_ms]
+    frames_sent = sum(r.frames_sent for r in results)
+    errors = [e for r in results for e in r.errors]
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "clients": clients, "turns": turns, "frame_ms": frame_ms, "ramp_s": ramp_s,
+            "asr_latency_ms": stubs.latency.asr_ms, "llm_latency_ms": stubs.latency.llm_ms,
+            "tts_latency_ms": stubs.latency.tts_ms,
+        },
+        "wall_seconds": wall_s,
+        "connect_latency_ms": summarize(connect),
+        "turn_latency_ms": summarize(turn_latencies),
+        "frames_sent": frames_sent,
+        "frames_per_second": frames_sent / wall_s if wall_s else 0.0,
+        "audio_chunks_received": sum(r.audio_chunks for r in results),
+        "audio_bytes_received": sum(r.audio_bytes for r in results),
+        "cpu_percent_per_session": None,
+        "memory_kb_per_session": None,
+        "stub_requests": dict(stubs.requests),
+        "failed_sessions": sum(1 for r in results if r.errors),
+        "errors": errors[:20],
+    }
+    if cpu_start is not None and cpu_end is not None:
+        report["cpu_percent_per_session"] = (cpu_end - cpu_start) / wall_s * 100 / clients
+    if idle_rss is not None and peak_rss is not None:
+        report["memory_kb_per_session"] = (peak_rss - idle_rss) / clients
+    return report
+
+
+def _format_ms(summary: dict) -> str:
+    if not summary["count"]:
+        return "n/a"
+    return f"p50={summary['p50']:.1f} p95={summary['p95']:.1f} p99={summary['p99']:.1f} max={summary['max']:.1f}"
+
+
+def print_report(report: dict):
+    print(f"Sessions: {report['config']['clients']} x {report['config']['turns']} turns "
+          f"in {report['wall_seconds']:.1f}s ({report['failed_sessions']} failed)")
+    print(f"Connect latency (ms): {_format_ms(report['connect_latency_ms'])}")
+    print(f"Turn latency (ms):    {_format_ms(report['turn_latency_ms'])}")
+    print(f"Frames/second:        {report['frames_per_second']:.1f}")
+    if report["cpu_percent_per_session"] is not None:
+        print(f"CPU per session:      {report['cpu_percent_per_session']:.2f}%")
+    if report["memory_kb_per_session"] is not None:
+        print(f"Memory per session:   {report['memory_kb_per_session']:.1f} KB")
+    for error in report["errors"]:
+        print(f"  error: {error}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the /ws voice pipeline against local stub providers")
+    parser.add_argument("--clients", type=int, default=10, help="concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=2, help="utterances streamed per session")
+    parser.add_argument("--frame-ms", type=int, default=20, help="duration of each binary audio frame")
+    parser.add_argument("--ramp-s", type=float, default=1.0, help="spread client connects over this many seconds")
+    parser.add_argument("--pcm", help="recording to stream (16 kHz mono PCM16 .wav or raw); default is a synthetic tone")
+    parser.add_argument("--asr-latency-ms", type=float, default=150)
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--tts-latency-ms", type=float, default=250)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for each reply")
+    parser.add_argument("--url", help="target an already running server instead of spawning one")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, for CPU/memory sampling")
+    parser.add_argument("--output", help="write the JSON report to this path")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline report to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run_benchmark(
+        clients=args.clients,
+        turns=args.turns,
+        frame_ms=args.frame_ms,
+        ramp_s=args.ramp_s,
+        pcm=load_pcm(args.pcm) if args.pcm else None,
+        latency=StubLatency(args.asr_latency_ms, args.llm_latency_ms, args.tts_latency_ms),
+        response_timeout=args.timeout,
+        url=args.url,
+        server_pid=args.server_pid,
+    ))
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("Baseline was recorded with a different configuration; comparison may be misleading")
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        print("Regressions vs baseline:" if regressions else "No regressions vs baseline")
+        for regression in regressions:
+            print(f"  {regression}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Soak test: thousands of /ws connect/disconnect cycles, checked for leaks.
+
+Starts the API in a subprocess with mock providers, the debug endpoints and
+the strict session leak check, and with resumption off (a parked session is
+held on purpose, not leaked). Every ``--speak-every``-th cycle also starts a
+recording and streams some audio. After a warm-up, it compares the worker's
+RSS, tracemalloc allocations and event-loop tasks before and after the run,
+and fails on any leaked session, task or socket. Run from the ``server``
+directory:
+
+    python -m benchmarks.soak --cycles 5000 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from .loadgen import SERVER_DIR, ProcessSampler, _free_port, _wait_for_health, split_frames, synthetic_pcm
+from .startup import OFFLINE_ENV
+
+logger = logging.getLogger(__name__)
+
+SOAK_ENV = {"DEBUG_ENDPOINTS": "true", "LEAK_CHECK_STRICT": "true", "RESUME_GRACE_S": "0"}
+
+
+async def connect_cycle(session: aiohttp.ClientSession, url: str, frames: List[bytes]):
+    """Open one voice session, optionally stream `frames`, and hang up"""
+    async with session.ws_connect(url) as websocket:
+        await websocket.receive_json()  # status
+        if frames:
+            await websocket.send_json({"type": "start"})
+            await websocket.receive_json()
+            for frame in frames:
+                await websocket.send_bytes(frame)
+
+
+async def run_cycles(base_url: str, cycles: int, concurrency: int, speak_every: int) -> List[str]:
+    frames = split_frames(synthetic_pcm(speech_ms=200, silence_ms=0), 20)
+    url = base_url.replace("http", "ws", 1) + "/ws"
+    limiter = asyncio.Semaphore(concurrency)
+    errors: List[str] = []
+
+    async def one(i: int):
+        async with limiter:
+            try:
+                await connect_cycle(session, url, frames if speak_every and i % speak_every == 0 else [])
+            except Exception as e:
+                errors.append(f"cycle {i}: {e!r}")
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(one(i) for i in range(cycles)))
+    return errors
+
+
+async def _get(base_url: str, path: str) -> dict:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}{path}") as response:
+            return await response.json()
+
+
+async def _settled(base_url: str, idle_tasks: int, timeout: float = 10.0) -> dict:
+    """/debug/sessions once the sessions and connection tasks of the run are gone (or `timeout`)"""
+    deadline = time.monotonic() + timeout
+    sessions = await _get(base_url, "/debug/sessions")
+    while ((sessions["totals"]["live_sessions"] or sessions["event_loop_tasks"] > idle_tasks)
+           and time.monotonic() < deadline):
+        await asyncio.sleep(0.1)
+        sessions = await _get(base_url, "/debug/sessions")
+    return sessions
+
+
+async def run_soak(cycles: int = 2000, concurrency: int = 10, speak_every: int = 10, warmup: int = 100,
+                   max_growth_bytes_per_cycle: float = 1024.0,
+                   env: Optional[Dict[str, str]] = None, timeout: float = 30.0) -> dict:
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=SERVER_DIR, env={**os.environ, **OFFLINE_ENV, **SOAK_ENV, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    sampler = ProcessSampler(server.pid)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await _wait_for_health(base_url, timeout)
+        idle_tasks = (await _get(base_url, "/debug/sessions"))["event_loop_tasks"]
+        await run_cycles(base_url, warmup, concurrency, speak_every)  # warm caches and pools
+        before = await _settled(base_url, idle_tasks)
+        await _get(base_url, "/debug/memory")  # starts tracing
+        rss_before = sampler.rss_kb()
+
+        started = time.perf_counter()
+        errors = await run_cycles(base_url, cycles, concurrency, speak_every)
+        elapsed = time.perf_counter() - started
+
+        after = await _settled(base_url, idle_tasks)
+        memory = await _get(base_url, "/debug/memory")
+        rss_after = sampler.rss_kb()
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    growth = sum(stat["size_diff"] for stat in memory["top"])
+    report = {
+        "cycles": cycles,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "elapsed_s": elapsed,
+        "cycles_per_s": cycles / elapsed if elapsed else None,
+        "live_sessions": after["totals"]["live_sessions"],
+        "uncollected_sessions": after["totals"]["uncollected_sessions"],
+        "leaks": after["totals"]["leaks"] - before["totals"]["leaks"],
+        "leaked_tasks": after["totals"]["leaked_tasks"] - before["totals"]["leaked_tasks"],
+        "leaked_sockets": after["totals"]["leaked_sockets"] - before["totals"]["leaked_sockets"],
+        "event_loop_tasks": {"idle": idle_tasks, "after": after["event_loop_tasks"]},
+        "tasks_by_coroutine": after["tasks_by_coroutine"],
+        "traced_growth_bytes": growth,
+        "traced_growth_bytes_per_cycle": growth / cycles,
+        "top_allocations": memory["top"][:5],
+        "rss_kb": {"before": rss_before, "after": rss_after},
+    }
+    report["passed"] = (
+        not errors
+        and report["live_sessions"] == 0
+        and report["leaks"] == 0
+        and after["event_loop_tasks"] <= idle_tasks
+        and report["traced_growth_bytes_per_cycle"] <= max_growth_bytes_per_cycle
+    )
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Connect/disconnect soak test with leak checks")
+    parser.add_argument("--cycles", type=int, default=2000, help="measured connect/disconnect cycles")
+    parser.add_argument("--concurrency", type=int, default=10, help="sessions open at once")
+    parser.add_argument("--speak-every", type=int, default=10, help="stream audio on every Nth cycle (0: never)")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured cycles first")
+    parser.add_argument("--max-growth", type=float, default=1024.0,
+                        help="allowed traced memory growth per cycle (bytes)")
+    parser.add_argument("--output", help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run_soak(args.cycles, args.concurrency, args.speak_every, args.warmup,
+                                  args.max_growth))
+
+    print(f"{report['cycles']} cycles in {report['elapsed_s']:.1f}s ({report['cycles_per_s']:.0f}/s), "
+          f"{report['errors']} errors")
+    print(f"  leaks: {report['leaks']} sessions ({report['leaked_tasks']} tasks, "
+          f"{report['leaked_sockets']} sockets); live sessions after: {report['live_sessions']}, "
+          f"closed but not yet freed: {report['uncollected_sessions']}")
+    print(f"  event loop tasks: {report['event_loop_tasks']['after']} (idle {report['event_loop_tasks']['idle']})")
+    print(f"  traced growth: {report['traced_growth_bytes']} bytes "
+          f"({report['traced_growth_bytes_per_cycle']:.1f}/cycle)")
+    rss = report["rss_kb"]
+    if rss["before"] is not None and rss["after"] is not None:
+        print(f"  RSS: {rss['before']} -> {rss['after']} kB")
+    for stat in report["top_allocations"]:
+        print(f"  {stat['size_diff']:+d} B {stat['where']}")
+    for error in report["first_errors"]:
+        print(f"  {error}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    print("Passed" if report["passed"] else "Failed")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
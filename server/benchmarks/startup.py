@@ -0,0 +1,124 @@
+"""Cold-start benchmark: process launch -> lifespan ready, against a target.
+
+Starts the API in a fresh subprocess several times (mock providers, so no
+network is needed), waits for /health, and reads the worker's own startup
+profile from /metrics. Optionally runs ``python -X importtime`` to list the
+slowest imports. Run from the ``server`` directory:
+
+    python -m benchmarks.startup --runs 5 --importtime
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from .loadgen import SERVER_DIR, _free_port, _wait_for_health, summarize
+
+logger = logging.getLogger(__name__)
+
+OFFLINE_ENV = {"ASR_PROVIDER": "mock", "TTS_PROVIDER": "mock", "LLM_PROVIDER": "mock"}
+
+
+async def measure_cold_start(env: Optional[Dict[str, str]] = None, timeout: float = 30.0) -> dict:
+    """Launch one server and return its wall-clock and self-reported startup times"""
+    port = _free_port()
+    launched = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=SERVER_DIR, env={**os.environ, **OFFLINE_ENV, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await _wait_for_health(base_url, timeout)
+        wall_ms = (time.perf_counter() - launched) * 1000
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{base_url}/metrics") as response:
+                startup = (await response.json())["startup"]
+        return {"wall_ms": wall_ms, **startup}
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def slowest_imports(module: str = "app.main", limit: int = 15) -> List[dict]:
+    """Cumulative import times (ms) from ``python -X importtime``, slowest first"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR, env={**os.environ, **OFFLINE_ENV}, capture_output=True, text=True,
+    )
+    return parse_importtime(result.stderr)[:limit]
+
+
+def parse_importtime(output: str) -> List[dict]:
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append({
+            "module": parts[2].strip(),
+            "self_ms": int(parts[0]) / 1000,
+            "cumulative_ms": int(parts[1]) / 1000,
+        })
+    return sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)
+
+
+async def run_startup_benchmark(runs: int = 5, target_ms: float = 2000.0) -> dict:
+    samples = [await measure_cold_start({"STARTUP_TARGET_MS": str(target_ms)}) for _ in range(runs)]
+    wall = summarize([sample["wall_ms"] for sample in samples])
+    return {
+        "runs": runs,
+        "target_ms": target_ms,
+        "wall_ms": wall,
+        "process_to_ready_ms": summarize([s["process_to_ready_ms"] for s in samples if s["process_to_ready_ms"]]),
+        "phases_ms": samples[-1]["phases_ms"],
+        "provider_imports_ms": samples[-1]["provider_imports_ms"],
+        "within_target": wall["p95"] is not None and wall["p95"] <= target_ms,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure API cold start against a target")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh server launches")
+    parser.add_argument("--target-ms", type=float, default=2000.0, help="p95 launch -> ready budget")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports")
+    parser.add_argument("--output", help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run_startup_benchmark(args.runs, args.target_ms))
+    if args.importtime:
+        report["slowest_imports"] = slowest_imports()
+
+    wall = report["wall_ms"]
+    print(f"Cold start over {args.runs} runs (ms): p50={wall['p50']:.0f} p95={wall['p95']:.0f} "
+          f"max={wall['max']:.0f} (target {args.target_ms:.0f})")
+    for phase, ms in report["phases_ms"].items():
+        print(f"  lifespan {phase}: {ms:.1f}")
+    for row in report.get("slowest_imports", []):
+        print(f"  import {row['module']}: {row['cumulative_ms']:.1f} (self {row['self_ms']:.1f})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    print("Within target" if report["within_target"] else "Over target")
+    return 0 if report["within_target"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
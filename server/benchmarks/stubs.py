@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Optional
+
+from aiohttp import web, WSMsgType
+
+from app.utils import is_speech
+
+logger = logging.getLogger(__name__)
+
+
+class StubLatency:
+    """Fixed per-request latencies (in milliseconds) for the stub providers"""
+
+    def __init__(self, asr_ms: float = 150, llm_ms: float = 400, tts_ms: float = 250,
+                 tts_bytes_per_char: int = 200):
+        self.asr_ms = asr_ms
+        self.llm_ms = llm_ms
+        self.tts_ms = tts_ms
+        self.tts_bytes_per_char = tts_bytes_per_char
+
+
+class StubProviders:
+    """Local stand-ins for the Deepgram, OpenAI and Murf APIs.
+
+    Speaks just enough of each wire protocol for the production provider
+    classes to work unmodified when pointed at it via DEEPGRAM_URL,
+    OPENAI_BASE_URL and MURF_BASE_URL.
+    """
+
+    def __init__(self, latency: Optional[StubLatency] = None, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency or StubLatency()
+        self.host = host
+        self.port = port
+        self.runner: Optional[web.AppRunner] = None
+        self.requests = {"asr_sessions": 0, "llm": 0, "tts": 0}
+
+        self.app = web.Application()
+        self.app.router.add_get("/v1/listen", self._deepgram_listen)
+        self.app.router.add_post("/v1/chat/completions", self._openai_chat)
+        self.app.router.add_post("/v1/speech/generate", self._murf_generate)
+
+    @property
+    def base_http(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def env(self) -> dict:
+        """Environment overrides pointing the server at these stubs"""
+        return {
+            "ASR_PROVIDER": "deepgram",
+            "ASR_API_KEY": "stub",
+            "MURF_API_KEY": "stub",
+            "OPENAI_API_KEY": "stub",
+            "DEEPGRAM_URL": f"ws://{self.host}:{self.port}/v1/listen",
+            "MURF_BASE_URL": f"{self.base_http}/v1",
+            "OPENAI_BASE_URL": f"{self.base_http}/v1",
+        }
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Stub providers listening on {self.base_http}")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def _deepgram_listen(self, request: web.Request) -> web.WebSocketResponse:
+        """Emit a partial per speech burst and a final once silence follows it"""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.requests["asr_sessions"] += 1
+
+        in_speech = False
+        utterances = 0
+        pending = set()
+
+        async def send_final(index: int):
+            await asyncio.sleep(self.latency.asr_ms / 1000)
+            if not ws.closed:
+                await ws.send_str(json.dumps(_deepgram_result(f"benchmark utterance {index}", True)))
+
+        async for msg in ws:
+            if msg.type == WSMsgType.BINARY:
+                speech = is_speech(msg.data)
+                if speech and not in_speech:
+                    in_speech = True
+                    await ws.send_str(json.dumps(_deepgram_result("benchmark", False)))
+                elif not speech and in_speech:
+                    in_speech = False
+                    utterances += 1
+                    task = asyncio.create_task(send_final(utterances))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            elif msg.type == WSMsgType.TEXT:
+                if json.loads(msg.data).get("type") == "CloseStream":
+                    break
+            else:
+                break
+
+        for task in pending:
+            task.cancel()
+        return ws
+
+    async def _openai_chat(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests["llm"] += 1
+        await asyncio.sleep(self.latency.llm_ms / 1000)
+        query = body["messages"][-1]["content"]
+        return web.json_response({
+            "id": f"chatcmpl-stub-{self.requests['llm']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"You said: {query}. Here is a short reply."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        })
+
+    async def _murf_generate(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests["tts"] += 1
+        await asyncio.sleep(self.latency.tts_ms / 1000)
+        size = max(1, len(body.get("text", ""))) * self.latency.tts_bytes_per_char
+        return web.Response(body=b"\xff\xfb" + b"\x00" * (size - 2), content_type="audio/mpeg")
+
+
+def _deepgram_result(transcript: str, is_final: bool) -> dict:
+    return {
+        "type": "Results",
+        "is_final": is_final,
+        "channel": {"alternatives": [{"transcript": transcript}]},
+    }
@@ -0,0 +1,44 @@
+import math
+import pytest
+from app.main import app
+from app.config import settings
+from app.providers import resolve_providers
+
+def pcm_frames(speech: bool, count: int) -> list:
+    """`count` 20 ms frames of 16 kHz PCM16: a 220 Hz tone, or silence"""
+    frame = bytearray()
+    for i in range(320):
+        value = int(8000 * math.sin(2 * math.pi * 220 * i / 16000)) if speech else 0
+        frame += value.to_bytes(2, "little", signed=True)
+    return [bytes(frame)] * count
+
+# Half a second of speech, then enough silence for the mock ASR to finalize "Hello there"
+UTTERANCE = pcm_frames(True, 25) + pcm_frames(False, 20)
+
+PCM16 = {"codec": "pcm16", "sample_rate": 16000, "frame_ms": 20}
+
+def speak_turn(websocket, frames=UTTERANCE, audio_format=None, until: str = "audio_end") -> list:
+    """Record one utterance on a /ws connection; every message up to and including `until`"""
+    if audio_format:
+        websocket.send_json({"type": "config", "audio_format": audio_format})
+        assert websocket.receive_json()["type"] == "audio_format"
+    websocket.send_json({"type": "start"})
+    assert websocket.receive_json()["status"] == "recording"
+    for frame in frames:
+        websocket.send_bytes(frame)
+    messages = [websocket.receive_json()]
+    while messages[-1]["type"] != until:
+        messages.append(websocket.receive_json())
+    return messages
+
+def audio_chunks(messages: list) -> list:
+    return [message for message in messages if message["type"] == "audio_chunk"]
+
+@pytest.fixture
+def mock_settings(monkeypatch):
+    monkeypatch.setattr(settings, "asr_provider", "mock")
+    monkeypatch.setattr(settings, "tts_provider", "mock")
+    monkeypatch.setattr(settings, "llm_provider", "mock")
+    for name in ("mock_asr_latency", "mock_llm_latency", "mock_tts_latency"):
+        monkeypatch.setattr(settings, name, "fixed:0")
+    monkeypatch.setattr(app.state, "providers", resolve_providers(settings), raising=False)
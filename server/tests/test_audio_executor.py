@@ -0,0 +1,54 @@
+import asyncio
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+from app import audio_ops
+from app.audio_executor import AudioComputeExecutor, ExecutorSaturated
+
+def _tone(samples: int, amplitude: int = 8000) -> bytes:
+    return (np.sin(np.arange(samples) / 5) * amplitude).astype(np.int16).tobytes()
+
+@pytest.mark.asyncio
+async def test_inline_batches_frames_from_many_callers():
+    executor = AudioComputeExecutor(workers=0, batch_window_ms=5)
+    peaks = await asyncio.gather(*[executor.submit("peak", _tone(320, 1000 + i)) for i in range(10)])
+    assert peaks == [pytest.approx(1000 + i, abs=2) for i in range(10)]
+    stats = executor.stats()["ops"]["peak"]
+    assert stats["tasks"] == 10
+    assert stats["batches"] == 1
+
+@pytest.mark.asyncio
+async def test_resample_in_worker_pool_uses_shared_memory():
+    executor = AudioComputeExecutor(workers=1)
+    try:
+        results = await asyncio.gather(*[
+            executor.submit_timed("resample", _tone(480), src_rate=48000, dst_rate=16000) for _ in range(4)
+        ])
+        for pcm, timing in results:
+            assert len(pcm) == 160 * 2
+            assert timing.batch_size == 4
+        expected = np.frombuffer(_tone(480), dtype=np.int16)[::3]
+        assert np.allclose(np.frombuffer(results[0][0], dtype=np.int16), expected, atol=1)
+    finally:
+        await executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_saturation_rejects_new_work():
+    executor = AudioComputeExecutor(workers=0, max_pending=1, batch_window_ms=50, submit_timeout=0.01)
+    first = asyncio.create_task(executor.submit("rms", _tone(320)))
+    await asyncio.sleep(0)
+    with pytest.raises(ExecutorSaturated):
+        await executor.submit("rms", _tone(320))
+    assert await first > 0
+    assert executor.stats()["rejected"] == 1
+
+def test_worker_detaches_cached_segments():
+    segment = shared_memory.SharedMemory(create=True, size=4096)
+    try:
+        attached = audio_ops._attach(segment.name)
+        assert audio_ops._attach(segment.name) is attached
+        audio_ops.close_segments()
+        assert audio_ops._segments == {} and attached.buf is None
+    finally:
+        segment.close()
+        segment.unlink()
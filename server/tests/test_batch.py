@@ -0,0 +1,139 @@
+import asyncio
+import base64
+import io
+import json
+import time
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.batch import BatchRenderer, BatchStats, JobStore, batch_output_format
+from app.providers import ProviderCapabilities
+
+class CountingTTS:
+    capabilities = ProviderCapabilities(sample_rate=24000, audio_format="mp3")
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+    async def start_session(self):
+        pass
+    async def close_session(self):
+        pass
+    async def stream_tts(self, text, voice="en_us_001", output_format=None):
+        self.active += 1
+        self.calls += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        yield text.encode()
+
+class EchoLLM:
+    async def process_query(self, prompt):
+        return prompt
+
+class FakeProviders:
+    def __init__(self, tts):
+        self.tts_instance = tts
+    def create_tts(self):
+        return self.tts_instance
+    def create_llm(self):
+        return EchoLLM()
+
+@pytest.mark.asyncio
+async def test_renderer_bounds_fan_out_and_deduplicates():
+    tts = CountingTTS()
+    stats = BatchStats()
+    renderer = BatchRenderer(FakeProviders(tts), batch_output_format({"codec": "mp3"}, CountingTTS.capabilities), asyncio.Semaphore(2), stats)
+    items = [{"index": i, "id": str(i), "voice": "en_us_001", "text": f"line {i % 6}"} for i in range(9)]
+    async with renderer:
+        results = [item async for item in renderer.run(items)]
+    assert sorted(item["index"] for item in results) == list(range(9))
+    assert tts.calls == 6 and tts.peak == 2
+    assert stats.deduplicated == 3
+    duplicate = next(item for item in results if item["index"] == 7)
+    assert duplicate["duplicate_of"] == 1 and duplicate["audio"] == b"line 1"
+
+@pytest.mark.asyncio
+async def test_job_store_caps_stored_audio():
+    store = JobStore(asyncio.Semaphore(2), BatchStats(), max_bytes=20)
+    audio_format = batch_output_format({"codec": "mp3"}, CountingTTS.capabilities)
+    providers = FakeProviders(CountingTTS())
+    async def run(text):
+        job = store.submit(providers, [{"index": 0, "voice": "en_us_001", "prompt": text}], audio_format)
+        await job.task
+        return job
+    first = await run("twelve bytes")
+    assert first.status == "done" and first.bytes == 12
+    second = await run("twelve again")
+    # Over the cap the oldest finished job goes before its TTL
+    assert store.get(first.id) is None and store.get(second.id) is second
+    too_big = await run("x" * 30)
+    assert too_big.status == "failed" and "job store" in too_big.error
+
+def test_mp3_is_only_passed_through_from_mp3_providers():
+    wav = ProviderCapabilities(sample_rate=24000, audio_format="wav")
+    assert batch_output_format({"codec": "mp3"}, CountingTTS.capabilities).passthrough
+    audio_format = batch_output_format({"codec": "mp3"}, wav)
+    assert audio_format.codec == "pcm16" and not audio_format.passthrough
+
+def test_batch_tts_mp3_request_from_wav_provider_gets_wav(mock_settings):
+    client = TestClient(app)
+    response = client.post("/tts/batch", json={"items": [{"text": "Hi"}], "audio_format": {"codec": "mp3"}})
+    line = json.loads(response.text.splitlines()[0])
+    assert line["mime_type"] == "audio/wav" and base64.b64decode(line["audio"])[:4] == b"RIFF"
+
+def test_batch_tts_streams_ndjson(mock_settings):
+    client = TestClient(app)
+    response = client.post("/tts/batch", json={"items": [
+        {"text": "Welcome to support", "id": "welcome"},
+        {"text": "Please hold", "voice": "en_uk_001"},
+        {"text": "Welcome to support"},
+    ]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    by_index = {line["index"]: line for line in lines}
+    assert sorted(by_index) == [0, 1, 2]
+    assert by_index[2]["duplicate_of"] == 0
+    assert by_index[1]["voice"] == "en_uk_001"
+    audio = base64.b64decode(by_index[0]["audio"])
+    assert audio[:4] == b"RIFF" and by_index[0]["mime_type"] == "audio/wav"
+
+def test_batch_tts_zip(mock_settings):
+    client = TestClient(app)
+    response = client.post("/tts/batch", json={
+        "items": [{"text": "One", "id": "a/b"}, {"text": "Two"}, {"text": "One"}],
+        "audio_format": {"codec": "pcm16", "sample_rate": 16000},
+        "output": "zip",
+    })
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert [entry["file"] for entry in manifest] == ["0000_a_b.wav", "0001_1.wav", "0000_a_b.wav"]
+    assert all(entry["sample_rate"] == 16000 for entry in manifest)
+    assert len(archive.namelist()) == 3
+
+def test_batch_rejects_oversized_requests(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "batch_max_items", 2)
+    client = TestClient(app)
+    response = client.post("/tts/batch", json={"items": [{"text": "a"}, {"text": "b"}, {"text": "c"}]})
+    assert response.status_code == 413
+
+def test_llm_tts_job_lifecycle(mock_settings):
+    with TestClient(app) as client:
+        response = client.post("/jobs", json={"prompts": [{"prompt": "hello"}, {"prompt": "what is the weather"}]})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        deadline = time.time() + 5
+        while client.get(f"/jobs/{job_id}").json()["status"] != "done":
+            assert time.time() < deadline
+            time.sleep(0.02)
+        results = [json.loads(line) for line in client.get(f"/jobs/{job_id}/results").text.splitlines()]
+        archive = zipfile.ZipFile(io.BytesIO(client.get(f"/jobs/{job_id}/results?output=zip").content))
+        missing = client.get("/jobs/nope")
+    assert [result["prompt"] for result in results] == ["hello", "what is the weather"]
+    assert all(result["text"] and result["audio"] for result in results)
+    assert "manifest.json" in archive.namelist()
+    assert missing.status_code == 404
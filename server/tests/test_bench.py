@@ -0,0 +1,32 @@
+import pytest
+from app.utils import is_speech
+from benchmarks.loadgen import compare_to_baseline, percentile, run_benchmark, split_frames, synthetic_pcm
+from benchmarks.stubs import StubLatency
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+
+def test_synthetic_pcm_has_speech_then_silence():
+    frames = split_frames(synthetic_pcm(speech_ms=200, silence_ms=200), 20)
+    flags = [is_speech(frame) for frame in frames]
+    assert len(frames) == 20
+    assert flags[1] and not flags[-1]
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {"turn_latency_ms": {"p95": 100.0}, "frames_per_second": 1000.0}
+    report = {"turn_latency_ms": {"p95": 150.0}, "frames_per_second": 950.0}
+    regressions = compare_to_baseline(report, baseline, tolerance=0.10)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("turn_latency_ms.p95")
+
+@pytest.mark.asyncio
+async def test_loadgen_runs_one_turn_against_stubs():
+    report = await run_benchmark(clients=1, turns=1, ramp_s=0, pcm=synthetic_pcm(speech_ms=400, silence_ms=800),
+                                 latency=StubLatency(asr_ms=20, llm_ms=20, tts_ms=20), response_timeout=20)
+    assert report["errors"] == [] and report["failed_sessions"] == 0
+    assert report["turn_latency_ms"]["count"] == 1
+    assert report["audio_chunks_received"] > 0
+    assert report["stub_requests"]["asr_sessions"] == 1 and report["stub_requests"]["llm"] >= 1
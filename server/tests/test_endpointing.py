@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.endpointing import EndpointingStats, PauseModel, TurnAssembler, endpointing_stats
+from tests.conftest import speak_turn
+
+def _assembler(turns, **kwargs):
+    async def on_turn(text):
+        turns.append(text)
+    kwargs.setdefault("min_grace_ms", 10)
+    kwargs.setdefault("max_grace_ms", 100)
+    kwargs.setdefault("initial_pause_ms", 40)
+    return TurnAssembler(on_turn, EndpointingStats(), **kwargs)
+
+@pytest.mark.asyncio
+async def test_fragments_within_grace_are_merged():
+    turns = []
+    assembler = _assembler(turns)
+    await assembler.on_final("so I was wondering")
+    assembler.on_partial("if you")
+    await assembler.on_final("if you could help me.")
+    await asyncio.sleep(0.05)
+    assert turns == ["so I was wondering if you could help me."]
+    assert assembler.stats.fragments_merged == 1
+    assert assembler.stats.holds == 1
+
+@pytest.mark.asyncio
+async def test_terminal_punctuation_uses_short_grace():
+    assembler = _assembler([])
+    assert assembler.grace_ms("What time is it?") == 10
+    assert 10 < assembler.grace_ms("what time is") <= 100
+
+@pytest.mark.asyncio
+async def test_separate_turns_after_grace_expires():
+    turns = []
+    assembler = _assembler(turns)
+    await assembler.on_final("Hello.")
+    await asyncio.sleep(0.05)
+    await assembler.on_final("Goodbye.")
+    await asyncio.sleep(0.05)
+    assert turns == ["Hello.", "Goodbye."]
+    assert assembler.stats.snapshot()["avg_added_delay_ms"] >= 10
+
+@pytest.mark.asyncio
+async def test_non_adaptive_delivers_each_final():
+    turns = []
+    assembler = _assembler(turns, adaptive=False)
+    await assembler.on_final("one")
+    await assembler.on_final("two")
+    assert turns == ["one", "two"]
+
+@pytest.mark.asyncio
+async def test_flush_ends_turn_without_waiting_for_grace():
+    turns = []
+    assembler = _assembler(turns, min_grace_ms=5000, max_grace_ms=5000)
+    await assembler.on_final("and then")
+    assembler.flush()
+    await asyncio.gather(*assembler.tasks())
+    assert turns == ["and then"] and assembler.stats.turns == 1
+    assembler.flush()  # nothing pending
+    assert assembler.tasks() == []
+
+def test_stop_flushes_pending_turn(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "endpointing_adaptive", True)
+    monkeypatch.setattr(settings, "endpointing_min_grace_ms", 60000.0)
+    monkeypatch.setattr(settings, "endpointing_max_grace_ms", 60000.0)
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as websocket:
+            websocket.receive_json()
+            heard = speak_turn(websocket, until="transcript")
+            while not heard[-1]["is_final"]:
+                heard.append(websocket.receive_json())
+            websocket.send_json({"type": "stop"})  # the grace window would hold the reply for a minute
+            messages = [websocket.receive_json()]
+            while messages[-1]["type"] != "audio_chunk":
+                messages.append(websocket.receive_json())
+    assert {"type": "status", "status": "stopped"} in messages
+    assert any(m["type"] == "transcript" and m["speaker"] == "agent" for m in messages)
+
+def test_pause_model_tracks_observed_pauses():
+    model = PauseModel(initial_ms=350)
+    for _ in range(50):
+        model.observe(120)
+    assert model.mean_ms == pytest.approx(120, abs=1)
+    assert model.upper_ms() < 200
+
+def test_pipeline_holds_final_for_grace_window(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "endpointing_adaptive", True)
+    monkeypatch.setattr(settings, "endpointing_vad", True)
+    turns, finals, delay = endpointing_stats.turns, endpointing_stats.finals, endpointing_stats.added_delay_s
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as websocket:
+            websocket.receive_json()
+            messages = speak_turn(websocket, until="audio_chunk")
+
+    transcripts = [m for m in messages if m["type"] == "transcript" and m["is_final"]]
+    assert [m["speaker"] for m in transcripts] == ["user", "agent"]  # the reply waits for the turn
+    assert endpointing_stats.turns == turns + 1 and endpointing_stats.finals == finals + 1
+    # "Hello there" has no terminal punctuation, so it waited at least the minimum grace
+    assert endpointing_stats.added_delay_s - delay >= settings.endpointing_min_grace_ms / 1000
@@ -0,0 +1,67 @@
+import io
+import random
+import wave
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.mock import LatencyModel, MockProviderError, MockTTS
+from tests.conftest import UTTERANCE
+
+def test_latency_model_is_deterministic():
+    first = LatencyModel.parse("lognormal:200:50", random.Random(7))
+    second = LatencyModel.parse("lognormal:200:50", random.Random(7))
+    assert [first.sample() for _ in range(5)] == [second.sample() for _ in range(5)]
+    assert LatencyModel.parse("fixed:120").sample() == pytest.approx(0.12)
+
+@pytest.mark.asyncio
+async def test_mock_tts_declares_what_it_yields():
+    tts = MockTTS()
+    chunk = await tts.stream_tts("hi").__anext__()
+    assert chunk[:4] == b"RIFF"
+    assert tts.capabilities.audio_format == "wav"
+    with wave.open(io.BytesIO(chunk)) as wav:
+        assert wav.getframerate() == tts.capabilities.sample_rate
+
+@pytest.mark.asyncio
+async def test_mock_tts_failure_injection():
+    tts = MockTTS(failure_rate=1.0)
+    with pytest.raises(MockProviderError):
+        async for _ in tts.stream_tts("hello"):
+            pass
+
+def test_full_pipeline_offline(mock_settings):
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as websocket:
+        assert websocket.receive_json()["status"] == "connected"
+        websocket.send_json({"type": "start"})
+        assert websocket.receive_json()["status"] == "recording"
+
+        for frame in UTTERANCE:
+            websocket.send_bytes(frame)
+
+        messages = []
+        while not any(m["type"] == "audio_chunk" for m in messages):
+            messages.append(websocket.receive_json())
+
+        finals = [m for m in messages if m["type"] == "transcript" and m["is_final"]]
+        assert finals[0] == {"type": "transcript", "text": "Hello there", "is_final": True, "speaker": "user"}
+        assert finals[1]["speaker"] == "agent"
+        assert finals[1]["text"].startswith("Hello!")
+
+def test_negotiated_pcm_frames(mock_settings):
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "config", "audio_format": {"codec": "pcm16", "sample_rate": 24000, "frame_ms": 20}})
+        assert websocket.receive_json() == {"type": "audio_format", "codec": "pcm16", "sample_rate": 24000, "frame_ms": 20}
+        websocket.send_json({"type": "start"})
+        websocket.receive_json()
+        for frame in UTTERANCE:
+            websocket.send_bytes(frame)
+
+        message = websocket.receive_json()
+        while message["type"] != "audio_chunk":
+            message = websocket.receive_json()
+        assert message["codec"] == "pcm16"
+        assert message["frame_ms"] == 20
+        assert len(message["payload"]) == 1280  # base64 of 960 bytes
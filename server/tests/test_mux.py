@@ -0,0 +1,165 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.mux import MuxConnection, MuxProtocolError, MuxStats, MuxStream, decode_frame, encode_frame
+from tests.conftest import UTTERANCE
+
+def _connection(send, **kwargs) -> MuxConnection:
+    connection = MuxConnection(None, send, MuxStats(), **kwargs)
+    for stream_id in ("a", "b"):
+        connection.streams[stream_id] = MuxStream(stream_id, connection.outbound_limit)
+    return connection
+
+def test_frame_header_roundtrip():
+    assert decode_frame(encode_frame("agent-7", b"\x01\x02")) == ("agent-7", b"\x01\x02")
+    with pytest.raises(MuxProtocolError):
+        decode_frame(b"\x05ab")
+    with pytest.raises(MuxProtocolError):
+        encode_frame("x" * 256, b"")
+
+@pytest.mark.asyncio
+async def test_round_robin_keeps_quiet_stream_in_first_batch():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    connection = _connection(send, batch_ms=0, quota=4)
+    for i in range(20):
+        await connection._enqueue(connection.streams["a"], {"type": "audio_chunk", "seq": i})
+    await connection._enqueue(connection.streams["b"], {"type": "transcript", "text": "hi"})
+    await asyncio.sleep(0.01)
+    await connection.close()
+    streams = [[m["stream"] for m in batch["messages"]] for batch in sent]
+    assert "b" in streams[0]
+    assert sum(len(batch) for batch in streams) == 21
+
+@pytest.mark.asyncio
+async def test_full_stream_queue_only_holds_back_that_stream():
+    release = asyncio.Event()
+
+    async def send(message):
+        await release.wait()
+
+    connection = _connection(send, batch_ms=0, outbound_limit=2, max_batch=1)
+    a, b = connection.streams["a"], connection.streams["b"]
+    for i in range(3):
+        await connection._enqueue(a, {"type": "audio_chunk", "seq": i})
+    await asyncio.sleep(0.01)  # writer takes one message and stalls on the socket
+    blocked = asyncio.create_task(connection._enqueue(a, {"type": "audio_chunk", "seq": 3}))
+    await asyncio.wait_for(connection._enqueue(b, {"type": "status"}), 0.1)
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    assert connection.stats.send_waits == 2
+    release.set()
+    await asyncio.wait_for(blocked, 0.1)
+    await connection.close()
+
+@pytest.mark.asyncio
+async def test_lagging_stream_drops_its_own_audio():
+    async def send(message):
+        pass
+
+    connection = _connection(send, inbound_audio_limit=3)
+    for _ in range(5):
+        await connection.handle_bytes(encode_frame("a", b"\x00\x00"))
+    await connection.handle_bytes(encode_frame("b", b"\x00\x00"))
+    assert connection.stats.frames_dropped == 2
+    assert connection.streams["b"].inbound_audio == 1
+    await connection.close()
+
+@pytest.mark.asyncio
+async def test_queued_partials_are_merged_per_speaker():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    connection = _connection(send, batch_ms=20)
+    a, b = connection.streams["a"], connection.streams["b"]
+    for text in ("he", "hel", "hello"):
+        await connection._enqueue(a, {"type": "transcript", "text": text, "is_final": False, "speaker": "user"})
+    await connection._enqueue(a, {"type": "audio_chunk", "seq": 1})
+    await connection._enqueue(b, {"type": "transcript", "text": "yo", "is_final": False, "speaker": "user"})
+    await connection._enqueue(a, {"type": "transcript", "text": "hi", "is_final": False, "speaker": "agent"})
+    await connection._enqueue(a, {"type": "transcript", "text": "hi there", "is_final": True, "speaker": "agent"})
+    await asyncio.sleep(0.05)
+    await connection.close()
+    messages = [m for batch in sent for m in batch["messages"]]
+    assert [(m["stream"], m.get("text", m["type"])) for m in messages] == [
+        ("a", "hello"), ("a", "audio_chunk"), ("a", "hi there"), ("b", "yo")]
+    assert connection.stats.partials_merged == 3
+    assert a.credit._value == connection.outbound_limit and not a.partials
+
+@pytest.mark.asyncio
+async def test_control_flood_is_refused_per_stream():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    connection = _connection(send, inbound_audio_limit=3)
+    for _ in range(5):
+        await connection.handle_text(json.dumps({"type": "config", "stream": "a"}))
+    await connection.handle_text(json.dumps({"type": "config", "stream": "b"}))
+    assert connection.streams["a"].inbound.qsize() == 3 and connection.streams["b"].inbound.qsize() == 1
+    assert connection.stats.messages_rejected == 2
+    errors = [m for batch in sent for m in batch["messages"]]
+    assert [(m["type"], m["stream"]) for m in errors] == [("error", "a"), ("error", "a")]
+    await connection.close()
+
+@pytest.mark.asyncio
+async def test_stream_that_fails_to_start_is_removed():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    connection = MuxConnection(None, send, MuxStats())  # no providers: session.start() raises
+    await connection.open_stream("a")
+    await asyncio.wait_for(connection.streams["a"].worker, 1)
+    assert "a" not in connection.streams and connection.stats.start_failures == 1
+    error = sent[-1]["messages"][0]
+    assert error["type"] == "error" and error["stream"] == "a"
+    assert error["message"].startswith("Could not start session")
+    await connection.open_stream("a")  # the id can be used again
+    assert "a" in connection.streams
+    await connection.close()
+
+def test_two_sessions_share_one_socket(mock_settings):
+    client = TestClient(app)
+    with client.websocket_connect("/ws/mux") as websocket:
+        messages = {"a": [], "b": []}
+
+        def receive_until(done):
+            while not done():
+                frame = websocket.receive_json()
+                assert frame["type"] == "batch"
+                for message in frame["messages"]:
+                    messages[message["stream"]].append(message)
+
+        def seen(stream_id, message_type, **fields):
+            return any(m["type"] == message_type and all(m.get(k) == v for k, v in fields.items())
+                       for m in messages[stream_id])
+
+        for stream_id in messages:
+            websocket.send_text(json.dumps({"type": "open", "stream": stream_id}))
+        receive_until(lambda: seen("a", "status", status="connected") and seen("b", "status", status="connected"))
+        for stream_id in messages:
+            websocket.send_text(json.dumps({"type": "start", "stream": stream_id}))
+        receive_until(lambda: seen("a", "status", status="recording") and seen("b", "status", status="recording"))
+        for frame in UTTERANCE:
+            websocket.send_bytes(encode_frame("a", frame))
+            websocket.send_bytes(encode_frame("b", frame))
+        receive_until(lambda: seen("a", "audio_end") and seen("b", "audio_end"))
+
+        websocket.send_text(json.dumps({"type": "close", "stream": "a"}))
+        receive_until(lambda: seen("a", "status", status="closed"))
+        websocket.send_text(json.dumps({"type": "start", "stream": "a"}))
+        receive_until(lambda: seen("a", "error"))
+
+    for stream_id in messages:
+        finals = [m for m in messages[stream_id] if m["type"] == "transcript" and m["is_final"]]
+        assert [m["speaker"] for m in finals] == ["user", "agent"]
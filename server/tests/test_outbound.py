@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pytest
+from app.outbound import SLOW_CONSUMER_CLOSE_CODE, OutboundStats, OutboundWriter, dumps
+
+class FakeWebSocket:
+    def __init__(self, blocked: bool = False):
+        self.sent = []
+        self.close_code = None
+        self.release = asyncio.Event()
+        if not blocked:
+            self.release.set()
+    async def send_text(self, text):
+        await self.release.wait()
+        self.sent.append(json.loads(text))
+    async def close(self, code=1000):
+        self.close_code = code
+
+def _partial(text, speaker="user"):
+    return {"type": "transcript", "text": text, "is_final": False, "speaker": speaker}
+
+def test_dumps_is_compact_json():
+    message = {"type": "transcript", "text": "héllo", "is_final": False}
+    assert json.loads(dumps(message)) == message
+    assert " " not in dumps({"a": 1, "b": [1, 2]})
+
+@pytest.mark.asyncio
+async def test_partials_merge_and_yield_to_audio():
+    websocket = FakeWebSocket()
+    writer = OutboundWriter(websocket, OutboundStats())
+    writer.put(_partial("hel"))
+    writer.put({"type": "audio_chunk", "seq": 1})
+    writer.put(_partial("hello"))
+    writer.put(_partial("hi", speaker="agent"))
+    await asyncio.sleep(0.01)
+    assert [m.get("text", m["type"]) for m in websocket.sent] == ["audio_chunk", "hello", "hi"]
+    assert writer.stats.partials_merged == 1
+    writer.close()
+
+@pytest.mark.asyncio
+async def test_final_supersedes_pending_partial():
+    websocket = FakeWebSocket()
+    writer = OutboundWriter(websocket, OutboundStats())
+    writer.put(_partial("hello th"))
+    writer.put({**_partial("hello there"), "is_final": True})
+    await asyncio.sleep(0.01)
+    assert [(m["text"], m["is_final"]) for m in websocket.sent] == [("hello there", True)]
+    writer.close()
+
+@pytest.mark.asyncio
+async def test_producers_wait_above_high_water():
+    websocket = FakeWebSocket(blocked=True)
+    writer = OutboundWriter(websocket, OutboundStats(), max_queue=4)
+    for seq in range(3):
+        writer.put({"type": "audio_chunk", "seq": seq})
+    await asyncio.sleep(0.01)  # first chunk is stuck in send_text, two wait
+    waiting = asyncio.create_task(writer.wait_writable())
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+    websocket.release.set()
+    await asyncio.wait_for(waiting, 0.1)
+    await asyncio.sleep(0.01)
+    assert len(websocket.sent) == 3
+    writer.close()
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_disconnected():
+    websocket = FakeWebSocket(blocked=True)
+    stats = OutboundStats()
+    writer = OutboundWriter(websocket, stats, max_queue=4)
+    for seq in range(6):
+        writer.put({"type": "audio_chunk", "seq": seq})
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+    assert writer.closed and stats.slow_consumers == 1
+    assert websocket.close_code == SLOW_CONSUMER_CLOSE_CODE
+    writer.put({"type": "audio_chunk", "seq": 7})
+    assert writer.depth() == 0
+
+@pytest.mark.asyncio
+async def test_aclose_flushes_queued_messages():
+    websocket = FakeWebSocket(blocked=True)
+    writer = OutboundWriter(websocket, OutboundStats())
+    writer.put({"type": "audio_chunk", "seq": 1})
+    writer.put({"type": "error", "message": "Connection error: boom"})
+    asyncio.get_running_loop().call_later(0.02, websocket.release.set)
+    await writer.aclose()
+    assert [m["type"] for m in websocket.sent] == ["audio_chunk", "error"]
+    assert writer.closed and writer._task.done()
+
+@pytest.mark.asyncio
+async def test_aclose_gives_up_on_stuck_socket_and_awaits_close():
+    websocket = FakeWebSocket(blocked=True)
+    writer = OutboundWriter(websocket, OutboundStats(), max_queue=2)
+    for seq in range(4):
+        writer.put({"type": "audio_chunk", "seq": seq})
+    await writer.aclose(timeout=0.01)
+    assert websocket.sent == [] and websocket.close_code == SLOW_CONSUMER_CLOSE_CODE
+    assert writer._closer.done()
@@ -0,0 +1,88 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.playback import PlaybackStats, PlaybackTracker
+from tests.conftest import PCM16, UTTERANCE
+
+def test_stamp_sequences_frames_within_turn():
+    tracker = PlaybackTracker(PlaybackStats())
+    tracker.begin_turn()
+    first = tracker.stamp({}, 20)
+    second = tracker.stamp({}, 20)
+    assert (first["seq"], first["pts_ms"]) == (1, 0)
+    assert (second["seq"], second["pts_ms"]) == (2, 20)
+    assert tracker.end_turn() == {"turn": 1, "last_seq": 2, "chunks": 2, "duration_ms": 40}
+    tracker.begin_turn()
+    passthrough = tracker.stamp({}, None)
+    assert (passthrough["seq"], passthrough["turn"], passthrough["pts_ms"]) == (3, 2, None)
+
+@pytest.mark.asyncio
+async def test_pace_keeps_client_within_lead():
+    tracker = PlaybackTracker(PlaybackStats(), lead_ms=20)
+    tracker.acks_enabled = True
+    tracker.begin_turn()
+    start = time.perf_counter()
+    for _ in range(5):
+        tracker.stamp({}, 20)
+        await tracker.pace()
+    assert time.perf_counter() - start >= 0.07
+    assert tracker.stats.paced_s > 0
+
+@pytest.mark.asyncio
+async def test_pace_is_off_without_acks():
+    tracker = PlaybackTracker(PlaybackStats(), lead_ms=0)
+    tracker.begin_turn()
+    start = time.perf_counter()
+    for _ in range(5):
+        tracker.stamp({}, 20)
+        await tracker.pace()
+    assert time.perf_counter() - start < 0.05
+
+def test_acks_record_latency_and_underruns():
+    tracker = PlaybackTracker(PlaybackStats())
+    tracker.begin_turn()
+    tracker.on_ack({"type": "playback", "event": "start", "turn": 1, "seq": 1, "pts_ms": 0})
+    tracker.on_ack({"type": "playback", "event": "underrun", "turn": 1, "seq": 9, "gap_ms": 35})
+    tracker.on_ack({"type": "playback", "event": "underrun", "turn": 0, "seq": 2, "gap_ms": 50})
+    snapshot = tracker.stats.snapshot()
+    assert snapshot["playback_starts"] == 1
+    assert snapshot["underruns"] == 1 and snapshot["underrun_ms"] == 35
+    assert snapshot["p50_turn_to_playback_ms"] is not None
+
+def test_turn_to_playback_runs_from_commit_to_first_start():
+    tracker = PlaybackTracker(PlaybackStats())
+    tracker.begin_turn(committed_at=time.perf_counter() - 0.5)
+    tracker.on_ack({"type": "playback", "event": "start", "turn": 1, "seq": 1, "pts_ms": 0})
+    tracker.on_ack({"type": "playback", "event": "start", "turn": 1, "seq": 4, "pts_ms": 60})
+    snapshot = tracker.stats.snapshot()
+    assert snapshot["playback_starts"] == 1
+    assert snapshot["p50_turn_to_playback_ms"] >= 500
+
+def test_audio_chunks_carry_sequence_and_turn_end(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "playback_lead_ms", 60000.0)
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "config", "playback_acks": True, "audio_format": PCM16})
+        websocket.receive_json()
+        websocket.send_json({"type": "start"})
+        websocket.receive_json()
+        for frame in UTTERANCE:
+            websocket.send_bytes(frame)
+
+        chunks = []
+        message = websocket.receive_json()
+        while message["type"] != "audio_end":
+            if message["type"] == "audio_chunk":
+                if not chunks:
+                    websocket.send_json({"type": "playback", "event": "start", "turn": message["turn"],
+                                         "seq": message["seq"], "pts_ms": 0})
+                chunks.append(message)
+            message = websocket.receive_json()
+
+    assert [chunk["seq"] for chunk in chunks] == list(range(chunks[0]["seq"], chunks[0]["seq"] + len(chunks)))
+    assert [chunk["pts_ms"] for chunk in chunks[:3]] == [0, 20, 40]
+    assert message["last_seq"] == chunks[-1]["seq"]
+    assert message["duration_ms"] == 20 * len(chunks)
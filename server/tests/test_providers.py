@@ -0,0 +1,60 @@
+import pytest
+from app.config import settings
+from app import providers as providers_module
+from app.providers import ASRProvider, load_providers, registry, register_asr, resolve_providers
+from app.asr_providers.deepgram import DeepgramASR
+from app.asr_providers.local import LocalASR
+from app.mock import MockLLM
+
+class EchoASR(ASRProvider):
+    async def start_session(self): pass
+    async def start_stream(self): pass
+    async def stop_stream(self): pass
+    async def process_audio(self, audio_data: bytes): pass
+    async def close_session(self): pass
+
+@pytest.fixture
+def echo_asr():
+    register_asr("test-echo")(EchoASR)
+    yield EchoASR
+    registry._providers["asr"].pop("test-echo", None)
+
+def test_builtin_providers_registered():
+    resolve_providers(settings)
+    assert {"assemblyai", "deepgram", "local", "mock"} <= set(registry.names("asr"))
+    assert {"murf", "mock", "local"} <= set(registry.names("tts"))
+    assert {"openai", "mock"} <= set(registry.names("llm"))
+    assert DeepgramASR.capabilities.compressed_input
+
+def test_resolve_custom_and_configured_providers(echo_asr, monkeypatch):
+    monkeypatch.setattr(settings, "asr_provider", "test-echo")
+    monkeypatch.setattr(settings, "llm_provider", "mock")
+    providers = resolve_providers(settings)
+    assert isinstance(providers.create_asr(), EchoASR)
+    assert isinstance(providers.create_llm(), MockLLM)
+
+def test_unconfigured_provider_falls_back(monkeypatch):
+    monkeypatch.setattr(settings, "asr_provider", "deepgram")
+    monkeypatch.setattr(settings, "asr_api_key", None)
+    monkeypatch.setattr(settings, "tts_provider", "no-such-tts")
+    providers = resolve_providers(settings)
+    assert providers.asr is None
+    assert providers.create_asr().api_key == "demo"
+    assert providers.create_tts() is None
+
+def test_registry_rejects_wrong_base_class():
+    with pytest.raises(TypeError):
+        register_asr("bogus")(object)
+
+def test_broken_provider_module_is_skipped(monkeypatch, caplog):
+    monkeypatch.setattr(providers_module, "BUILTIN_PROVIDER_MODULES",
+                        [".no_such_provider", *providers_module.BUILTIN_PROVIDER_MODULES])
+    load_providers(["no_such_plugin"])
+    assert "deepgram" in registry.names("asr")
+    assert sum("Skipping provider module" in record.message for record in caplog.records) == 2
+
+def test_local_asr_uses_endpointing_setting(monkeypatch):
+    monkeypatch.setattr(settings, "asr_endpointing_ms", 250)
+    assert LocalASR.from_settings(settings).endpointing_ms == 250
+    monkeypatch.setattr(settings, "asr_endpointing_ms", None)
+    assert LocalASR.from_settings(settings).endpointing_ms == 500
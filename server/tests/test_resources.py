@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.providers import ASRProvider
+from app.resources import ResourceLeak, ResourceStats, await_released
+from app.session import SessionStore, VoiceSession, session_store
+from tests.conftest import PCM16, audio_chunks, pcm_frames, speak_turn
+
+class LeakyASR(ASRProvider):
+    def __init__(self, sockets):
+        self.sockets = sockets
+        self.pending_tasks = set()
+    async def start_session(self):
+        pass
+    async def start_stream(self):
+        pass
+    async def stop_stream(self):
+        pass
+    async def process_audio(self, audio_data):
+        pass
+    async def close_session(self):
+        for task in self.pending_tasks:
+            task.cancel()
+    def upstream_sockets(self):
+        return self.sockets
+
+async def _stubborn():
+    try:
+        await asyncio.sleep(1)
+    except asyncio.CancelledError:
+        await asyncio.sleep(0.2)  # ignores the cancel for a while
+
+async def _noop(message):
+    pass
+
+@pytest.fixture
+def debug_settings(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "debug_endpoints", True)
+    monkeypatch.setattr(settings, "leak_check_strict", True)
+
+@pytest.mark.asyncio
+async def test_await_released_reports_tasks_that_ignore_cancel():
+    stubborn = asyncio.create_task(_stubborn())
+    polite = asyncio.create_task(asyncio.sleep(1))
+    await asyncio.sleep(0)
+    stubborn.cancel()
+    polite.cancel()
+    assert await await_released([stubborn, polite], timeout=0.05) == [stubborn]
+    await stubborn
+
+@pytest.mark.asyncio
+async def test_close_cancels_owned_tasks_and_checks_sockets(monkeypatch):
+    monkeypatch.setattr(settings, "leak_check_strict", True)
+    session = VoiceSession(None, _noop, resumable=False)
+    session.asr_provider = LeakyASR(sockets=0)
+    listener = asyncio.create_task(asyncio.sleep(60))
+    session.asr_provider.pending_tasks.add(listener)
+    assert session.resource_snapshot()["live_tasks"] == 1
+    await session.close()
+    assert listener.cancelled()
+
+    session = VoiceSession(None, _noop, resumable=False)
+    session.asr_provider = LeakyASR(sockets=1)
+    with pytest.raises(ResourceLeak):
+        await session.close()
+
+@pytest.mark.asyncio
+async def test_leaks_are_counted_when_not_strict(monkeypatch):
+    stats = ResourceStats()
+    monkeypatch.setattr("app.session.resource_stats", stats)
+    session = VoiceSession(None, _noop, resumable=False)
+    session.asr_provider = LeakyASR(sockets=1)
+    await session.close()
+    snapshot = stats.snapshot()
+    assert snapshot["leaks"] == 1 and snapshot["leaked_sockets"] == 1
+    assert snapshot["sessions_closed"] == 1 and snapshot["live_sessions"] == 0
+
+@pytest.mark.asyncio
+async def test_store_logs_strict_leaks_instead_of_raising(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "leak_check_strict", True)
+    monkeypatch.setattr(settings, "resume_grace_s", 10.0)
+    store = SessionStore(grace_s=0)
+    session = VoiceSession(None, _noop, resumable=False)
+    session.asr_provider = LeakyASR(sockets=1)
+    await store.release(session)  # e.g. from the /ws endpoint's cleanup
+    assert session.closed
+
+    store = SessionStore(grace_s=0.01)
+    session = VoiceSession(None, _noop)
+    session.started = True
+    session.asr_provider = LeakyASR(sockets=1)
+    await store.release(session)
+    reaper = store._reapers[session.token]
+    await reaper  # expires and closes the session
+    assert session.closed and reaper.exception() is None
+    assert sum("open upstream sockets" in record.message for record in caplog.records) == 2
+
+def test_debug_sessions_account_audio(debug_settings):
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as websocket:
+            websocket.receive_json()
+            chunks = audio_chunks(speak_turn(websocket, audio_format=PCM16))
+            sessions = client.get("/debug/sessions").json()["sessions"]
+    sessions = [session for session in sessions if session["attached"]]  # not ones parked by other tests
+    assert len(sessions) == 1
+    session = sessions[0]
+    assert session["audio_in_s"] == pytest.approx(45 * 0.02)
+    assert session["audio_out_s"] == pytest.approx(len(chunks) * 0.02)
+    assert session["chunks_out"] == len(chunks) and session["upstream_sockets"] == 0
+    assert session["buffered_bytes"] >= sum(len(chunk["payload"]) for chunk in chunks)  # kept for resume
+
+def test_debug_endpoints_are_off_by_default(mock_settings):
+    client = TestClient(app)
+    assert client.get("/debug/sessions").status_code == 404
+    assert client.get("/debug/memory").status_code == 404
+
+def test_soak_connect_disconnect_releases_everything(debug_settings, monkeypatch, caplog):
+    caplog.set_level(logging.WARNING, logger="app")  # captured log records would dominate the memory diff
+    monkeypatch.setattr(session_store, "grace_s", 0)
+    with TestClient(app) as client:
+        def cycle(i):
+            with client.websocket_connect("/ws") as websocket:
+                websocket.receive_json()
+                if i % 10 == 0:
+                    websocket.send_json({"type": "start"})
+                    websocket.receive_json()
+                    for frame in pcm_frames(True, 5):
+                        websocket.send_bytes(frame)
+
+        for i in range(30):  # warm caches and pools before measuring
+            cycle(i)
+        before = client.get("/debug/sessions").json()
+        client.get("/debug/memory")
+        for i in range(200):
+            cycle(i)
+        memory = client.get("/debug/memory").json()
+        after = client.get("/debug/sessions").json()
+        client.delete("/debug/memory")
+    assert after["totals"]["live_sessions"] == 0
+    assert after["totals"]["uncollected_sessions"] <= 1  # freed by refcounting, not left for the GC
+    assert after["totals"]["leaks"] == before["totals"]["leaks"]
+    assert after["totals"]["sessions_closed"] - before["totals"]["sessions_closed"] == 200
+    assert after["event_loop_tasks"] <= before["event_loop_tasks"]
+    growth = sum(stat["size_diff"] for stat in memory["top"])
+    assert growth < 200 * 1024, memory["top"][:5]
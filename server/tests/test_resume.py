@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from app.config import settings
+from fastapi.testclient import TestClient
+from app.main import app
+from app.session import SessionStore, VoiceSession
+from tests.conftest import PCM16, audio_chunks, speak_turn
+
+class FakeSession:
+    def __init__(self):
+        self.token = "token"
+        self.resumable = True
+        self.started = True
+        self.closed = False
+        self.keepalives = 0
+    def detach(self):
+        pass
+    async def keepalive(self):
+        self.keepalives += 1
+    async def close(self):
+        self.closed = True
+
+def test_reconnect_within_grace_replays_unacked_audio(mock_settings):
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as websocket:
+            status = websocket.receive_json()
+            token = status["resume_token"]
+            chunks = audio_chunks(speak_turn(websocket, audio_format=PCM16))
+        assert len(chunks) > 2
+        acked = chunks[1]["seq"]
+
+        with client.websocket_connect(f"/ws?resume={token}&last_seq={acked}") as websocket:
+            status = websocket.receive_json()
+            assert status["status"] == "resumed"
+            assert status["resume_token"] != token
+            replayed = [websocket.receive_json() for _ in range(status["replayed"])]
+            websocket.send_json({"type": "stop"})
+            assert websocket.receive_json()["status"] == "stopped"
+
+        resumed = client.get("/metrics").json()["sessions"]["resumed"]
+    assert [chunk["seq"] for chunk in replayed] == [chunk["seq"] for chunk in chunks[2:]]
+    assert resumed >= 1
+
+def test_unknown_token_starts_fresh_session(mock_settings):
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws?resume=bogus&last_seq=3") as websocket:
+            status = websocket.receive_json()
+    assert status["status"] == "connected"
+    assert status["resumed"] is False
+
+@pytest.mark.asyncio
+async def test_detached_session_expires_after_grace():
+    store = SessionStore(grace_s=0.05, keepalive_s=0.01)
+    session = FakeSession()
+    await store.release(session)
+    assert store.snapshot()["detached"] == 1
+    await asyncio.sleep(0.1)
+    assert session.closed and session.keepalives >= 1
+    assert store.claim("token") is None
+    assert store.snapshot()["expired"] == 1
+
+@pytest.mark.asyncio
+async def test_claim_cancels_expiry():
+    store = SessionStore(grace_s=0.05)
+    session = FakeSession()
+    await store.release(session)
+    assert store.claim("token") is session
+    await asyncio.sleep(0.1)
+    assert not session.closed
+
+@pytest.mark.asyncio
+async def test_zero_grace_closes_immediately():
+    store = SessionStore(grace_s=0)
+    session = FakeSession()
+    await store.release(session)
+    assert session.closed and store.snapshot()["detached"] == 0
+
+@pytest.mark.asyncio
+async def test_session_that_failed_to_start_is_not_parked():
+    store = SessionStore(grace_s=10)
+    session = FakeSession()
+    session.started = False
+    await store.release(session)
+    assert session.closed and store.snapshot()["detached"] == 0
+
+@pytest.mark.asyncio
+async def test_overflowed_resume_buffer_reports_gap(monkeypatch):
+    monkeypatch.setattr(settings, "resume_grace_s", 10.0)
+    monkeypatch.setattr(settings, "resume_buffer_messages", 3)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    session = VoiceSession(None, send)
+    for seq in range(1, 7):
+        await session.send({"type": "audio_chunk", "seq": seq})
+    session.detach()
+    await session.attach(send, last_seq=1)
+    status, gap, *replayed = sent[6:]
+    assert status["status"] == "resumed" and status["replayed"] == 3
+    assert gap == {"type": "resume_gap", "last_seq": 1, "first_seq": 4, "dropped_messages": 0, "message": gap["message"]}
+    assert [message["seq"] for message in replayed] == [4, 5, 6]
+
+    sent.clear()
+    session.detach()
+    await session.attach(send, last_seq=6)  # nothing lost this time
+    assert [message["type"] for message in sent] == ["status"]
+    await session.close()
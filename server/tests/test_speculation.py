@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.speculation import (SpeculationBudget, SpeculationStats, SpeculativeResponder, speculation_stats,
+                             split_first_sentence, transcript_similarity)
+from tests.conftest import speak_turn
+
+def _responder(calls, per_minute=60, **kwargs):
+    async def run(text):
+        calls.append(text)
+        return f"reply to {text}"
+    return SpeculativeResponder(run, SpeculationBudget(per_minute), SpeculationStats(), stable_ms=10, **kwargs)
+
+def test_transcript_similarity_ignores_case_and_punctuation():
+    assert transcript_similarity("What's the weather?", "what's the weather") == 1.0
+    assert transcript_similarity("what is the time", "what is the weather like") < 0.9
+
+def test_split_first_sentence():
+    assert split_first_sentence("Hello! How can I help?") == ("Hello!", "How can I help?")
+    assert split_first_sentence("Just one") == ("Just one", "")
+
+@pytest.mark.asyncio
+async def test_stable_partial_is_committed():
+    calls = []
+    responder = _responder(calls)
+    responder.on_partial("what is the")
+    responder.on_partial("what is the weather")
+    await asyncio.sleep(0.03)
+    assert await responder.on_final("What is the weather?") == "reply to what is the weather"
+    assert calls == ["what is the weather"]
+    assert responder.stats.snapshot()["hit_rate"] == 1.0
+
+@pytest.mark.asyncio
+async def test_mismatched_final_discards_speculation():
+    calls = []
+    responder = _responder(calls)
+    responder.on_partial("turn on the")
+    await asyncio.sleep(0.03)
+    assert await responder.on_final("turn on the kitchen lights please") is None
+    assert responder.stats.discarded == 1
+    assert responder.stats.snapshot()["waste_rate"] == 1.0
+
+@pytest.mark.asyncio
+async def test_budget_caps_speculation():
+    calls = []
+    responder = _responder(calls, per_minute=1)
+    responder.on_partial("first question here")
+    await asyncio.sleep(0.03)
+    await responder.on_final("first question here")
+    responder.on_partial("second question here")
+    await asyncio.sleep(0.03)
+    assert await responder.on_final("second question here") is None
+    assert calls == ["first question here"]
+    assert responder.stats.over_budget == 1
+
+def test_pipeline_commits_speculative_reply(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "speculation_enabled", True)
+    monkeypatch.setattr(settings, "speculation_tts", True)
+    monkeypatch.setattr(settings, "speculation_stable_ms", 0.0)
+    before = speculation_stats.snapshot()
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as websocket:
+            websocket.receive_json()
+            speak_turn(websocket)
+    after = speculation_stats.snapshot()
+
+    # The reply was started from the partial and kept when the final matched it
+    assert after["started"] == before["started"] + 1
+    assert after["committed"] == before["committed"] + 1
+    assert after["discarded"] == before["discarded"]
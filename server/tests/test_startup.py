@@ -0,0 +1,48 @@
+import pytest
+from pydantic import ValidationError
+from fastapi.testclient import TestClient
+from app.config import Settings
+from app.main import app
+from app.startup import StartupProfile
+from benchmarks.startup import parse_importtime
+
+def test_settings_parse_env(monkeypatch):
+    monkeypatch.setenv("PROVIDER_PLUGINS", "pkg.one, pkg.two")
+    monkeypatch.setenv("TTS_PROVIDER", " Mock ")
+    monkeypatch.setenv("OPENAI_API_KEY", "")
+    settings = Settings(_env_file=None)
+    assert settings.provider_plugins == ["pkg.one", "pkg.two"]
+    assert settings.tts_provider == "mock"
+    assert settings.openai_api_key is None
+
+def test_settings_reject_invalid_values(monkeypatch):
+    monkeypatch.setenv("MOCK_FAILURE_RATE", "1.5")
+    with pytest.raises(ValidationError):
+        Settings(_env_file=None)
+
+def test_startup_profile_report():
+    profile = StartupProfile(target_ms=60000)
+    with profile.phase("providers"):
+        pass
+    profile.record_import("llm", 0.25)
+    profile.mark_ready()
+    report = profile.report()
+    assert report["ready"] and report["within_target"]
+    assert set(report["phases_ms"]) == {"providers"}
+    assert report["provider_imports_ms"] == {"llm": 250.0}
+
+def test_metrics_include_startup_profile():
+    with TestClient(app) as client:
+        startup = client.get("/metrics").json()["startup"]
+    assert startup["ready"]
+    assert {"providers", "provider_prepare", "audio_executor"} <= set(startup["phases_ms"])
+
+def test_parse_importtime():
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:       300 |       5000 | app.main\n"
+    )
+    rows = parse_importtime(output)
+    assert rows[0] == {"module": "app.main", "self_ms": 0.3, "cumulative_ms": 5.0}
+    assert len(rows) == 2
@@ -0,0 +1,29 @@
+import pytest
+from app.mock import wav_tone
+from app.transcode import LEGACY_OUTPUT_FORMAT, OutputFormat, TTSTranscoder, negotiate_output_format
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+def test_negotiation_clamps_to_supported_values():
+    fmt = negotiate_output_format({"codec": "pcm16", "sample_rate": 23500, "frame_ms": 25})
+    assert fmt == OutputFormat("pcm16", 24000, 20)
+    assert negotiate_output_format({"codec": "flac"}) == LEGACY_OUTPUT_FORMAT
+    assert negotiate_output_format({}) == LEGACY_OUTPUT_FORMAT
+
+@pytest.mark.asyncio
+async def test_wav_segments_become_fixed_frames():
+    fmt = OutputFormat("pcm16", 24000, 20)
+    transcoder = TTSTranscoder(fmt)
+    # 50 ms + 25 ms of audio -> four 20 ms frames, the last padded
+    frames = [frame async for frame in transcoder.frames(_chunks(wav_tone(50), b"", wav_tone(25)))]
+    assert [len(frame) for frame in frames] == [fmt.frame_bytes] * 4
+    assert frames[-1].endswith(b"\x00" * 100)
+
+@pytest.mark.asyncio
+async def test_raw_pcm_is_resampled_to_target_rate():
+    fmt = OutputFormat("pcm16", 16000, 20)
+    transcoder = TTSTranscoder(fmt, source_rate=48000)
+    frames = [frame async for frame in transcoder.frames(_chunks(b"\x01\x00" * 4800))]
+    assert len(frames) == 5
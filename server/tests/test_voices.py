@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.voices import VoiceCatalog, load_snapshot
+
+LIVE_VOICES = [
+    {"voiceId": "en-US-natalie", "displayName": "Natalie (F)", "locale": "en-US", "gender": "Female",
+     "availableStyles": ["Promo", "Conversational"]},
+    {"voiceId": "de-DE-matthias", "displayName": "Matthias (M)", "locale": "de-DE",
+     "availableStyles": ["Conversational"]},
+]
+
+def test_snapshot_is_indexed():
+    catalog = VoiceCatalog()
+    assert catalog.source == "snapshot"
+    assert catalog.get("en_us_001").voice_id == "Ronnie"
+    assert catalog.get("Reece").id == "en_uk_001"
+    assert [voice.id for voice in catalog.by_locale("EN-gb")] == ["en_uk_001"]
+    assert catalog.resolve("nope").id == "en_us_001"
+
+@pytest.mark.asyncio
+async def test_refresh_merges_live_list_with_aliases():
+    async def fetch():
+        return LIVE_VOICES
+
+    catalog = VoiceCatalog(fetch)
+    assert await catalog.refresh()
+    assert catalog.source == "live"
+    assert catalog.get("en-US-natalie").name == "Natalie (F)"
+    assert {voice.id for voice in catalog.by_style("conversational")} == {"en-US-natalie", "de-DE-matthias"}
+    assert {voice.id for voice in catalog.by_locale("en-US")} == {"en-US-natalie", "en_us_001"}
+    assert len(catalog.voices()) == len(LIVE_VOICES) + len(load_snapshot())
+
+@pytest.mark.asyncio
+async def test_stale_list_is_served_while_revalidating():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        if len(calls) > 1:
+            raise ConnectionError("offline")
+        await asyncio.sleep(0.01)
+        return LIVE_VOICES
+
+    catalog = VoiceCatalog(fetch, ttl_s=0.01, retry_s=60)
+    assert catalog.voices()[0].id == "en_us_001"  # snapshot served, refresh started
+    catalog.voices()  # still refreshing: no second fetch
+    await asyncio.sleep(0.05)
+    assert catalog.source == "live" and len(calls) == 1
+    catalog.voices()  # stale now: one refresh, which fails
+    await asyncio.sleep(0.01)
+    assert catalog.refresh_failures == 1 and catalog.get("en-US-natalie") is not None
+    catalog.voices()  # failure backs off for retry_s
+    await asyncio.sleep(0.01)
+    assert len(calls) == 2
+
+def test_config_endpoint_filters_catalog():
+    client = TestClient(app)
+    voices = client.get("/config", params={"locale": "en-AU"}).json()["supported_voices"]
+    assert [voice["id"] for voice in voices] == ["en_au_001"]
+
+def test_config_message_validates_voice(mock_settings):
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "config", "voice": "xx_none"})
+        error = websocket.receive_json()
+        websocket.send_json({"type": "config", "voice": "Reece", "audio_format": {"codec": "mp3"}})
+        accepted = websocket.receive_json()
+    assert error["type"] == "error" and "xx_none" in error["message"]
+    assert accepted["type"] == "audio_format"
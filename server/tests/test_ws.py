@@ -9,4 +9,18 @@ async def test_websocket_connection():
     with client.websocket_connect("/ws") as websocket:
         data = websocket.receive_json()
         # Test connection establishment
-        assert "type" in data
\ No newline at end of file
+        assert "type" in data
+def test_invalid_sample_rate_is_rejected(mock_settings):
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.receive_json()
+        for bad in (0, "fast", 192000):
+            websocket.send_json({"type": "config", "sample_rate": bad})
+            error = websocket.receive_json()
+            assert error["type"] == "error" and "keeping 16000" in error["message"]
+        websocket.send_json({"type": "config", "sample_rate": 8000})
+        websocket.send_json({"type": "start"})
+        assert websocket.receive_json()["status"] == "recording"
+        websocket.send_bytes(b"\x00\x00" * 160)
+        websocket.send_json({"type": "stop"})
+        assert websocket.receive_json()["status"] == "stopped"